@@ -0,0 +1,95 @@
+"""
+Memory and latency of the typeahead prefix index.
+
+Builds a PrefixIndex over synthetic Zipf-weighted terms, reports its memory
+per million terms, then measures top-k completion latency from several
+threads at once for prefixes of 1-6 characters.
+
+    python -m benchmarks.autocomplete --terms 1000000 --threads 8
+"""
+import argparse
+import json
+import random
+import string
+import threading
+import time
+import tracemalloc
+
+import numpy as np
+
+from boogle.query_engine.autocomplete import PrefixIndex
+
+
+def synthetic_terms(n, seed=0):
+    rng = random.Random(seed)
+    terms = {}
+    while len(terms) < n:
+        word = ''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 12)))
+        terms[word] = int(1e6 / (len(terms) + 1)) + 1
+    return terms
+
+
+def run_clients(index, prefixes, threads, k):
+    latencies = [[] for _ in range(threads)]
+
+    def client(n):
+        for prefix in prefixes[n::threads]:
+            start = time.perf_counter()
+            index.complete(prefix, k)
+            latencies[n].append((time.perf_counter() - start) * 1e6)
+
+    workers = [threading.Thread(target=client, args=(n,)) for n in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+    flat = [l for per_thread in latencies for l in per_thread]
+    return {
+        'qps': len(flat) / elapsed,
+        'p50_us': float(np.percentile(flat, 50)),
+        'p99_us': float(np.percentile(flat, 99)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--terms', type=int, default=1000000)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--queries', type=int, default=20000)
+    parser.add_argument('--k', type=int, default=8)
+    parser.add_argument('--json', help='Write the report to this path')
+    args = parser.parse_args()
+
+    terms = synthetic_terms(args.terms)
+    tracemalloc.start()
+    start = time.perf_counter()
+    index = PrefixIndex(terms)
+    build_s = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    usage = index.memory_usage()
+    per_million = usage['total_bytes'] / max(len(index), 1) * 1e6 / 2**20
+    print(f"Built {len(index)} terms in {build_s:.1f}s; {usage['total_bytes'] / 2**20:.1f} MB "
+          f"({per_million:.1f} MB per 1M terms, peak during build {peak / 2**20:.0f} MB)")
+
+    rng = random.Random(1)
+    words = list(terms)
+    report = {'terms': len(index), 'build_s': build_s, 'memory': usage,
+              'mb_per_million_terms': per_million, 'prefix_lengths': {}}
+    for length in range(1, 7):
+        prefixes = [rng.choice(words)[:length] for _ in range(args.queries)]
+        row = run_clients(index, prefixes, args.threads, args.k)
+        report['prefix_lengths'][length] = row
+        print(f"prefix len {length}: p50={row['p50_us']:6.1f}us p99={row['p99_us']:7.1f}us "
+              f"{row['qps']:9.0f} completions/s ({args.threads} threads)")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Queries per second of QueryEngine.search in a loop vs QueryEngine.search_batch,
+over the index in STORAGE_PATH. Caches are cleared before each run so every
+query is encoded and searched.
+
+    python -m benchmarks.batch_search --queries 256 --batch-size 64
+"""
+import argparse
+import json
+import random
+import time
+
+from boogle.query_engine.engine import QueryEngine
+
+
+def make_queries(engine, n, seed=0):
+    """Titles of indexed pages plus random pairs of vocabulary words."""
+    rng = random.Random(seed)
+    titles = [meta['title'] for meta in engine.indexer.doc_metadata.values() if meta.get('title')]
+    words = sorted(engine.spelling_corrector.vocabulary)
+    queries = []
+    while len(queries) < n:
+        if titles and rng.random() < 0.5:
+            queries.append(rng.choice(titles))
+        elif words:
+            queries.append(f"{rng.choice(words)} {rng.choice(words)}")
+        else:
+            break
+    return queries
+
+
+def clear_caches(engine):
+    engine.result_cache.clear()
+    engine.embedding_cache.clear()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--queries', type=int, default=256)
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--json', help='Write the report to this path')
+    args = parser.parse_args()
+
+    engine = QueryEngine()
+    engine.autocomplete.log_size = 0 # keep benchmark queries out of the typeahead log
+    engine.warm_up()
+    queries = make_queries(engine, args.queries)
+    if not queries:
+        print("No index found in STORAGE_PATH; build one first.")
+        return
+
+    clear_caches(engine)
+    start = time.perf_counter()
+    looped = [engine.search(q)[0][:args.k] for q in queries]
+    loop_s = time.perf_counter() - start
+
+    clear_caches(engine)
+    start = time.perf_counter()
+    batched = []
+    for i in range(0, len(queries), args.batch_size):
+        batched.extend(results for results, _, _ in engine.search_batch(queries[i:i + args.batch_size], args.k))
+    batch_s = time.perf_counter() - start
+
+    same = sum([r['doc_id'] for r in a] == [r['doc_id'] for r in b] for a, b in zip(looped, batched))
+    report = {
+        'queries': len(queries),
+        'batch_size': args.batch_size,
+        'loop_qps': len(queries) / loop_s,
+        'batch_qps': len(queries) / batch_s,
+        'identical_rankings': same,
+    }
+    print(f"looped: {report['loop_qps']:8.1f} q/s")
+    print(f"batch:  {report['batch_qps']:8.1f} q/s  (batch size {args.batch_size}, "
+          f"{report['batch_qps'] / report['loop_qps']:.1f}x)")
+    print(f"identical top-{args.k} rankings: {same}/{len(queries)}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Latency and result quality of tiered (champion list) evaluation vs scoring
+every posting, over the index in STORAGE_PATH. Each query of a Zipf
+workload (see benchmarks.suite) runs uncached in both modes, with its
+embedding warm so the lexical branch is what differs. Reported per mode:
+p50/p99 latency and lexical candidates scored; for the tiered mode also
+the top-10 and top-50 overlap with the full evaluation and how often it
+fell back to the full postings.
+
+    python -m benchmarks.champions --queries 500 --sizes 100,500
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from benchmarks.suite import make_workload
+from boogle import metrics
+from boogle.query_engine.engine import QueryEngine
+
+
+def overlap(a, b, k):
+    top = {res['doc_id'] for res in a[:k]}
+    return len(top & {res['doc_id'] for res in b[:k]}) / max(len(top), 1)
+
+
+def run(engine, query, champion_size):
+    if engine.champion_size != champion_size:
+        engine.champion_size = champion_size
+        engine.champions.clear()
+    start = time.perf_counter()
+    results = engine._search(query)[0]
+    return results, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--sizes', default='100,500', help='Comma-separated champion list sizes to compare')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help='Write the report to this path')
+    args = parser.parse_args()
+
+    engine = QueryEngine()
+    engine.autocomplete.log_size = 0 # keep benchmark queries out of the typeahead log
+    if not engine.indexer.doc_metadata:
+        print("No index found in STORAGE_PATH; build one first.")
+        return
+    engine.warm_up()
+    queries = list(dict.fromkeys(make_workload(engine, args.queries * 4, args.seed)))[:args.queries]
+    sizes = [int(size) for size in args.sizes.split(',')]
+
+    # Reference results, which also warm the embedding cache and each size's champion lists
+    full = {query: run(engine, query, 0)[0] for query in queries}
+    for size in sizes:
+        for query in queries:
+            run(engine, query, size)
+
+    report = {'documents': engine.doc_count, 'queries': len(queries), 'modes': {}}
+    print(f"{engine.doc_count} documents, {len(queries)} distinct queries")
+    print(f"{'mode':<12} {'p50 ms':>8} {'p99 ms':>8} {'scored':>8} {'top10':>7} {'top50':>7} {'fallback':>9}")
+    for size in [0] + sizes:
+        latencies = []
+        scored = []
+        top10 = []
+        top50 = []
+        fallbacks = metrics.CHAMPION_FALLBACKS.values.get(None, 0)
+        for query in queries:
+            results, seconds = run(engine, query, size)
+            latencies.append(seconds)
+            scored.append(sum(res['components']['bm25'] > 0 for res in results))
+            top10.append(overlap(full[query], results, 10))
+            top50.append(overlap(full[query], results, 50))
+        name = f"tiered r={size}" if size else 'full'
+        row = report['modes'][name] = {
+            'p50_ms': float(np.percentile(latencies, 50) * 1000),
+            'p99_ms': float(np.percentile(latencies, 99) * 1000),
+            'lexical_matches': float(np.mean(scored)),
+            'top10_overlap': float(np.mean(top10)),
+            'top50_overlap': float(np.mean(top50)),
+            'fallback_rate': (metrics.CHAMPION_FALLBACKS.values.get(None, 0) - fallbacks) / len(queries),
+        }
+        print(f"{name:<12} {row['p50_ms']:8.2f} {row['p99_ms']:8.2f} {row['lexical_matches']:8.0f} "
+              f"{row['top10_overlap']:7.1%} {row['top50_overlap']:7.1%} {row['fallback_rate']:9.1%}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+Synthetic wiki-like HTML corpora and a stub HTTP server to crawl them.
+
+Pages have a topic; their text mixes topic words with a Zipf-distributed
+shared vocabulary and English stop words. Out-links favour popular pages
+(preferential attachment) and pages of the same topic, and every page has
+navigation links to Special:/Category: pages the crawler must filter out.
+With `duplicates`, extra pages are near-copies of others at alias URLs
+(a few words changed plus a mirror notice), like mirrors and old revisions.
+
+    python -m benchmarks.corpus --pages 2000 --out /tmp/corpus
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import threading
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+STOP_WORDS = ("the of and a to in is was for on as with by that it from at an be this "
+              "which or are were his has its also had not but their").split()
+SYLLABLES = ("ka ri to ne sa mi lo ve du pa shi ra no te gu bo ly an or el is um "
+             "ex in al on ar en st tr ch ph qu").split()
+
+
+def make_word(rng):
+    return ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+
+
+class CorpusSpec:
+    def __init__(self, pages=1000, topics=40, vocabulary=20000, topic_words=150,
+                 words_per_page=(300, 1500), links_per_page=(5, 40), duplicates=0.0, seed=0):
+        self.pages = pages
+        self.topics = topics
+        self.vocabulary = vocabulary
+        self.topic_words = topic_words
+        self.words_per_page = words_per_page
+        self.links_per_page = links_per_page
+        self.duplicates = duplicates # near-duplicate pages added, as a fraction of pages
+        self.seed = seed
+
+
+def generate(spec):
+    """
+    Returns {path: {'title', 'topic', 'text', 'links': [path, ...]}} for
+    spec.pages pages at /wiki/<Title>.
+    """
+    rng = random.Random(spec.seed)
+    vocabulary = list(dict.fromkeys(make_word(rng) for _ in range(spec.vocabulary * 2)))[:spec.vocabulary]
+    # Zipf weights over the shared vocabulary
+    weights = [1.0 / (rank + 1) for rank in range(len(vocabulary))]
+    topic_vocab = [rng.sample(vocabulary, spec.topic_words) for _ in range(spec.topics)]
+
+    paths = []
+    titles = []
+    for i in range(spec.pages):
+        topic = i % spec.topics
+        title = ' '.join(w.capitalize() for w in rng.sample(topic_vocab[topic][:30], 2)) + f" {i}"
+        titles.append(title)
+        paths.append('/wiki/' + title.replace(' ', '_'))
+
+    # Popularity for preferential attachment: a few hub pages get most links
+    popularity = [1.0 / (rank + 1) ** 0.8 for rank in range(spec.pages)]
+    rng.shuffle(popularity)
+
+    pages = {}
+    for i, path in enumerate(paths):
+        topic = i % spec.topics
+        n_words = rng.randint(*spec.words_per_page)
+        shared = rng.choices(vocabulary, weights, k=n_words // 2)
+        local = rng.choices(topic_vocab[topic], k=n_words // 3)
+        stops = rng.choices(STOP_WORDS, k=n_words - len(shared) - len(local))
+        words = shared + local + stops
+        rng.shuffle(words)
+
+        n_links = rng.randint(*spec.links_per_page)
+        popular = rng.choices(range(spec.pages), popularity, k=n_links // 2)
+        same_topic = [rng.randrange(topic, spec.pages, spec.topics) for _ in range(n_links - len(popular))]
+        links = [paths[j] for j in popular + same_topic if j != i]
+
+        pages[path] = {'title': titles[i], 'topic': topic, 'text': ' '.join(words), 'links': links}
+
+    for k in range(int(spec.pages * spec.duplicates)):
+        source = rng.choice(paths)
+        words = pages[source]['text'].split()
+        for _ in range(3):
+            words[rng.randrange(len(words))] = rng.choice(vocabulary)
+        alias = f"/w/index.php?title={source[len('/wiki/'):]}&oldid={k}"
+        pages[alias] = dict(pages[source], text=' '.join(words), links=list(pages[source]['links']),
+                            chrome=f"Mirror copy {k} of {pages[source]['title']}")
+        # Reachable by crawling, like a mirror linked from somewhere
+        pages[rng.choice(paths)]['links'].append(alias)
+    return pages
+
+
+def render(page):
+    """HTML of one page: nav chrome, a first paragraph, body paragraphs with inline links."""
+    words = page['text'].split()
+    links = list(page['links'])
+    paragraphs = []
+    for start in range(0, len(words), 80):
+        chunk = [escape(w) for w in words[start:start + 80]]
+        if links:
+            href = links.pop()
+            chunk.append(f'<a href="{escape(href)}">{escape(href.rsplit("/", 1)[-1].replace("_", " "))}</a>')
+        paragraphs.append(f"<p>{' '.join(chunk)}.</p>")
+    see_also = ''.join(f'<li><a href="{escape(href)}">{escape(href)}</a></li>' for href in links)
+    return (
+        f"<html><head><title>{escape(page['title'])}</title></head><body>"
+        '<nav><a href="/wiki/Special:Random">Random</a> <a href="/wiki/Category:All">All</a> '
+        '<a href="#top">Top</a></nav>'
+        f"<h1>{escape(page['title'])}</h1>"
+        + (f"<p>{escape(page['chrome'])}</p>" if page.get('chrome') else '')
+        + f"{''.join(paragraphs)}"
+        f"<h2>See also</h2><ul>{see_also}</ul>"
+        '<footer><a href="/wiki/Help:Contents">Help</a></footer></body></html>'
+    )
+
+
+def write(pages, storage_path, base_url='http://corpus.local'):
+    """
+    Write pages as if they had been crawled: raw/<md5(url)>.html,
+    url_map.json and link_graph.json under storage_path.
+    """
+    raw_path = os.path.join(storage_path, 'raw')
+    os.makedirs(raw_path, exist_ok=True)
+    os.makedirs(os.path.join(storage_path, 'index'), exist_ok=True)
+    url_map = {}
+    link_graph = {}
+    for path, page in pages.items():
+        url = base_url + path
+        url_hash = hashlib.md5(url.encode()).hexdigest()
+        with open(os.path.join(raw_path, f"{url_hash}.html"), 'w', encoding='utf-8') as f:
+            f.write(render(page))
+        url_map[url_hash] = url
+        link_graph[url] = list(dict.fromkeys(base_url + link for link in page['links']))
+    with open(os.path.join(storage_path, 'url_map.json'), 'w') as f:
+        json.dump(url_map, f)
+    with open(os.path.join(storage_path, 'link_graph.json'), 'w') as f:
+        json.dump(link_graph, f)
+
+
+def serve(pages, host='127.0.0.1', port=0):
+    """
+    Serve the corpus over HTTP from a background thread (no robots.txt, so
+    everything may be crawled). Returns (server, base_url); call
+    server.shutdown() when done.
+    """
+    rendered = {path: render(page).encode('utf-8') for path, page in pages.items()}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = rendered.get(self.path.split('#', 1)[0])
+            if body is None:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name='corpus-server', daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', type=int, default=1000)
+    parser.add_argument('--duplicates', type=float, default=0.0, help='Near-duplicate pages to add, as a fraction of pages')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', required=True, help='Storage path to write raw/, url_map.json and link_graph.json to')
+    args = parser.parse_args()
+
+    pages = generate(CorpusSpec(pages=args.pages, duplicates=args.duplicates, seed=args.seed))
+    write(pages, args.out)
+    print(f"Wrote {len(pages)} pages to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Harvest rate of each CrawlScheduler strategy on a synthetic corpus: the
+share of the top PageRank pages (PageRank of the full link graph) and of
+the total PageRank mass a crawl has fetched after each slice of the page
+budget. The crawl is simulated: popping a URL "fetches" it and hands its
+out-links to the scheduler, so the numbers reflect ordering alone.
+
+    python -m benchmarks.crawl_priority --pages 20000 --budget 2000 --json harvest.json
+"""
+import argparse
+import json
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks import corpus
+from boogle.config import Config
+from boogle.crawler.scheduler import CrawlScheduler
+from boogle.ranker.pagerank import build_matrix, power_iteration
+
+CHECKPOINTS = (0.1, 0.25, 0.5, 1.0)
+
+
+def simulate(strategy, link_graph, seeds, budget):
+    """Crawl order of the first `budget` pages, scheduler seconds, final frontier size."""
+    scheduler = CrawlScheduler(strategy)
+    for url in seeds:
+        scheduler.add_seed(url)
+    order = []
+    start = time.perf_counter()
+    while len(order) < budget:
+        url, _ = scheduler.get_next_url()
+        if url is None:
+            break
+        order.append(url)
+        scheduler.add_links(url, link_graph.get(url, []))
+    return order, time.perf_counter() - start, scheduler.size()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', type=int, default=20000, help='Corpus size')
+    parser.add_argument('--budget', type=int, default=2000, help='Pages the crawl may fetch')
+    parser.add_argument('--top', type=float, default=0.05, help='Fraction of pages (by PageRank) that counts as important')
+    parser.add_argument('--seeds', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help='Write the report to this path')
+    args = parser.parse_args()
+
+    spec = corpus.CorpusSpec(pages=args.pages, words_per_page=(1, 1), seed=args.seed)
+    pages = corpus.generate(spec)
+    # Out-links as the crawler records them: deduplicated, in page order
+    link_graph = {path: list(dict.fromkeys(page['links'])) for path, page in pages.items()}
+    seeds = list(link_graph)[:args.seeds]
+
+    urls, adjacency = build_matrix(link_graph)
+    scores, _, _ = power_iteration(adjacency, tol=1e-10, max_iter=1000)
+    pagerank = dict(zip(urls, scores.tolist()))
+    top = set(sorted(pagerank, key=pagerank.get, reverse=True)[:max(1, int(len(urls) * args.top))])
+
+    print(f"{len(urls)} pages, {adjacency.nnz} links, budget {args.budget}, "
+          f"important = top {len(top)} by PageRank")
+    print(f"{'strategy':<9} " + ' '.join(f"{'top@' + format(c, '.0%'):>9} {'mass@' + format(c, '.0%'):>10}" for c in CHECKPOINTS)
+          + f" {'sched/s':>9} {'frontier':>9}")
+
+    report = {'pages': len(urls), 'links': int(adjacency.nnz), 'budget': args.budget, 'top': len(top), 'strategies': {}}
+    with tempfile.TemporaryDirectory() as storage:
+        # Fresh schedulers: nothing to load from a previous crawl
+        Config.STORAGE_PATH = storage
+        for strategy in CrawlScheduler.STRATEGIES:
+            order, seconds, frontier = simulate(strategy, link_graph, seeds, args.budget)
+            row = {'crawled': len(order), 'pages_per_s': len(order) / seconds if seconds else 0.0, 'frontier': frontier}
+            cells = []
+            for checkpoint in CHECKPOINTS:
+                crawled = order[:int(args.budget * checkpoint)]
+                harvest = sum(url in top for url in crawled) / len(top)
+                mass = sum(pagerank[url] for url in crawled)
+                row[f"top_at_{checkpoint}"] = harvest
+                row[f"mass_at_{checkpoint}"] = mass
+                cells.append(f"{harvest:9.1%} {mass:10.1%}")
+            report['strategies'][strategy] = row
+            print(f"{strategy:<9} " + ' '.join(cells) + f" {row['pages_per_s']:9.0f} {frontier:9d}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Index build with and without SimHash near-duplicate collapsing, on a
+synthetic corpus where --duplicates of the pages are extra near-copies of
+others at alias URLs (benchmarks/corpus.py). Reported per mode: build time,
+documents, postings, vectors and index size on disk; with dedup also how
+many of the planted copies were caught and how many distinct pages were
+wrongly merged.
+
+    python -m benchmarks.dedup --pages 2000 --duplicates 0.2 --json dedup.json
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from benchmarks import corpus
+from boogle.config import Config
+
+MB = 1024 * 1024
+
+
+def disk_bytes(path):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+def build(storage_path, dedup):
+    from boogle.indexer.inverted_index import InvertedIndex
+
+    Config.STORAGE_PATH = storage_path
+    Config.INDEX_DEDUP = dedup
+    indexer = InvertedIndex()
+    start = time.perf_counter()
+    indexer.build_index()
+    seconds = time.perf_counter() - start
+    return indexer, {
+        'build_s': seconds,
+        'documents': len(indexer.doc_metadata),
+        'duplicates': len(indexer.duplicates),
+        'postings': sum(len(postings) for postings in indexer.index.values()),
+        'vectors': indexer.vector_store.index.ntotal if indexer.vector_store.index is not None else 0,
+        'index_mb': disk_bytes(os.path.join(storage_path, 'index')) / MB,
+        'vectors_mb': disk_bytes(os.path.join(storage_path, 'vectors')) / MB,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', type=int, default=2000, help='Distinct pages')
+    parser.add_argument('--duplicates', type=float, default=0.2, help='Near-copies added, as a fraction of pages')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help='Write the report to this path')
+    args = parser.parse_args()
+
+    pages = corpus.generate(corpus.CorpusSpec(pages=args.pages, duplicates=args.duplicates, seed=args.seed))
+    planted = sum('oldid=' in path for path in pages)
+
+    report = {'pages': len(pages), 'planted_duplicates': planted, 'modes': {}}
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode, dedup in (('off', False), ('simhash', True)):
+            storage_path = os.path.join(tmp, mode)
+            corpus.write(pages, storage_path)
+            indexer, row = build(storage_path, dedup)
+            if dedup:
+                # A planted copy is an alias URL; anything else merged is a false merge
+                caught = sum('oldid=' in entry['url'] for entry in indexer.duplicates.values())
+                row['caught'] = caught
+                row['false_merges'] = len(indexer.duplicates) - caught
+            report['modes'][mode] = row
+
+    print(f"{len(pages)} pages, {planted} planted near-duplicates")
+    print(f"{'mode':<8} {'build s':>8} {'docs':>7} {'postings':>9} {'vectors':>8} {'index MB':>9} {'vectors MB':>10}")
+    for mode, row in report['modes'].items():
+        print(f"{mode:<8} {row['build_s']:8.1f} {row['documents']:7d} {row['postings']:9d} {row['vectors']:8d} "
+              f"{row['index_mb']:9.1f} {row['vectors_mb']:10.1f}")
+    off, on = report['modes']['off'], report['modes']['simhash']
+    print(f"simhash: caught {on['caught']}/{planted} planted copies, {on['false_merges']} false merges; "
+          f"postings {on['postings'] / max(off['postings'], 1) - 1:+.1%}, vectors {on['vectors'] / max(off['vectors'], 1) - 1:+.1%}, "
+          f"build time {on['build_s'] / off['build_s'] - 1:+.1%}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Compare embedding throughput of per-document encoding against the batched VectorStore pipeline.
+
+    python -m benchmarks.embedding_throughput --docs 2000
+"""
+import argparse
+import json
+import random
+import time
+from boogle.vectors.store import VectorStore
+
+WORDS = ("computer science algorithm data structure language theory network system "
+         "history mathematics physics engine search index ranking graph model learning").split()
+
+
+def synthetic_texts(n, seed=0):
+    """Title + first paragraph sized texts with a realistic spread of lengths."""
+    rng = random.Random(seed)
+    return [' '.join(rng.choice(WORDS) for _ in range(rng.randint(8, 120))) for _ in range(n)]
+
+
+def time_single(store, texts):
+    """Old path: one encode call per document."""
+    start = time.perf_counter()
+    for text in texts:
+        store.model.encode([text])
+    return time.perf_counter() - start
+
+
+def time_batched(store, texts, simulated_parse_ms=0.0):
+    """Batched path; optionally sleep per doc to stand in for HTML parsing that encoding can overlap."""
+    store.doc_ids, store.pending = [], []
+    start = time.perf_counter()
+    for i, text in enumerate(texts):
+        if simulated_parse_ms:
+            time.sleep(simulated_parse_ms / 1000)
+        store.add_document(str(i), text)
+    store.flush()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--docs', type=int, default=2000)
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--parse-ms', type=float, default=2.0, help='Simulated HTML parse time per doc')
+    parser.add_argument('--json', help='Write the report to this path')
+    args = parser.parse_args()
+
+    texts = synthetic_texts(args.docs)
+    report = {'docs': args.docs, 'batch_size': args.batch_size}
+
+    store = VectorStore(batch_size=args.batch_size, encode_thread=False, use_cache=False)
+    store.model.encode(texts[:8])  # warm up
+    report['single_docs_per_s'] = round(args.docs / time_single(store, texts), 1)
+    report['batched_docs_per_s'] = round(args.docs / time_batched(store, texts), 1)
+
+    # End-to-end with parsing in the loop: inline encoding vs background thread
+    report['inline_with_parse_docs_per_s'] = round(args.docs / time_batched(store, texts, args.parse_ms), 1)
+    threaded = VectorStore(batch_size=args.batch_size, encode_thread=True, use_cache=False)
+    report['threaded_with_parse_docs_per_s'] = round(args.docs / time_batched(threaded, texts, args.parse_ms), 1)
+
+    print(json.dumps(report, indent=2))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Search under sustained overload, with and without admission control, over
+the index in STORAGE_PATH. Requests go through the async server in-process
+(boogle.frontend.asgi.AsyncServer, --threads handler threads) as an open
+loop: distinct uncached queries arrive at --overload times the measured
+single-thread capacity for --duration seconds, whether or not earlier ones
+have finished, like traffic during a spike.
+
+    off  every request is served at the full tier, however long it queued
+    on   AdmissionController with ADMISSION_MAX_WAIT_MS / QUERY_BUDGET_MS:
+         late requests get a 503, queued ones run at cheaper tiers
+
+Reported: served req/s, p50/p99 latency of served requests, share shed and
+the tier mix (boogle_search_tier_total).
+
+    python -m benchmarks.overload --overload 2 --duration 10
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from urllib.parse import quote_plus
+
+import numpy as np
+from werkzeug.test import EnvironBuilder
+
+from boogle import metrics
+from boogle.frontend import app as frontend
+from boogle.frontend.asgi import AsyncServer, call_wsgi
+from boogle.query_engine.admission import AdmissionController
+
+
+def make_queries(engine, n, seed=0):
+    rng = random.Random(seed)
+    words = sorted(engine.spelling_corrector.vocabulary)
+    return [f"{rng.choice(words)} {rng.choice(words)} {rng.choice(words)}" for _ in range(n)]
+
+
+def capacity(engine, queries, seconds=2.0):
+    """Uncached requests/s through the app on one thread."""
+    count = 0
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        environ = EnvironBuilder(path='/search', query_string=f"q={quote_plus(queries[count % len(queries)])}").get_environ()
+        call_wsgi(frontend.app, environ)
+        engine.result_cache.clear()
+        count += 1
+    return count / seconds
+
+
+def run(server, queries, rate):
+    """(status, seconds from scheduled arrival to response) per request."""
+    async def handle(query, scheduled):
+        scope = {
+            'type': 'http', 'method': 'GET', 'path': '/search', 'raw_path': b'/search',
+            'query_string': f"q={quote_plus(query)}".encode(), 'headers': [],
+            'http_version': '1.1', 'scheme': 'http', 'root_path': '',
+        }
+        response = {}
+
+        async def receive():
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                response['status'] = message['status']
+            else:
+                response['latency'] = time.perf_counter() - scheduled
+
+        await server(scope, receive, send)
+        return response['status'], response['latency']
+
+    async def drive():
+        start = time.perf_counter()
+        tasks = []
+        for i, query in enumerate(queries):
+            scheduled = start + i / rate
+            await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+            tasks.append(asyncio.ensure_future(handle(query, scheduled)))
+        return await asyncio.gather(*tasks)
+
+    return asyncio.run(drive())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--overload', type=float, default=2.0, help='Offered load as a multiple of capacity')
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds of arrivals')
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help='Write the report to this path')
+    args = parser.parse_args()
+
+    engine = frontend.query_engine
+    engine.autocomplete.log_size = 0 # keep benchmark queries out of the typeahead log
+    engine.in_flight = None
+    if not engine.indexer.doc_metadata:
+        print("No index found in STORAGE_PATH; build one first.")
+        return
+    engine.warm_up()
+
+    rate = capacity(engine, make_queries(engine, 200, args.seed + 1)) * args.overload
+    queries = make_queries(engine, int(rate * args.duration), args.seed)
+    print(f"capacity x {args.overload:g} = {rate:.0f} req/s offered for {args.duration:g}s ({len(queries)} requests)")
+
+    report = {'offered_per_s': rate, 'requests': len(queries), 'modes': {}}
+    for mode in ('off', 'on'):
+        frontend.admission = AdmissionController(slots=0, max_wait_ms=0, budget_ms=0) if mode == 'off' else AdmissionController()
+        server = AsyncServer(frontend.app, threads=args.threads, coalesce=False)
+        engine.result_cache.clear()
+        engine.embedding_cache.clear()
+        engine.snippet_cache.clear()
+        tiers = dict(metrics.SEARCH_TIERS.values)
+
+        start = time.perf_counter()
+        responses = run(server, queries, rate)
+        elapsed = time.perf_counter() - start
+        server.executor.shutdown()
+
+        served = [latency for status, latency in responses if status == 200]
+        mix = {tier: count - tiers.get(tier, 0) for tier, count in metrics.SEARCH_TIERS.values.items()
+               if count - tiers.get(tier, 0)}
+        row = report['modes'][mode] = {
+            'served_per_s': len(served) / elapsed,
+            'p50_ms': float(np.percentile(served, 50) * 1000) if served else None,
+            'p99_ms': float(np.percentile(served, 99) * 1000) if served else None,
+            'shed': 1 - len(served) / len(responses),
+            'tiers': mix,
+        }
+        p50 = f"{row['p50_ms']:9.1f}" if served else f"{'-':>9}"
+        p99 = f"{row['p99_ms']:9.1f}" if served else f"{'-':>9}"
+        print(f"admission {mode:<4} {row['served_per_s']:7.1f} served/s  p50 {p50}ms  p99 {p99}ms  "
+              f"shed {row['shed']:6.1%}  tiers {mix}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+PageRank on synthetic link graphs: the networkx path (DiGraph built edge by
+edge + nx.pagerank) vs the sparse CSR power iteration in
+boogle.ranker.pagerank. Reports build/iteration time, peak traced memory
+and the largest score difference between the two.
+
+With --grow, also times a refresh after the last pages of each graph were
+crawled: a cold power iteration vs the incremental update (warm start +
+residual push) from the scores of the graph without them. Both are scored
+by their L1 error against a tightly converged reference. Building the CSR
+matrix is common to both and not included.
+
+Graphs look like link_graph.json: preferential-attachment out-links, some
+pages without out-links (dangling), duplicate links and links to pages
+that were never crawled.
+
+    python -m benchmarks.pagerank --nodes 10000,100000 --json pagerank.json
+    python -m benchmarks.pagerank --nodes 100000 --grow 500 --skip-networkx
+"""
+import argparse
+import json
+import time
+import tracemalloc
+
+import numpy as np
+
+from boogle.ranker.pagerank import build_matrix, incremental_pagerank, power_iteration, warm_start
+
+
+def make_link_graph(n, avg_links=15, dangling=0.1, external=0.1, seed=0):
+    rng = np.random.default_rng(seed)
+    urls = [f"http://bench.local/wiki/Page_{i}" for i in range(n)]
+    popularity = 1.0 / np.arange(1, n + 1) ** 0.8
+    rng.shuffle(popularity)
+    popularity /= popularity.sum()
+
+    degrees = rng.poisson(avg_links, n)
+    degrees[rng.random(n) < dangling] = 0
+    targets = rng.choice(n, size=int(degrees.sum()), p=popularity)
+    is_external = rng.random(len(targets)) < external
+
+    link_graph = {}
+    offset = 0
+    for i, degree in enumerate(degrees):
+        links = []
+        for j in range(offset, offset + degree):
+            if is_external[j]:
+                links.append(f"http://elsewhere.local/{targets[j]}")
+            else:
+                links.append(urls[targets[j]])
+        link_graph[urls[i]] = links
+        offset += degree
+    return link_graph
+
+
+def networkx_pagerank(link_graph, damping, tol, max_iter):
+    """The pre-CSR implementation: a DiGraph over crawled pages only."""
+    import networkx as nx
+
+    G = nx.DiGraph()
+    for source, targets in link_graph.items():
+        G.add_node(source)
+        for target in targets:
+            if target in link_graph:
+                G.add_edge(source, target)
+    return nx.pagerank(G, alpha=damping, tol=tol, max_iter=max_iter)
+
+
+def sparse_pagerank(link_graph, damping, tol, max_iter):
+    urls, adjacency = build_matrix(link_graph)
+    scores, iterations, _ = power_iteration(adjacency, damping, tol, max_iter)
+    return dict(zip(urls, scores.tolist())), iterations
+
+
+def incremental_refresh(link_graph, grow, damping, tol, max_iter):
+    """
+    Cold vs incremental PageRank after the last `grow` pages were added.
+    """
+    urls = list(link_graph)
+    old_graph = {url: link_graph[url] for url in urls[:-grow]}
+    old_urls, old_adjacency = build_matrix(old_graph)
+    old_scores, _, _ = power_iteration(old_adjacency, damping, tol, max_iter)
+
+    urls, adjacency = build_matrix(link_graph)
+    reference, _, _ = power_iteration(adjacency, damping, tol * 1e-4, 1000)
+
+    start = time.perf_counter()
+    cold, iterations, _ = power_iteration(adjacency, damping, tol, max_iter)
+    cold_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    warm, stats = incremental_pagerank(adjacency, warm_start(urls, old_urls, old_scores), damping, tol, max_iter)
+    incremental_s = time.perf_counter() - start
+
+    report = {
+        'new_pages': grow,
+        'cold_s': cold_s,
+        'cold_iterations': iterations,
+        'cold_l1_error': float(np.abs(cold - reference).sum()),
+        'incremental_s': incremental_s,
+        'incremental_l1_error': float(np.abs(warm - reference).sum()),
+    }
+    report.update(stats)
+    return report
+
+
+def measure(fn, *args):
+    """(result, seconds, peak traced MB); timing and memory come from separate runs."""
+    start = time.perf_counter()
+    result = fn(*args)
+    seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    fn(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, seconds, peak / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--nodes', default='10000,100000', help='Comma-separated graph sizes')
+    parser.add_argument('--avg-links', type=int, default=15)
+    parser.add_argument('--damping', type=float, default=0.85)
+    parser.add_argument('--tol', type=float, default=1e-6)
+    parser.add_argument('--max-iter', type=int, default=100)
+    parser.add_argument('--grow', type=int, default=0, help='Also compare cold vs incremental refresh after this many new pages')
+    parser.add_argument('--skip-networkx', action='store_true', help='Only time the sparse engine (large graphs)')
+    parser.add_argument('--json', help='Write the report to this path')
+    args = parser.parse_args()
+
+    report = []
+    for n in (int(size) for size in args.nodes.split(',')):
+        link_graph = make_link_graph(n, args.avg_links)
+        params = (args.damping, args.tol, args.max_iter)
+        row = {'nodes': n, 'links': sum(len(links) for links in link_graph.values())}
+
+        (sparse_scores, iterations), row['sparse_s'], row['sparse_peak_mb'] = measure(sparse_pagerank, link_graph, *params)
+        row['iterations'] = iterations
+        line = f"{n:>9} nodes  sparse {row['sparse_s']:7.2f}s {row['sparse_peak_mb']:8.1f}MB  ({iterations} iterations)"
+
+        if not args.skip_networkx:
+            nx_scores, row['networkx_s'], row['networkx_peak_mb'] = measure(networkx_pagerank, link_graph, *params)
+            row['max_abs_diff'] = max(abs(nx_scores[url] - sparse_scores[url]) for url in link_graph)
+            top = lambda scores: sorted(scores, key=scores.get, reverse=True)[:100]
+            row['same_top100'] = top(nx_scores) == top(sparse_scores)
+            line += (f"  networkx {row['networkx_s']:7.2f}s {row['networkx_peak_mb']:8.1f}MB"
+                     f"  ({row['networkx_s'] / row['sparse_s']:.1f}x)  max |diff| {row['max_abs_diff']:.1e}"
+                     f"  same top-100: {row['same_top100']}")
+        print(line)
+
+        if args.grow:
+            refresh = incremental_refresh(link_graph, args.grow, *params)
+            row['incremental'] = refresh
+            print(f"{'':>9} +{args.grow} pages  cold {refresh['cold_s']:7.3f}s ({refresh['cold_iterations']} iterations, "
+                  f"L1 error {refresh['cold_l1_error']:.1e})  incremental {refresh['incremental_s']:7.3f}s "
+                  f"(~{refresh['work_iterations']:.2f} iterations: {refresh['push_rounds']} push rounds + "
+                  f"{refresh['power_iterations']} power, "
+                  f"L1 error {refresh['incremental_l1_error']:.1e})  "
+                  f"saved {1 - refresh['incremental_s'] / refresh['cold_s']:.0%}")
+        report.append(row)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
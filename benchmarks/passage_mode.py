@@ -0,0 +1,79 @@
+"""
+Compare document-level and passage-level embeddings on the crawled corpus:
+vector count, memory, build time and query latency.
+
+    python -m benchmarks.passage_mode --docs 200
+"""
+import argparse
+import json
+import os
+import time
+import numpy as np
+from boogle.config import Config
+from boogle.processor.text_processor import TextProcessor
+from boogle.vectors.store import VectorStore
+
+DEFAULT_QUERIES = ["computer science", "history of programming languages", "machine learning",
+                   "operating system kernel", "python standard library", "graph algorithms"]
+
+
+def load_corpus(limit):
+    raw_path = os.path.join(Config.STORAGE_PATH, 'raw')
+    processor = TextProcessor()
+    docs = []
+    for filename in sorted(os.listdir(raw_path))[:limit]:
+        if not filename.endswith('.html'):
+            continue
+        with open(os.path.join(raw_path, filename), 'r', encoding='utf-8') as f:
+            title, first_para, text = processor.clean_html(f.read())
+        docs.append((filename.replace('.html', ''), title, first_para, text))
+    return docs
+
+
+def measure(docs, queries, passage_mode):
+    store = VectorStore(use_cache=False)
+    start = time.perf_counter()
+    for doc_id, title, first_para, text in docs:
+        if passage_mode:
+            store.add_passages(doc_id, title, text)
+        else:
+            store.add_document(doc_id, f"{title}. {first_para}")
+    store.build()
+    build_time = time.perf_counter() - start
+
+    latencies = []
+    for _ in range(5):
+        for query in queries:
+            start = time.perf_counter()
+            store.search(query, k=20)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    report = store.memory_usage()
+    report.update({
+        'mode': 'passage' if passage_mode else 'document',
+        'build_s': round(build_time, 2),
+        'search_p50_ms': round(float(np.percentile(latencies, 50)), 2),
+        'search_p99_ms': round(float(np.percentile(latencies, 99)), 2),
+    })
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--docs', type=int, default=200)
+    parser.add_argument('--query', action='append', help='Query to time (repeatable)')
+    parser.add_argument('--json', help='Write the report to this path')
+    args = parser.parse_args()
+
+    docs = load_corpus(args.docs)
+    queries = args.query or DEFAULT_QUERIES
+    report = [measure(docs, queries, passage_mode=False), measure(docs, queries, passage_mode=True)]
+    print(json.dumps(report, indent=2))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
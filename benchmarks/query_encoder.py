@@ -0,0 +1,54 @@
+"""
+Parity and latency of each query encoder backend against the fp32 torch reference.
+
+    python -m benchmarks.query_encoder --threads 1 --runs 200
+"""
+import argparse
+import json
+import time
+import numpy as np
+from boogle.vectors.encoders import BACKENDS, PARITY_TEXTS, TorchEncoder, check_parity, create_encoder
+
+MODEL_NAME = 'all-MiniLM-L6-v2'
+
+
+def latency(encoder, queries, runs):
+    encoder.encode(queries[:1])  # warm up
+    timings = []
+    for i in range(runs):
+        query = queries[i % len(queries)]
+        start = time.perf_counter()
+        encoder.encode([query])
+        timings.append((time.perf_counter() - start) * 1000)
+    return round(float(np.percentile(timings, 50)), 3), round(float(np.percentile(timings, 99)), 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--backend', action='append', choices=BACKENDS, help='Backend to test (repeatable)')
+    parser.add_argument('--threads', type=int, default=1, help='Intra-op threads')
+    parser.add_argument('--runs', type=int, default=200)
+    parser.add_argument('--json', help='Write the report to this path')
+    args = parser.parse_args()
+
+    reference = TorchEncoder(MODEL_NAME, threads=args.threads)
+    report = []
+    for backend in args.backend or BACKENDS:
+        try:
+            encoder = reference if backend == 'torch' else create_encoder(backend, MODEL_NAME, threads=args.threads)
+        except ImportError as e:
+            print(f"{backend:<12} skipped: {e}")
+            continue
+        ok, parity = check_parity(reference, encoder, PARITY_TEXTS)
+        p50, p99 = latency(encoder, PARITY_TEXTS, args.runs)
+        parity.update({'parity_ok': ok, 'threads': args.threads, 'p50_ms': p50, 'p99_ms': p99})
+        report.append(parity)
+        print(json.dumps(parity))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
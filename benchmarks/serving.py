@@ -0,0 +1,134 @@
+"""
+Throughput of the two serving modes under bursty traffic, over the index
+in STORAGE_PATH. Requests are driven in-process (no sockets), so only
+request scheduling, coalescing and handler work are measured:
+
+    threaded  the Flask WSGI app on --threads threads (gunicorn --threads)
+    async     boogle.frontend.asgi.AsyncServer: all requests of a burst are
+              accepted at once and handlers run on --threads threads
+
+Each burst sends --burst GET /search requests for --distinct fresh queries
+with Zipf popularity (caches are cleared between bursts), like a trending
+query hitting the site. Both modes run with coalescing on and off; the
+"searches" column is how many times QueryEngine actually computed results.
+
+    python -m benchmarks.serving --bursts 20 --burst 64 --distinct 4
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote_plus
+
+import numpy as np
+from werkzeug.test import EnvironBuilder
+
+from boogle import metrics
+from boogle.frontend import app as frontend
+from boogle.frontend.asgi import AsyncServer, call_wsgi
+from boogle.query_engine.coalesce import SingleFlight
+
+
+def make_bursts(engine, bursts, size, distinct, seed=0):
+    rng = random.Random(seed)
+    words = sorted(engine.spelling_corrector.vocabulary)
+    weights = [1.0 / (rank + 1) for rank in range(distinct)]
+    return [rng.choices([f"{rng.choice(words)} {rng.choice(words)}" for _ in range(distinct)], weights, k=size)
+            for _ in range(bursts)]
+
+
+def clear_caches(engine):
+    engine.result_cache.clear()
+    engine.embedding_cache.clear()
+    engine.snippet_cache.clear()
+
+
+def run_threaded(queries, threads):
+    """Latencies (s) of one burst: all requests arrive at once and queue for the threads."""
+    def handle(query, start):
+        environ = EnvironBuilder(path='/search', query_string=f"q={quote_plus(query)}").get_environ()
+        call_wsgi(frontend.app, environ)
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        start = time.perf_counter()
+        return [f.result() for f in [pool.submit(handle, query, start) for query in queries]]
+
+
+def run_async(server, queries):
+    async def handle(query, start):
+        scope = {
+            'type': 'http', 'method': 'GET', 'path': '/search', 'raw_path': b'/search',
+            'query_string': f"q={quote_plus(query)}".encode(), 'headers': [],
+            'http_version': '1.1', 'scheme': 'http', 'root_path': '',
+        }
+        done = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        async def send(message):
+            if message['type'] == 'http.response.body':
+                done.append(time.perf_counter() - start)
+
+        await server(scope, receive, send)
+        return done[0]
+
+    async def burst():
+        start = time.perf_counter()
+        return await asyncio.gather(*(handle(query, start) for query in queries))
+
+    return asyncio.run(burst())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--bursts', type=int, default=20)
+    parser.add_argument('--burst', type=int, default=64, help='Requests per burst')
+    parser.add_argument('--distinct', type=int, default=4, help='Distinct queries per burst')
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--json', help='Write the report to this path')
+    args = parser.parse_args()
+
+    engine = frontend.query_engine
+    engine.autocomplete.log_size = 0 # keep benchmark queries out of the typeahead log
+    engine.warm_up()
+    bursts = make_bursts(engine, args.bursts, args.burst, args.distinct)
+    if not engine.indexer.doc_metadata:
+        print("No index found in STORAGE_PATH; build one first.")
+        return
+
+    report = {}
+    for mode in ('threaded', 'async'):
+        for coalesce in (False, True):
+            engine.in_flight = SingleFlight() if coalesce else None
+            server = AsyncServer(frontend.app, threads=args.threads, coalesce=coalesce)
+            misses = metrics.QUERIES.values.get('miss', 0)
+            latencies = []
+            elapsed = 0.0
+            for queries in bursts:
+                clear_caches(engine)
+                start = time.perf_counter()
+                latencies.extend(run_threaded(queries, args.threads) if mode == 'threaded' else run_async(server, queries))
+                elapsed += time.perf_counter() - start
+            server.executor.shutdown()
+
+            name = f"{mode}{'+coalesce' if coalesce else ''}"
+            row = report[name] = {
+                'requests_per_s': len(latencies) / elapsed,
+                'p50_ms': float(np.percentile(latencies, 50) * 1000),
+                'p99_ms': float(np.percentile(latencies, 99) * 1000),
+                'searches': metrics.QUERIES.values.get('miss', 0) - misses,
+            }
+            print(f"{name:<18} {row['requests_per_s']:8.1f} req/s  p50 {row['p50_ms']:8.1f}ms  "
+                  f"p99 {row['p99_ms']:8.1f}ms  searches {row['searches']}/{len(latencies)}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Compare spelling-correction latency of the old edits1/edits2 enumeration
+with the precomputed symmetric-delete (SymSpell) index, by misspelling length.
+
+    python -m benchmarks.spelling --words 20000
+"""
+import argparse
+import json
+import os
+import random
+import string
+import tempfile
+import time
+
+import numpy as np
+
+from boogle.query_engine.symspell import SymSpell
+
+LETTERS = string.ascii_lowercase
+
+
+def synthetic_vocabulary(n, seed=0):
+    rng = random.Random(seed)
+    vocabulary = {}
+    while len(vocabulary) < n:
+        word = ''.join(rng.choice(LETTERS) for _ in range(rng.randint(3, 14)))
+        vocabulary[word] = int(rng.paretovariate(1.2))
+    return vocabulary
+
+
+def misspell(word, rng, edits):
+    for _ in range(edits):
+        i = rng.randrange(len(word))
+        op = rng.choice('dri')
+        if op == 'd' and len(word) > 3:
+            word = word[:i] + word[i + 1:]
+        elif op == 'r':
+            word = word[:i] + rng.choice(LETTERS) + word[i + 1:]
+        else:
+            word = word[:i] + rng.choice(LETTERS) + word[i:]
+    return word
+
+
+class EditEnumeration:
+    """The previous SpellingCorrector.correction: known edits at distance 1, then 2."""
+    def __init__(self, vocabulary):
+        self.vocabulary = vocabulary
+
+    def edits1(self, word):
+        splits = [(word[:i], word[i:]) for i in range(len(word) + 1)]
+        deletes = [L + R[1:] for L, R in splits if R]
+        transposes = [L + R[1] + R[0] + R[2:] for L, R in splits if len(R) > 1]
+        replaces = [L + c + R[1:] for L, R in splits if R for c in LETTERS]
+        inserts = [L + c + R for L, R in splits for c in LETTERS]
+        return set(deletes + transposes + replaces + inserts)
+
+    def lookup(self, word):
+        known = {w for w in self.edits1(word) if w in self.vocabulary}
+        if not known:
+            known = {e2 for e1 in self.edits1(word) for e2 in self.edits1(e1) if e2 in self.vocabulary}
+        return max(known, key=self.vocabulary.get) if known else None
+
+
+def time_lookups(lookup, words):
+    latencies = []
+    for word in words:
+        start = time.perf_counter()
+        lookup(word)
+        latencies.append((time.perf_counter() - start) * 1e6)
+    return {'p50_us': float(np.percentile(latencies, 50)), 'p99_us': float(np.percentile(latencies, 99))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--words', type=int, default=20000, help='Vocabulary size')
+    parser.add_argument('--queries', type=int, default=30, help='Misspellings per length bucket')
+    parser.add_argument('--json', help='Write the report to this path')
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    vocabulary = synthetic_vocabulary(args.words)
+
+    start = time.perf_counter()
+    symspell = SymSpell().build(vocabulary)
+    build_s = time.perf_counter() - start
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'symspell.npz')
+        symspell.save(path)
+        size_mb = os.path.getsize(path) / 2**20
+        start = time.perf_counter()
+        symspell = SymSpell.load(path)
+        load_s = time.perf_counter() - start
+    print(f"SymSpell index: build {build_s:.2f}s, load {load_s * 1000:.0f}ms, {size_mb:.1f} MB on disk")
+
+    enumeration = EditEnumeration(vocabulary)
+    report = {'vocabulary': len(vocabulary), 'build_s': build_s, 'load_s': load_s, 'size_mb': size_mb, 'lengths': {}}
+    words = list(vocabulary)
+    for low, high in ((3, 5), (6, 9), (10, 14)):
+        bucket = [w for w in words if low <= len(w) <= high]
+        queries = [misspell(rng.choice(bucket), rng, 2) for _ in range(args.queries)]
+        row = {
+            'edits': time_lookups(enumeration.lookup, queries),
+            'symspell': time_lookups(symspell.lookup, queries),
+        }
+        report['lengths'][f'{low}-{high}'] = row
+        print(f"length {low:>2}-{high:<2}  edits p50={row['edits']['p50_us'] / 1000:8.1f}ms  "
+              f"symspell p50={row['symspell']['p50_us']:6.0f}us p99={row['symspell']['p99_us']:6.0f}us")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
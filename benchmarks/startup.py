@@ -0,0 +1,64 @@
+"""
+Measure cold-start time of each component in a fresh interpreter.
+
+    python -m benchmarks.startup
+"""
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+# name -> code run in a fresh process after `from boogle import startup`
+COMPONENTS = {
+    'text_processor': "from boogle.processor.text_processor import TextProcessor; TextProcessor()",
+    'inverted_index': "from boogle.indexer.inverted_index import InvertedIndex; InvertedIndex().load_index()",
+    'pagerank': "from boogle.ranker.pagerank import PageRank; PageRank()",
+    'query_engine': "from boogle.query_engine.engine import QueryEngine; QueryEngine()",
+    'query_engine_warm': "from boogle.query_engine.engine import QueryEngine; QueryEngine().warm_up()",
+}
+
+RUNNER = """
+import json, time
+start = time.perf_counter()
+from boogle import startup
+{code}
+print(json.dumps({{'total_s': time.perf_counter() - start, 'components': startup.TIMINGS}}))
+"""
+
+
+def measure(code):
+    start = time.perf_counter()
+    out = subprocess.run([sys.executable, '-c', RUNNER.format(code=code)],
+                         capture_output=True, text=True, check=True).stdout
+    wall = time.perf_counter() - start
+    result = json.loads(out.strip().splitlines()[-1])
+    result['process_s'] = wall
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--json', help='Write the report to this path')
+    args = parser.parse_args()
+
+    report = {}
+    for name, code in COMPONENTS.items():
+        try:
+            report[name] = measure(code)
+        except subprocess.CalledProcessError as e:
+            lines = (e.stderr or str(e)).strip().splitlines()
+            errors = [line for line in lines if 'Error' in line] or lines
+            report[name] = {'error': errors[-1]}
+            print(f"{name:<20} failed: {report[name]['error']}")
+            continue
+        breakdown = ', '.join(f"{k}={v * 1000:.0f}ms" for k, v in report[name]['components'].items())
+        print(f"{name:<20} {report[name]['process_s'] * 1000:8.0f} ms  {breakdown}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+"""
+End-to-end benchmark suite on a synthetic wiki-like corpus.
+
+Stages (each in a fresh process, so peak RSS is per stage):
+    crawl     crawl the corpus from a local stub HTTP server (pages/s)
+    index     InvertedIndex.build_index (docs/s, peak RSS)
+    pagerank  PageRank.compute_pagerank (seconds)
+    query     QueryEngine.search under a concurrent, replayable workload
+              (p50/p95/p99 latency, queries/s)
+
+Without the crawl stage the corpus is written straight to disk. The query
+workload is saved next to the report so a later run can replay it with
+--workload. Results are written as JSON; --compare prints the change
+against an earlier report.
+
+    python -m benchmarks.suite --pages 2000 --queries 2000 --threads 8 --json run.json
+    python -m benchmarks.suite --stages index,query --workload run.workload.json --compare run.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from benchmarks import corpus
+
+STAGES = ('crawl', 'index', 'pagerank', 'query')
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 2**10
+
+
+def percentiles(latencies):
+    return {f'p{p}_ms': float(np.percentile(latencies, p)) for p in (50, 95, 99)}
+
+
+# -- Stages (run in a child process with STORAGE_PATH set) --
+
+def stage_crawl(args):
+    import logging
+    from boogle.config import Config
+
+    logging.getLogger().setLevel(logging.WARNING)
+    pages = corpus.generate(corpus.CorpusSpec(pages=args.pages, seed=args.seed))
+    server, base_url = corpus.serve(pages)
+
+    # Seed with a handful of pages; the crawler discovers the rest through links
+    Config.SEED_URLS = [base_url + path for path in list(pages)[:5]]
+    Config.CRAWL_POLITENESS_DELAY = 0
+    Config.CRAWL_MAX_PAGES_PER_HOUR = Config.CRAWL_MAX_PAGES_PER_DAY = 10**9
+    from boogle.crawler.crawler import BoundedCrawler
+
+    crawler = BoundedCrawler()
+    start = time.perf_counter()
+    crawler.run_continuous(max_pages=args.pages, stop_when_empty=True)
+    elapsed = time.perf_counter() - start
+    server.shutdown()
+
+    crawled = len(crawler.link_graph)
+    return {
+        'pages': crawled,
+        'corpus_pages': len(pages),
+        'seconds': elapsed,
+        'pages_per_s': crawled / elapsed if elapsed else 0.0,
+        'links': sum(len(links) for links in crawler.link_graph.values()),
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def stage_index(args):
+    from boogle.indexer.inverted_index import InvertedIndex
+
+    indexer = InvertedIndex()
+    start = time.perf_counter()
+    indexer.build_index()
+    elapsed = time.perf_counter() - start
+    return {
+        'docs': len(indexer.doc_metadata),
+        'terms': len(indexer.index),
+        'seconds': elapsed,
+        'docs_per_s': len(indexer.doc_metadata) / elapsed if elapsed else 0.0,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def stage_pagerank(args):
+    from boogle.ranker.pagerank import PageRank
+
+    start = time.perf_counter()
+    PageRank().compute_pagerank()
+    return {'seconds': time.perf_counter() - start, 'peak_rss_mb': peak_rss_mb()}
+
+
+def make_workload(engine, n, seed):
+    """
+    Queries drawn from indexed titles and vocabulary. A pool of distinct
+    queries is replayed with Zipf-distributed repeats, like real traffic,
+    so the caches see a realistic hit rate.
+    """
+    rng = random.Random(seed)
+    titles = sorted(meta['title'] for meta in engine.indexer.doc_metadata.values() if meta.get('title'))
+    vocabulary = sorted(engine.spelling_corrector.vocabulary, key=lambda w: -engine.spelling_corrector.vocabulary[w])[:5000]
+    pool = []
+    for _ in range(max(1, n // 4)):
+        kind = rng.random()
+        if kind < 0.4 and titles:
+            pool.append(' '.join(rng.choice(titles).split()[:2]).lower())
+        elif vocabulary:
+            pool.append(' '.join(rng.sample(vocabulary, min(len(vocabulary), rng.randint(1, 3)))))
+    weights = [1.0 / (rank + 1) for rank in range(len(pool))]
+    return rng.choices(pool, weights, k=n) if pool else []
+
+
+def stage_query(args):
+    from boogle.query_engine.engine import QueryEngine
+
+    engine = QueryEngine()
+    engine.autocomplete.log_size = 0 # keep benchmark queries out of the typeahead log
+    start = time.perf_counter()
+    engine.warm_up()
+    warm_up_s = time.perf_counter() - start
+
+    if args.workload and os.path.exists(args.workload):
+        with open(args.workload, 'r') as f:
+            queries = json.load(f)['queries']
+    else:
+        queries = make_workload(engine, args.queries, args.seed)
+        if args.workload:
+            with open(args.workload, 'w') as f:
+                json.dump({'seed': args.seed, 'queries': queries}, f)
+    if not queries:
+        return {'error': 'empty workload (no index?)'}
+
+    latencies = [[] for _ in range(args.threads)]
+    errors = []
+
+    def client(n):
+        # Deterministic split: thread n replays queries n, n + threads, ...
+        for query in queries[n::args.threads]:
+            begin = time.perf_counter()
+            try:
+                engine.search(query)
+            except Exception as e:
+                errors.append(repr(e))
+            latencies[n].append((time.perf_counter() - begin) * 1000)
+
+    clients = [threading.Thread(target=client, args=(n,)) for n in range(args.threads)]
+    start = time.perf_counter()
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    flat = [latency for per_thread in latencies for latency in per_thread]
+    report = {
+        'queries': len(queries),
+        'distinct_queries': len(set(queries)),
+        'threads': args.threads,
+        'qps': len(queries) / elapsed,
+        'warm_up_s': warm_up_s,
+        'errors': len(errors),
+        'cache': engine.cache_stats(),
+        'peak_rss_mb': peak_rss_mb(),
+    }
+    report.update(percentiles(flat))
+    return report
+
+
+STAGE_FUNCTIONS = {'crawl': stage_crawl, 'index': stage_index, 'pagerank': stage_pagerank, 'query': stage_query}
+
+
+# -- Orchestration --
+
+def run_stage(stage, args, storage_path):
+    command = [sys.executable, '-m', 'benchmarks.suite', '--stage', stage,
+               '--pages', str(args.pages), '--queries', str(args.queries),
+               '--threads', str(args.threads), '--seed', str(args.seed)]
+    if args.workload:
+        command += ['--workload', args.workload]
+    env = dict(os.environ, STORAGE_PATH=storage_path)
+    out = subprocess.run(command, capture_output=True, text=True, env=env)
+    if out.returncode != 0:
+        lines = (out.stderr or '').strip().splitlines()
+        return {'error': lines[-1] if lines else f'exit status {out.returncode}'}
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return None
+
+
+def compare(report, baseline):
+    """
+    Print every numeric metric that both reports have, with the relative change.
+    """
+    print(f"\nChange vs baseline ({baseline.get('commit')}):")
+    for stage, metrics in report['stages'].items():
+        old = baseline.get('stages', {}).get(stage, {})
+        for name, value in metrics.items():
+            if isinstance(value, (int, float)) and isinstance(old.get(name), (int, float)) and old[name]:
+                change = (value - old[name]) / old[name] * 100
+                print(f"  {stage:<9} {name:<16} {old[name]:12.2f} -> {value:12.2f}  ({change:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--stages', default=','.join(STAGES), help='Comma-separated subset of ' + ','.join(STAGES))
+    parser.add_argument('--pages', type=int, default=1000, help='Corpus size')
+    parser.add_argument('--queries', type=int, default=1000, help='Queries in the generated workload')
+    parser.add_argument('--threads', type=int, default=8, help='Concurrent query clients')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--storage', help='Storage path to use (default: a temporary directory)')
+    parser.add_argument('--workload', help='Query workload JSON to replay (written if missing)')
+    parser.add_argument('--json', help='Write the report to this path')
+    parser.add_argument('--compare', help='Earlier report to compare against')
+    parser.add_argument('--stage', choices=STAGES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.stage:
+        # Child process: run one stage and print its result as the last line
+        print(json.dumps(STAGE_FUNCTIONS[args.stage](args)))
+        return
+
+    stages = [stage.strip() for stage in args.stages.split(',') if stage.strip()]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(sorted(unknown))}")
+    if args.workload is None and args.json:
+        args.workload = os.path.splitext(args.json)[0] + '.workload.json'
+
+    tmp = None
+    storage_path = args.storage
+    if storage_path is None:
+        tmp = tempfile.TemporaryDirectory(prefix='boogle-bench-')
+        storage_path = tmp.name
+    if 'crawl' not in stages and not os.path.exists(os.path.join(storage_path, 'url_map.json')):
+        corpus.write(corpus.generate(corpus.CorpusSpec(pages=args.pages, seed=args.seed)), storage_path)
+
+    report = {
+        'commit': git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'args': {k: v for k, v in vars(args).items() if k not in ('stage', 'compare', 'json')},
+        'stages': {},
+    }
+    for stage in (s for s in STAGES if s in stages):
+        result = run_stage(stage, args, storage_path)
+        report['stages'][stage] = result
+        summary = ', '.join(f"{k}={v:.2f}" if isinstance(v, float) else f"{k}={v}"
+                            for k, v in result.items() if not isinstance(v, dict))
+        print(f"{stage:<9} {summary}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            compare(report, json.load(f))
+    if tmp is not None:
+        tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
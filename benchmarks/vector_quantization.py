@@ -0,0 +1,105 @@
+"""
+Compare vector storage modes: memory, recall@10 against exact search and query latency.
+
+    python -m benchmarks.vector_quantization              # uses stored embeddings if present
+    python -m benchmarks.vector_quantization --synthetic 50000
+"""
+import argparse
+import json
+import os
+import time
+import numpy as np
+import faiss
+from boogle.config import Config
+from boogle.vectors.store import build_faiss_index, search_index
+
+
+def synthetic_vectors(n, dimension=384, clusters=200, seed=0):
+    """Clustered unit vectors, closer to real sentence embeddings than pure noise."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dimension)).astype(np.float32)
+    labels = rng.integers(0, clusters, n)
+    vectors = centers[labels] + 0.6 * rng.standard_normal((n, dimension)).astype(np.float32)
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def make_queries(vectors, n, seed=1):
+    rng = np.random.default_rng(seed)
+    picks = rng.integers(0, len(vectors), n)
+    queries = vectors[picks] + 0.3 * rng.standard_normal((n, vectors.shape[1])).astype(np.float32)
+    queries = np.ascontiguousarray(queries, dtype=np.float32)
+    faiss.normalize_L2(queries)
+    return queries
+
+
+def recall_at_k(truth, found, k):
+    hits = sum(len(set(t[:k]) & set(f[:k])) for t, f in zip(truth, found))
+    return hits / (len(truth) * k)
+
+
+def run(vectors, num_queries=200, k=10, rerank_factor=4):
+    queries = make_queries(vectors, num_queries)
+    truth = build_faiss_index('flat', vectors).search(queries, k)[1]
+
+    report = []
+    for mode in ('flat', 'fp16', 'sq8', 'pq'):
+        start = time.perf_counter()
+        index = build_faiss_index(mode, vectors)
+        build_time = time.perf_counter() - start
+        index_bytes = int(faiss.serialize_index(index).size)
+
+        for rerank in (False, True):
+            if rerank and mode == 'flat':
+                continue
+            full_vectors = vectors if rerank else None
+            latencies = []
+            found = []
+            for q in queries:
+                start = time.perf_counter()
+                _, indices = search_index(index, q.reshape(1, -1), k, full_vectors, rerank_factor)
+                latencies.append((time.perf_counter() - start) * 1000)
+                found.append(indices[0])
+
+            report.append({
+                'mode': mode + ('+rerank' if rerank else ''),
+                'vectors': len(vectors),
+                'index_mb': round(index_bytes / 2**20, 3),
+                'bytes_per_vector': round(index_bytes / len(vectors), 1),
+                'side_file_mb': round(vectors.nbytes / 2**20, 3) if rerank else 0.0,
+                'build_s': round(build_time, 3),
+                'recall@%d' % k: round(recall_at_k(truth, found, k), 4),
+                'p50_ms': round(float(np.percentile(latencies, 50)), 3),
+                'p99_ms': round(float(np.percentile(latencies, 99)), 3),
+            })
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--synthetic', type=int, default=0, help='Use N synthetic vectors instead of stored embeddings')
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--rerank-factor', type=int, default=Config.VECTOR_RERANK_FACTOR)
+    parser.add_argument('--json', help='Write the report to this path')
+    args = parser.parse_args()
+
+    stored = os.path.join(Config.STORAGE_PATH, 'vectors', 'embeddings.npy')
+    if not args.synthetic and os.path.exists(stored):
+        vectors = np.ascontiguousarray(np.load(stored), dtype=np.float32)
+    else:
+        vectors = synthetic_vectors(args.synthetic or 20000)
+
+    report = run(vectors, num_queries=args.queries, rerank_factor=args.rerank_factor)
+
+    header = list(report[0].keys())
+    print('  '.join(f"{h:>16}" for h in header))
+    for row in report:
+        print('  '.join(f"{str(row[h]):>16}" for h in header))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+Query throughput and memory of N forked search workers over the index in
+STORAGE_PATH, the way gunicorn runs SERVE_WORKERS:
+
+    preload      the parent loads the engine (QueryEngine.preload) and
+                 freezes the GC before forking, as with SERVE_PRELOAD=true
+    independent  every worker loads its own engine after the fork
+
+Workers run uncached searches (result and embedding caches off) from one
+shared start signal for --duration seconds. Reported per worker count:
+total queries/s, scaling efficiency vs one worker, and per-worker USS
+(private memory), PSS and RSS from /proc/<pid>/smaps_rollup (Linux only).
+
+    python -m benchmarks.workers --workers 1,2,4 --duration 10
+"""
+import argparse
+import gc
+import json
+import os
+import time
+
+from benchmarks.suite import make_workload
+from boogle import metrics
+from boogle.config import Config
+
+MB = 1024 * 1024
+
+
+def load_engine():
+    from boogle.query_engine.engine import QueryEngine
+
+    engine = QueryEngine()
+    engine.autocomplete.log_size = 0 # keep benchmark queries out of the typeahead log
+    return engine
+
+
+def worker(engine, n, workers, args, ready, go):
+    """Body of one forked worker; writes its report to the `ready` pipe."""
+    if engine is None:
+        engine = load_engine()
+    if Config.VECTOR_ENCODER_THREADS == 0 and workers > 1:
+        # As gunicorn.conf.py does: split the cores between workers
+        Config.VECTOR_ENCODER_THREADS = max(1, (os.cpu_count() or 1) // workers)
+    engine.warm_up()
+    queries = make_workload(engine, args.queries, args.seed)[n::workers]
+
+    os.write(ready, b'r')
+    os.read(go, 1)
+    count = 0
+    end = time.perf_counter() + args.duration
+    while queries and time.perf_counter() < end:
+        engine.search(queries[count % len(queries)])
+        count += 1
+    report = {'queries': count, 'memory': metrics.process_memory()}
+    os.write(ready, json.dumps(report).encode('utf-8'))
+
+
+def run(mode, workers, args):
+    engine = None
+    if mode == 'preload':
+        engine = load_engine()
+        engine.preload()
+        gc.freeze()
+
+    go_read, go_write = os.pipe()
+    children = []
+    for n in range(workers):
+        ready_read, ready_write = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            status = 0
+            try:
+                os.close(ready_read)
+                worker(engine, n, workers, args, ready_write, go_read)
+            except BaseException:
+                import traceback
+                traceback.print_exc()
+                status = 1
+            finally:
+                os._exit(status)
+        os.close(ready_write)
+        children.append((pid, ready_read))
+
+    for _, ready in children:
+        os.read(ready, 1)
+    start = time.perf_counter()
+    os.write(go_write, b'g' * workers)
+
+    reports = []
+    for pid, ready in children:
+        chunks = []
+        while True:
+            chunk = os.read(ready, 65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+        os.close(ready)
+        os.waitpid(pid, 0)
+        if chunks:
+            reports.append(json.loads(b''.join(chunks)))
+    elapsed = time.perf_counter() - start
+    os.close(go_read)
+    os.close(go_write)
+    if engine is not None:
+        gc.unfreeze()
+
+    if len(reports) < workers:
+        return {'error': f"{workers - len(reports)} worker(s) failed"}
+
+    def mean(kind):
+        return sum(report['memory'].get(kind, 0) for report in reports) / len(reports) / MB
+
+    return {
+        'qps': sum(report['queries'] for report in reports) / elapsed,
+        'uss_mb': mean('uss'),
+        'pss_mb': mean('pss'),
+        'rss_mb': mean('rss'),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', default='1,2,4', help='Comma-separated worker counts')
+    parser.add_argument('--modes', default='independent,preload')
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds of searching per run')
+    parser.add_argument('--queries', type=int, default=2000, help='Workload size')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help='Write the report to this path')
+    args = parser.parse_args()
+
+    # Measure search work, not cache hits
+    Config.QUERY_CACHE_SIZE = 0
+    Config.EMBEDDING_CACHE_SIZE = 0
+
+    # Checked on disk: an engine loaded here would be inherited by the
+    # independent workers
+    if not os.path.exists(os.path.join(Config.STORAGE_PATH, 'index', 'doc_metadata.json')):
+        print("No index found in STORAGE_PATH; build one first.")
+        return
+
+    report = {}
+    # Independent runs first, before any engine has been loaded in this process
+    print(f"{'mode':<12} {'workers':>7} {'qps':>9} {'scaling':>8} {'USS MB':>8} {'PSS MB':>8} {'RSS MB':>8}")
+    for mode in args.modes.split(','):
+        report[mode] = {}
+        single = None
+        for workers in (int(n) for n in args.workers.split(',')):
+            row = report[mode][workers] = run(mode, workers, args)
+            if 'error' in row:
+                print(f"{mode:<12} {workers:>7} {row['error']}")
+                continue
+            if single is None and workers == 1:
+                single = row['qps']
+            row['scaling'] = row['qps'] / (single * workers) if single else None
+            scaling = f"{row['scaling']:8.0%}" if single else f"{'-':>8}"
+            print(f"{mode:<12} {workers:>7} {row['qps']:9.1f} {scaling} "
+                  f"{row['uss_mb']:8.1f} {row['pss_mb']:8.1f} {row['rss_mb']:8.1f}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -12,12 +12,112 @@ class Config:
     RANKING_BETA = float(os.getenv('RANKING_BETA', 0.4))
     TITLE_WEIGHT = float(os.getenv('TITLE_WEIGHT', 5.0))
     FLASK_PORT = int(os.getenv('FLASK_PORT', 5000))
+    # Query caches (entries are keyed by index version, so a rebuilt index never serves stale hits)
+    QUERY_CACHE_SIZE = int(os.getenv('QUERY_CACHE_SIZE', 1024))
+    EMBEDDING_CACHE_SIZE = int(os.getenv('EMBEDDING_CACHE_SIZE', 4096))
+    SNIPPET_CACHE_SIZE = int(os.getenv('SNIPPET_CACHE_SIZE', 8192))
+    QUERY_CACHE_TTL = float(os.getenv('QUERY_CACHE_TTL', 600))  # seconds, 0 = no expiry
+    # Per-term doc-id lists (conjunctions, tf lookups) and champion lists kept, each an LRU; unknown terms are not cached
+    TERM_CACHE_SIZE = int(os.getenv('TERM_CACHE_SIZE', 4096))
+    # Seconds between checks (two stats, before a search) for a rebuilt index or PageRank,
+    # which are then reloaded and the query caches missed (0 = check before every search)
+    INDEX_CHECK_INTERVAL = float(os.getenv('INDEX_CHECK_INTERVAL', 2))
+
+    # Tiered postings: plain queries score only each term's top CHAMPION_LIST_SIZE docs by
+    # BM25 weight + PageRank (0 = score every posting), then the rest if fewer than
+    # CHAMPION_MIN_RESULTS docs matched
+    CHAMPION_LIST_SIZE = int(os.getenv('CHAMPION_LIST_SIZE', 500))
+    CHAMPION_MIN_RESULTS = int(os.getenv('CHAMPION_MIN_RESULTS', 50))
+
+    # Ranked result sets kept for /api/search cursors (LRU, expire after the TTL in seconds)
+    RESULT_SET_SIZE = int(os.getenv('RESULT_SET_SIZE', 1024))
+    RESULT_SET_TTL = float(os.getenv('RESULT_SET_TTL', 900))
+
+    SNIPPET_WORDS = int(os.getenv('SNIPPET_WORDS', 40))
+
+    # Threads shared by concurrent queries for the semantic branch
+    QUERY_THREADS = int(os.getenv('QUERY_THREADS', 4))
+    # Per-query deadline for the semantic branch; past it results are lexical-only (0 = no deadline)
+    QUERY_DEADLINE_MS = float(os.getenv('QUERY_DEADLINE_MS', 0))
+    # Concurrent identical queries (and, in async mode, identical search requests) share one computation
+    QUERY_COALESCE = os.getenv('QUERY_COALESCE', 'true').lower() == 'true'
+
+    # Threads per server worker (SERVE_MODE=async: threads that run request handlers off the event loop).
+    # Most of them only wait for an admission slot, where their queueing time can be measured
+    SERVE_THREADS = int(os.getenv('SERVE_THREADS', 16))
+
+    # Admission control: searches that queued (in the server, then for one of ADMISSION_SLOTS
+    # concurrent search slots; 0 = no limit) longer than ADMISSION_MAX_WAIT_MS get a fast 503
+    # (0 = never shed). Queue time spends the QUERY_BUDGET_MS latency budget, and searches that
+    # used more of it run at cheaper tiers (boogle/query_engine/admission.py; 0 = always full).
+    # gunicorn (SERVE_MODE=threaded) does not report how long a request waited for a thread, so
+    # the slots are kept below SERVE_THREADS: the other threads queue where the wait is measured
+    ADMISSION_SLOTS = int(os.getenv('ADMISSION_SLOTS', max(1, SERVE_THREADS // 4)))
+    ADMISSION_MAX_WAIT_MS = float(os.getenv('ADMISSION_MAX_WAIT_MS', 1000))
+    QUERY_BUDGET_MS = float(os.getenv('QUERY_BUDGET_MS', 2000))
+
+    # gunicorn worker processes; with SERVE_PRELOAD the index and model are loaded once
+    # before fork and shared copy-on-write (gunicorn.conf.py)
+    SERVE_WORKERS = int(os.getenv('SERVE_WORKERS', 1))
+    SERVE_PRELOAD = os.getenv('SERVE_PRELOAD', 'false').lower() == 'true'
+
+    # Fraction of searches whose per-stage timings feed /metrics (debug=1 always traces)
+    TRACE_SAMPLE_RATE = float(os.getenv('TRACE_SAMPLE_RATE', 0.1))
+
+    # Most queries accepted by one POST /api/search/batch request
+    BATCH_MAX_QUERIES = int(os.getenv('BATCH_MAX_QUERIES', 256))
+
+    # Typeahead: completions per /suggest request, and how many distinct past queries to keep (0 = no query log)
+    AUTOCOMPLETE_K = int(os.getenv('AUTOCOMPLETE_K', 8))
+    QUERY_LOG_SIZE = int(os.getenv('QUERY_LOG_SIZE', 10000))
+
+    # Load the embedding model etc. at server start: background, sync or off
+    WARMUP = os.getenv('WARMUP', 'background').lower()
     
+    # Index build: collapse near-duplicate pages (SimHash fingerprints of word bigrams within
+    # DEDUP_MAX_DISTANCE of 64 bits, see boogle/indexer/simhash.py) into one canonical doc
+    INDEX_DEDUP = os.getenv('INDEX_DEDUP', 'true').lower() == 'true'
+    DEDUP_MAX_DISTANCE = int(os.getenv('DEDUP_MAX_DISTANCE', 6))
+
+    # PageRank power iteration: stop when the L1 change drops below N * tolerance
+    PAGERANK_TOLERANCE = float(os.getenv('PAGERANK_TOLERANCE', 1e-6))
+    PAGERANK_MAX_ITER = int(os.getenv('PAGERANK_MAX_ITER', 100))
+    # Start from the previous scores and push residuals around new pages/links instead of a cold run
+    PAGERANK_INCREMENTAL = os.getenv('PAGERANK_INCREMENTAL', 'true').lower() == 'true'
+
     # Crawler Budgets
     CRAWL_MAX_PAGES_PER_HOUR = int(os.getenv('CRAWL_MAX_PAGES_PER_HOUR', 100))
     CRAWL_MAX_PAGES_PER_DAY = int(os.getenv('CRAWL_MAX_PAGES_PER_DAY', 1000))
     CRAWL_MAX_TOTAL_STORAGE_MB = int(os.getenv('CRAWL_MAX_TOTAL_STORAGE_MB', 500))
     CRAWL_POLITENESS_DELAY = float(os.getenv('CRAWL_POLITENESS_DELAY', 2.0))
+    # Frontier order: opic (online page importance), inlinks (in-link count) or fixed (seeds first, then URL order)
+    CRAWL_PRIORITY = os.getenv('CRAWL_PRIORITY', 'opic')
+    # Seconds between crawl_metrics.json/.prom snapshots read by /status and /metrics
+    CRAWL_METRICS_INTERVAL = float(os.getenv('CRAWL_METRICS_INTERVAL', 5.0))
+
+    # Vector Store
+    # Index type: flat (float32), fp16, sq8 (int8 scalar quantization) or pq (product quantization)
+    VECTOR_INDEX_TYPE = os.getenv('VECTOR_INDEX_TYPE', 'flat')
+    VECTOR_PQ_M = int(os.getenv('VECTOR_PQ_M', 48))  # PQ sub-quantizers, must divide 384
+    VECTOR_RERANK = os.getenv('VECTOR_RERANK', 'false').lower() == 'true'
+    VECTOR_RERANK_FACTOR = int(os.getenv('VECTOR_RERANK_FACTOR', 4))
+    VECTOR_BATCH_SIZE = int(os.getenv('VECTOR_BATCH_SIZE', 64))
+    # Encode batches on a background thread while the indexer parses HTML
+    VECTOR_ENCODE_THREAD = os.getenv('VECTOR_ENCODE_THREAD', 'true').lower() == 'true'
+    # Reuse embeddings of unchanged text across index rebuilds
+    VECTOR_EMBEDDING_CACHE = os.getenv('VECTOR_EMBEDDING_CACHE', 'true').lower() == 'true'
+    # Passage mode: embed every fixed window of the clean text instead of title + first paragraph
+    VECTOR_PASSAGE_MODE = os.getenv('VECTOR_PASSAGE_MODE', 'false').lower() == 'true'
+    VECTOR_PASSAGE_TOKENS = int(os.getenv('VECTOR_PASSAGE_TOKENS', 128))
+    VECTOR_PASSAGE_STRIDE = int(os.getenv('VECTOR_PASSAGE_STRIDE', 96))
+    VECTOR_MAX_PASSAGES = int(os.getenv('VECTOR_MAX_PASSAGES', 64))
+    VECTOR_PASSAGE_OVERFETCH = int(os.getenv('VECTOR_PASSAGE_OVERFETCH', 5))
+    # Query encoder: torch (fp32 reference), torch-int8 (dynamic quantization) or onnx (onnxruntime)
+    VECTOR_QUERY_BACKEND = os.getenv('VECTOR_QUERY_BACKEND', 'torch')
+    VECTOR_ENCODER_THREADS = int(os.getenv('VECTOR_ENCODER_THREADS', 0))  # 0 = library default
+    # Check non-reference backends against torch at load and fall back if scores drift
+    VECTOR_PARITY_CHECK = os.getenv('VECTOR_PARITY_CHECK', 'true').lower() == 'true'
+    VECTOR_PARITY_TOLERANCE = float(os.getenv('VECTOR_PARITY_TOLERANCE', 0.03))
 
     # Ensure storage directories exist
     @staticmethod
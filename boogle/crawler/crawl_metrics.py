@@ -0,0 +1,104 @@
+import json
+import os
+import time
+from boogle import metrics
+from boogle.config import Config
+
+# Fetch latency buckets in seconds (requests time out after 10s)
+FETCH_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class CrawlMetrics:
+    """
+    Counters and histograms of one crawler process (since it started), on
+    a registry of their own. Every CRAWL_METRICS_INTERVAL seconds `write`
+    publishes a small fixed-size snapshot to crawl_metrics.json for the
+    /status dashboard, and the Prometheus text to crawl_metrics.prom,
+    which the web app's /metrics appends.
+    """
+    def __init__(self, storage_path=None):
+        storage_path = storage_path or Config.STORAGE_PATH
+        self.json_path = os.path.join(storage_path, 'crawl_metrics.json')
+        self.prom_path = os.path.join(storage_path, 'crawl_metrics.prom')
+        self.interval = Config.CRAWL_METRICS_INTERVAL
+
+        self.registry = metrics.Registry()
+        self.fetch_seconds = self.registry.histogram('boogle_crawl_fetch_seconds', 'Page fetch latency per host',
+                                                     label='host', buckets=FETCH_BUCKETS)
+        self.parse_seconds = self.registry.histogram('boogle_crawl_parse_seconds', 'HTML parse time per page')
+        self.links_seconds = self.registry.histogram('boogle_crawl_link_extraction_seconds',
+                                                     'Link extraction time per page')
+        self.pages = self.registry.counter('boogle_crawl_pages_total', 'Pages fetched and stored')
+        self.fetch_errors = self.registry.counter('boogle_crawl_fetch_errors_total',
+                                                  'Failed fetches by HTTP status or exception', label='reason')
+        self.bytes_stored = self.registry.counter('boogle_crawl_bytes_stored_total', 'Bytes of raw pages written')
+        self.robots_cache = self.registry.counter('boogle_crawl_robots_cache_total',
+                                                  'robots.txt cache lookups (hit, miss)', label='result')
+        self.wait_seconds = self.registry.counter('boogle_crawl_wait_seconds_total',
+                                                  'Time spent sleeping (politeness, budget, idle)', label='reason')
+        self.queue_depth = self.registry.gauge('boogle_crawl_queue_depth', 'URLs in the frontier')
+
+        self.started = time.time()
+        self.last_write = None # time of the last snapshot
+        self.marks = [] # (time, pages) of recent snapshots, for the recent rate
+
+    def sleep(self, seconds, reason):
+        time.sleep(seconds)
+        self.wait_seconds.inc(seconds, reason)
+
+    def snapshot(self, queue_depth):
+        now = time.time()
+        pages = self.pages.values.get(None, 0)
+        # Rate since the latest snapshot at least an interval old
+        recent = None
+        while len(self.marks) > 1 and self.marks[1][0] <= now - self.interval:
+            self.marks.pop(0)
+        if self.marks and now > self.marks[0][0]:
+            recent = (pages - self.marks[0][1]) / (now - self.marks[0][0])
+        robots = self.robots_cache.values
+        lookups = robots.get('hit', 0) + robots.get('miss', 0)
+        return {
+            'updated': now,
+            'started': self.started,
+            'pages': pages,
+            'pages_per_s': pages / max(now - self.started, 1e-9),
+            'recent_pages_per_s': recent,
+            'queue_depth': queue_depth,
+            'bytes_stored': self.bytes_stored.values.get(None, 0),
+            'fetch': {host: self.fetch_seconds.summary(host) for host in sorted(self.fetch_seconds.series)},
+            'fetch_errors': dict(self.fetch_errors.values),
+            'parse': self.parse_seconds.summary(),
+            'link_extraction': self.links_seconds.summary(),
+            'robots_cache': {
+                'hits': robots.get('hit', 0),
+                'misses': robots.get('miss', 0),
+                'hit_rate': robots.get('hit', 0) / lookups if lookups else 0.0,
+            },
+            'wait_seconds': dict(self.wait_seconds.values),
+        }
+
+    def maybe_write(self, queue_depth):
+        if self.last_write is None or time.time() - self.last_write >= self.interval:
+            self.write(queue_depth)
+
+    def write(self, queue_depth):
+        self.queue_depth.set(queue_depth)
+        snapshot = self.snapshot(queue_depth)
+        # Written next to the target and renamed over it, so readers never see half a file
+        for path, text in ((self.json_path, json.dumps(snapshot)), (self.prom_path, self.registry.render())):
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                f.write(text)
+            os.replace(tmp_path, path)
+        self.last_write = snapshot['updated']
+        self.marks.append((self.last_write, snapshot['pages']))
+
+
+def load_snapshot(storage_path=None):
+    """The last crawl_metrics.json snapshot, or None."""
+    path = os.path.join(storage_path or Config.STORAGE_PATH, 'crawl_metrics.json')
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
@@ -10,6 +10,7 @@ from boogle.config import Config
 from boogle.crawler.state_manager import CrawlStateManager
 from boogle.crawler.scheduler import CrawlScheduler
 from boogle.crawler.politeness import DomainPolicer
+from boogle.crawler.crawl_metrics import CrawlMetrics
 
 # Setup logging
 logging.basicConfig(
@@ -22,11 +23,14 @@ class BoundedCrawler:
     def __init__(self):
         Config.init_storage()
         
+        self.metrics = CrawlMetrics()
         self.state_manager = CrawlStateManager()
         self.scheduler = CrawlScheduler()
-        self.policer = DomainPolicer()
+        self.policer = DomainPolicer(self.metrics)
         
-        self.link_graph = {} # Basic in-memory graph, could be flushed to disk
+        self.link_graph_path = os.path.join(Config.STORAGE_PATH, 'link_graph.json')
+        self.link_graph = self.load_link_graph() # url -> [out-link urls], input of PageRank
+        self.seed_domains = {self.get_domain(s) for s in Config.SEED_URLS}
         self.max_depth = Config.MAX_DEPTH
         self.max_pages = Config.MAX_PAGES
         
@@ -35,7 +39,7 @@ class BoundedCrawler:
             logging.info("Queue empty. Loading seeds...")
             for url in Config.SEED_URLS:
                 if self.is_valid_url(url):
-                    self.scheduler.add_url(url, priority=1)
+                    self.scheduler.add_seed(url)
 
     def normalize_url(self, url):
         parsed = urlparse(url)
@@ -50,6 +54,7 @@ class BoundedCrawler:
         filename = os.path.join(Config.STORAGE_PATH, 'raw', f"{url_hash}.html")
         with open(filename, 'w', encoding='utf-8') as f:
             f.write(content)
+        self.metrics.bytes_stored.inc(os.path.getsize(filename))
         
         # Save metadata mapping (append/update)
         # TODO: Optimize this for scale (sqlite/key-value store)
@@ -66,6 +71,81 @@ class BoundedCrawler:
         with open(meta_path, 'w') as f:
             json.dump(mapping, f, indent=2)
 
+    def load_link_graph(self):
+        if os.path.exists(self.link_graph_path):
+            try:
+                with open(self.link_graph_path, 'r') as f:
+                    return json.load(f)
+            except:
+                pass
+        return {}
+
+    def save_link_graph(self):
+        tmp_path = self.link_graph_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.link_graph, f)
+        os.replace(tmp_path, self.link_graph_path)
+
+    def save_state(self):
+        """Persist the queue, the link graph and a metrics snapshot."""
+        self.scheduler.save_state()
+        self.save_link_graph()
+        self.metrics.write(self.scheduler.size())
+
+    def extract_links(self, url, content):
+        """
+        Normalized, valid out-links of a page that stay on the seed domains.
+        """
+        start = time.perf_counter()
+        soup = BeautifulSoup(content, 'html.parser')
+        parsed = time.perf_counter()
+        links = []
+        seen = set()
+        for a_tag in soup.find_all('a', href=True):
+            normalized = self.normalize_url(urljoin(url, a_tag['href']))
+            if normalized in seen:
+                continue
+            seen.add(normalized)
+            # Stick to seed domains for now
+            if self.is_valid_url(normalized) and self.get_domain(normalized) in self.seed_domains:
+                links.append(normalized)
+        self.metrics.parse_seconds.observe(parsed - start)
+        self.metrics.links_seconds.observe(time.perf_counter() - parsed)
+        return links
+
+    def process_page(self, url, content):
+        """
+        Store a fetched page, record its out-links in the link graph and
+        queue them. Returns the number of links found.
+        """
+        self.save_page(url, content)
+        self.state_manager.increment_counters()
+        self.metrics.pages.inc()
+
+        links = self.extract_links(url, content)
+        self.link_graph[url] = links
+        self.scheduler.add_links(url, links)
+        return len(links)
+
+    def crawl_url(self, url):
+        """
+        Fetch one URL and process it. Returns True if the page was stored.
+        """
+        self.policer.record_access(url)
+        start = time.perf_counter()
+        try:
+            response = requests.get(url, timeout=10, headers={'User-Agent': 'BoogleBot/1.0'})
+        finally:
+            self.metrics.fetch_seconds.observe(time.perf_counter() - start, self.get_domain(url))
+        if response.status_code != 200:
+            logging.warning(f"Failed to fetch {url}: Status {response.status_code}")
+            self.metrics.fetch_errors.inc(1, str(response.status_code))
+            return False
+
+        links_found = self.process_page(url, response.text)
+        logging.info(f"Saved {url}. Found {links_found} links. Budget: {self.state_manager.state['hourly_count']}/{Config.CRAWL_MAX_PAGES_PER_HOUR}")
+        return True
+
     def is_valid_url(self, url):
         parsed = urlparse(url)
         if not bool(parsed.netloc) or not bool(parsed.scheme):
@@ -93,23 +173,32 @@ class BoundedCrawler:
                 
         return True
 
-    def run_continuous(self):
+    def run_continuous(self, max_pages=None, stop_when_empty=False):
+        """
+        Crawl until interrupted, or until `max_pages` pages were stored or
+        (with stop_when_empty) the queue runs dry.
+        """
         logging.info("Starting Bounded Continuous Crawler...")
         print("Crawler started. Press Ctrl+C to stop.")
         
-        while True:
+        stored = 0
+        while max_pages is None or stored < max_pages:
+            self.metrics.maybe_write(self.scheduler.size())
+
             # 1. Budget Check
             allowed, wait_time = self.state_manager.check_budget()
             if not allowed:
                 logging.warning(f"Budget exhausted. Sleeping for {wait_time:.1f}s...")
-                time.sleep(wait_time)
+                self.metrics.sleep(wait_time, 'budget')
                 continue
                 
             # 2. Get Next URL
             url, priority = self.scheduler.get_next_url()
             if not url:
+                if stop_when_empty:
+                    break
                 logging.info("Queue empty. Waiting for new seeds or restart...")
-                time.sleep(10)
+                self.metrics.sleep(10, 'idle')
                 continue
                 
             # 3. Politeness Check
@@ -125,50 +214,24 @@ class BoundedCrawler:
                 # Let's just sleep briefly if rate limited to allow progress, 
                 # or better: simple sleep here since we are single-threaded.
                 if "Rate limit" in reason:
-                   time.sleep(0.5) # Mini wait
+                   self.metrics.sleep(0.5, 'politeness') # Mini wait
                    # Put back in queue? Or just drop to avoid stuck loop? 
                    # Let's drop for now or implementation gets complex with re-queuing delays.
                 continue
             
-            # 4. Fetch
-            logging.info(f"Crawling: {url} (Priority: {priority})")
+            # 4. Fetch, store, extract links
+            logging.info(f"Crawling: {url} (Priority: {priority:g})")
             try:
-                self.policer.record_access(url)
-                response = requests.get(url, timeout=10, headers={'User-Agent': 'BoogleBot/1.0'})
-                
-                if response.status_code == 200:
-                    content = response.text
-                    self.save_page(url, content)
-                    self.state_manager.increment_counters()
-                    
-                    # 5. Extract Links
-                    soup = BeautifulSoup(content, 'html.parser')
-                    links_found = 0
-                    
-                    seed_domains = {self.get_domain(s) for s in Config.SEED_URLS}
-                    
-                    for a_tag in soup.find_all('a', href=True):
-                        href = a_tag['href']
-                        full_url = urljoin(url, href)
-                        normalized = self.normalize_url(full_url)
-                        
-                        if self.is_valid_url(normalized):
-                            # Stick to seed domains for now
-                            if self.get_domain(normalized) in seed_domains:
-                                self.scheduler.add_url(normalized, priority=10) # Standard priority
-                                links_found += 1
-                                
-                    logging.info(f"Saved {url}. Found {links_found} links. Budget: {self.state_manager.state['hourly_count']}/{Config.CRAWL_MAX_PAGES_PER_HOUR}")
-                    
-                    # Save queue periodically
+                if self.crawl_url(url):
+                    stored += 1
+                    # Save queue and link graph periodically
                     if self.state_manager.state['total_pages_crawled'] % 10 == 0:
-                        self.scheduler.save_state()
-                        
-                else:
-                    logging.warning(f"Failed to fetch {url}: Status {response.status_code}")
-                    
+                        self.save_state()
             except Exception as e:
                 logging.error(f"Error crawling {url}: {e}")
+                self.metrics.fetch_errors.inc(1, type(e).__name__)
+
+        self.save_state()
 
 if __name__ == "__main__":
     crawler = BoundedCrawler()
@@ -176,5 +239,5 @@ if __name__ == "__main__":
         crawler.run_continuous()
     except KeyboardInterrupt:
         print("\nStopping crawler...")
-        crawler.scheduler.save_state()
+        crawler.save_state()
         print("State saved.")
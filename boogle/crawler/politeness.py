@@ -4,7 +4,8 @@ from urllib.parse import urlparse
 from boogle.config import Config
 
 class DomainPolicer:
-    def __init__(self):
+    def __init__(self, metrics=None):
+        self.metrics = metrics # CrawlMetrics, counts robots.txt cache hits and misses
         self.robots_cache = {} # domain -> RobotFileParser
         self.last_access = {} # domain -> timestamp
         self.default_delay = Config.CRAWL_POLITENESS_DELAY
@@ -16,6 +17,8 @@ class DomainPolicer:
         domain = self.get_domain(url)
         
         # Check Robots.txt
+        if self.metrics is not None:
+            self.metrics.robots_cache.inc(1, 'hit' if domain in self.robots_cache else 'miss')
         if domain not in self.robots_cache:
             rp = urllib.robotparser.RobotFileParser()
             try:
@@ -1,67 +1,218 @@
-import heapq
+import itertools
 import os
 import json
-import time
 from boogle.config import Config
 
-class CrawlScheduler:
+
+class IndexedHeap:
+    """
+    Binary min-heap of unique items with an item -> position index, so an
+    item's key can be changed in place in O(log n) instead of pushing a
+    duplicate entry.
+    """
     def __init__(self):
+        self.items = []
+        self.keys = []
+        self.position = {}
+
+    def __len__(self):
+        return len(self.items)
+
+    def __contains__(self, item):
+        return item in self.position
+
+    def push(self, item, key):
+        """Insert item, or change its key if it is already queued."""
+        if item in self.position:
+            self.update(item, key)
+            return
+        self.items.append(item)
+        self.keys.append(key)
+        self.position[item] = len(self.items) - 1
+        self._sift_up(len(self.items) - 1)
+
+    def update(self, item, key):
+        i = self.position[item]
+        old = self.keys[i]
+        self.keys[i] = key
+        if key < old:
+            self._sift_up(i)
+        else:
+            self._sift_down(i)
+
+    def pop(self):
+        """Remove and return the (item, key) with the smallest key."""
+        item, key = self.items[0], self.keys[0]
+        last_item, last_key = self.items.pop(), self.keys.pop()
+        del self.position[item]
+        if self.items:
+            self.items[0], self.keys[0] = last_item, last_key
+            self.position[last_item] = 0
+            self._sift_down(0)
+        return item, key
+
+    def entries(self):
+        """(item, key) pairs, smallest key first."""
+        return sorted(zip(self.items, self.keys), key=lambda entry: entry[1])
+
+    def _move(self, i, item, key):
+        self.items[i] = item
+        self.keys[i] = key
+        self.position[item] = i
+
+    def _sift_up(self, i):
+        item, key = self.items[i], self.keys[i]
+        while i > 0:
+            parent = (i - 1) // 2
+            if not key < self.keys[parent]:
+                break
+            self._move(i, self.items[parent], self.keys[parent])
+            i = parent
+        self._move(i, item, key)
+
+    def _sift_down(self, i):
+        item, key = self.items[i], self.keys[i]
+        n = len(self.items)
+        while True:
+            child = 2 * i + 1
+            if child >= n:
+                break
+            if child + 1 < n and self.keys[child + 1] < self.keys[child]:
+                child += 1
+            if not self.keys[child] < key:
+                break
+            self._move(i, self.items[child], self.keys[child])
+            i = child
+        self._move(i, item, key)
+
+
+class CrawlScheduler:
+    """
+    Crawl frontier. With the `opic` strategy (On-line Page Importance
+    Computation) seeds start with 1.0 cash; a crawled page splits its cash
+    evenly over its out-links and the frontier URL holding the most cash is
+    crawled next, which approximates crawling in PageRank order. `inlinks`
+    ranks by the number of crawled pages linking to a URL, and `fixed` is
+    the original ordering (seeds at level 1, everything else at level 10).
+    """
+    STRATEGIES = ('opic', 'inlinks', 'fixed')
+
+    def __init__(self, strategy=None):
         self.queue_path = os.path.join(Config.STORAGE_PATH, 'scheduler_queue.json')
         self.seen_path = os.path.join(Config.STORAGE_PATH, 'scheduler_seen.json')
-        
-        self.queue = [] # Min-heap [(priority, url), ...]
+
+        self.strategy = strategy or Config.CRAWL_PRIORITY
+        if self.strategy not in self.STRATEGIES:
+            raise ValueError(f"Unknown crawl priority strategy: {self.strategy}")
+
+        self.queue = IndexedHeap() # url -> sort key, smallest first
+        self.value = {} # queued url -> cash / in-link count (or level for `fixed`)
         self.seen = set() # Set of checked URLs to avoid cycles
-        
+        self.popped = {} # url handed out by get_next_url -> its value
+        self.counter = itertools.count() # FIFO tie-break between equal values
+
         self.load_state()
-        
-    def add_url(self, url, priority=10):
+
+    def key(self, url, value):
+        if self.strategy == 'fixed':
+            # Lower level first; ties in URL order, as the original (priority, url) heap
+            return (value, url)
+        return (-value, next(self.counter))
+
+    def add_url(self, url, value):
         """
-        Add URL to priority queue. Lower number = higher priority.
-        Default priority 10.
-        Seeds: 1
-        High PR: 5
-        Standard: 10
+        Queue an unseen URL, or credit `value` to one that is already
+        queued. URLs that were crawled already are ignored.
         """
+        if url in self.queue:
+            if self.strategy != 'fixed':
+                self.value[url] += value
+                self.queue.update(url, self.key(url, self.value[url]))
+            return
         if url in self.seen:
             return
-            
-        heapq.heappush(self.queue, (priority, url))
         self.seen.add(url)
-        # Periodically save? For now save on exit/loop
-        
+        self.value[url] = value
+        self.queue.push(url, self.key(url, value))
+
+    def add_seed(self, url):
+        self.add_url(url, 1 if self.strategy == 'fixed' else 1.0)
+
+    def add_links(self, url, links):
+        """
+        Record the out-links of a crawled page: its cash is split over them
+        (opic), each gains one in-link (inlinks), or they are queued at the
+        standard level (fixed).
+        """
+        cash = self.popped.pop(url, 0.0)
+        if not links:
+            return
+        if self.strategy == 'opic':
+            share = cash / len(links)
+        elif self.strategy == 'inlinks':
+            share = 1.0
+        else:
+            share = 10
+        for link in links:
+            self.add_url(link, share)
+
     def get_next_url(self):
+        """
+        Pop the most important queued URL. Returns (url, value).
+        """
         if not self.queue:
             return None, None
-            
-        priority, url = heapq.heappop(self.queue)
-        return url, priority
-        
+
+        url, _ = self.queue.pop()
+        value = self.value.pop(url)
+        # The crawler is sequential: only the page being fetched can pass on cash
+        self.popped = {url: value}
+        return url, value
+
     def save_state(self):
-        # Flatten heap for JSON
+        frontier = [[url, self.value[url]] for url, _ in self.queue.entries()]
         with open(self.queue_path, 'w') as f:
-            json.dump(self.queue, f)
-            
+            json.dump({'strategy': self.strategy, 'frontier': frontier}, f)
+
         with open(self.seen_path, 'w') as f:
             # Convert set to list
             json.dump(list(self.seen), f)
-            
+
     def load_state(self):
         if os.path.exists(self.queue_path):
             try:
                 with open(self.queue_path, 'r') as f:
-                    # Convert list back to list (heapify not strictly needed if file order kept, but safe)
                     data = json.load(f)
-                    self.queue = [tuple(x) for x in data]
-                    heapq.heapify(self.queue)
+                if isinstance(data, list):
+                    # Original format: [[priority level, url], ...]
+                    data = {'strategy': 'fixed', 'frontier': [[url, level] for level, url in data]}
+                for url, value in data['frontier']:
+                    value = self.convert(value, data.get('strategy', self.strategy))
+                    self.value[url] = value
+                    self.queue.push(url, self.key(url, value))
             except:
                 pass
-                
+
         if os.path.exists(self.seen_path):
             try:
                 with open(self.seen_path, 'r') as f:
                     self.seen = set(json.load(f))
             except:
                 pass
-                
+        self.seen.update(self.value)
+
+    def convert(self, value, strategy):
+        """
+        Map a saved frontier value to the current strategy (a frontier saved
+        under another strategy keeps its relative order where possible).
+        """
+        if strategy == self.strategy:
+            return value
+        if self.strategy == 'fixed':
+            return 1 if value >= 1.0 else 10
+        if strategy == 'fixed':
+            return 1.0 / value
+        return value
+
     def size(self):
         return len(self.queue)
@@ -1,7 +1,12 @@
 import os
 import json
-from flask import Flask, render_template, request
+import time
+import threading
+from flask import Flask, Response, render_template, request, jsonify
+from boogle import metrics, startup
 from boogle.config import Config
+from boogle.crawler.crawl_metrics import load_snapshot
+from boogle.query_engine.admission import AdmissionController, Overloaded, arrival_time
 from boogle.query_engine.engine import QueryEngine
 
 app = Flask(__name__,
@@ -12,6 +17,41 @@ print("Initializing Query Engine...")
 query_engine = QueryEngine()
 print("Query Engine Ready.")
 
+def warm_up():
+    query_engine.warm_up()
+    print(startup.report())
+
+def start_warm_up():
+    if Config.WARMUP == 'sync':
+        warm_up()
+    elif Config.WARMUP == 'background':
+        threading.Thread(target=warm_up, name='warm-up', daemon=True).start()
+
+# Heavy components load lazily; warm them up so the first search is fast.
+# Under gunicorn --preload (SERVE_PRELOAD) this module is imported in the
+# master: load everything there, but leave threads and the first model run
+# to each worker (gunicorn.conf.py post_fork), since neither survives fork
+if Config.SERVE_PRELOAD:
+    query_engine.preload()
+else:
+    start_warm_up()
+
+# Sheds searches with fast 503s and degrades them under overload
+admission = AdmissionController()
+
+def admit():
+    # Arrival: accept time from the async server, else a proxy's X-Request-Start.
+    # gunicorn does not expose its accept time, so without that header only
+    # the wait for one of the ADMISSION_SLOTS (fewer than its threads) is measured
+    arrived = request.environ.get('boogle.arrived') or arrival_time(request.headers.get('X-Request-Start'))
+    return admission.admit(arrived)
+
+@app.errorhandler(Overloaded)
+def overloaded(e):
+    # Cheap on purpose: no template rendering for requests being shed
+    return Response("Too many searches right now, please retry in a moment.\n",
+                    status=503, mimetype='text/plain', headers={'Retry-After': '1'})
+
 @app.route('/')
 def home():
     return render_template('index.html')
@@ -22,24 +62,31 @@ def search():
     if not query:
         return render_template('index.html')
 
+    start_time = time.perf_counter()
     page = int(request.args.get('page', 1))
     per_page = 10
+    debug = request.args.get('debug') == '1'
+    trace = metrics.start_trace(force=debug)
 
-    results, corrected_query, was_corrected = query_engine.search(query)
-    total_results = len(results)
+    with admit() as ticket:
+        results, corrected_query, was_corrected = query_engine.search(
+            query, deadline_ms=ticket.deadline_ms(Config.QUERY_DEADLINE_MS), trace=trace, tier=ticket.tier,
+            record=page == 1)
+        total_results = len(results)
 
-    start = (page - 1) * per_page
-    end = start + per_page
-    paginated_results = results[start:end]
+        start = (page - 1) * per_page
+        end = start + per_page
+        paginated_results = results[start:end]
 
-    display_results = []
-    snippet_query = corrected_query if was_corrected else query
+        display_results = []
+        snippet_query = corrected_query if was_corrected else query
+        snippets = query_engine.get_snippets([res['doc_id'] for res in paginated_results], snippet_query, trace)
 
-    for res in paginated_results:
-        snippet = query_engine.get_snippet(res['doc_id'], snippet_query)
-        r = res.copy()
-        r['snippet'] = snippet
-        display_results.append(r)
+        for res in paginated_results:
+            r = res.copy()
+            r['snippet'] = snippets[res['doc_id']]
+            display_results.append(r)
+    trace.finish()
 
     return render_template(
         'results.html',
@@ -49,9 +96,150 @@ def search():
         results=display_results,
         page=page,
         total=total_results,
-        per_page=per_page
+        per_page=per_page,
+        time_taken=time.perf_counter() - start_time,
+        debug=trace.as_dict() if debug else None
     )
 
+@app.route('/suggest')
+def suggest():
+    text = request.args.get('q', '')
+    try:
+        k = max(1, min(int(request.args.get('k', Config.AUTOCOMPLETE_K)), 20))
+    except ValueError:
+        return jsonify(error="'k' must be an integer"), 400
+    return jsonify(query=text, suggestions=query_engine.suggest(text, k))
+
+# Result fields /api/search can return; `fields` picks a subset
+API_FIELDS = ('doc_id', 'url', 'title', 'snippet', 'score', 'components')
+
+@app.route('/api/search')
+def api_search():
+    """
+    GET ?q=...&limit=10&fields=url,title,snippet   first page
+    GET ?cursor=...&limit=10&fields=...            following pages
+    Returns one page of results and an opaque `next_cursor` (null on the
+    last page). The ranking is stored server-side, so following pages cost
+    only metadata and snippet lookups. `fields` selects what each result
+    carries (default doc_id,url,title,snippet); leaving out snippet skips
+    reading page text.
+    """
+    query = request.args.get('q', '')
+    cursor = request.args.get('cursor')
+    if not query and not cursor:
+        return jsonify(error="'q' or 'cursor' is required"), 400
+    fields = request.args.get('fields', 'doc_id,url,title,snippet').split(',')
+    unknown = [field for field in fields if field not in API_FIELDS]
+    if unknown:
+        return jsonify(error=f"Unknown fields: {', '.join(unknown)} (choose from {', '.join(API_FIELDS)})"), 400
+    try:
+        limit = max(1, min(int(request.args.get('limit', 10)), 100))
+    except ValueError:
+        return jsonify(error="'limit' must be an integer"), 400
+
+    trace = metrics.start_trace()
+    with admit() as ticket:
+        try:
+            result_set, offset, page, next_cursor = query_engine.search_page(
+                query, cursor, limit, deadline_ms=ticket.deadline_ms(Config.QUERY_DEADLINE_MS), trace=trace,
+                tier=ticket.tier)
+        except ValueError as e:
+            return jsonify(error=str(e)), 400
+        snippets = {}
+        if 'snippet' in fields:
+            snippet_query = result_set.corrected_query if result_set.was_corrected else result_set.query
+            snippets = query_engine.get_snippets([doc_id for doc_id, _, _ in page], snippet_query, trace)
+    trace.finish()
+
+    results = []
+    for doc_id, score, components in page:
+        meta = query_engine.indexer.doc_metadata.get(doc_id)
+        if meta is None:
+            continue # removed by an index rebuild since the ranking was stored
+        values = {
+            'doc_id': doc_id,
+            'url': meta['url'],
+            'title': meta['title'],
+            'snippet': snippets.get(doc_id),
+            'score': score,
+            'components': components,
+        }
+        results.append({field: values[field] for field in fields})
+
+    return jsonify(
+        query=result_set.query,
+        corrected_query=result_set.corrected_query,
+        was_corrected=result_set.was_corrected,
+        total=len(result_set),
+        offset=offset,
+        results=results,
+        next_cursor=next_cursor,
+    )
+
+@app.route('/api/search/batch', methods=['POST'])
+def search_batch():
+    """
+    Body: {"queries": ["...", ...], "k": 10}
+    Returns the top k results of every query, in order.
+    """
+    payload = request.get_json(silent=True) or {}
+    queries = payload.get('queries')
+    if not isinstance(queries, list) or not all(isinstance(q, str) for q in queries):
+        return jsonify(error="'queries' must be a list of strings"), 400
+    if len(queries) > Config.BATCH_MAX_QUERIES:
+        return jsonify(error=f"At most {Config.BATCH_MAX_QUERIES} queries per batch"), 400
+    try:
+        k = max(1, min(int(payload.get('k', 10)), 100))
+    except (ValueError, TypeError):
+        return jsonify(error="'k' must be an integer"), 400
+
+    with admit():
+        batch = query_engine.search_batch(queries, k)
+    return jsonify(results=[
+        {
+            'query': query,
+            'corrected_query': corrected_query,
+            'was_corrected': was_corrected,
+            'results': [
+                {
+                    'doc_id': res['doc_id'],
+                    'url': res['metadata']['url'],
+                    'title': res['metadata']['title'],
+                    'score': res['score'],
+                    'components': res['components'],
+                }
+                for res in results
+            ],
+        }
+        for query, (results, corrected_query, was_corrected) in zip(queries, batch)
+    ])
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """
+    Query latency histograms (per stage), counters and cache gauges in the
+    Prometheus text format.
+    """
+    cache_entries = metrics.REGISTRY.gauge('boogle_cache_entries', 'Entries per query cache', label='cache')
+    cache_hits = metrics.REGISTRY.gauge('boogle_cache_hits', 'Hits per query cache', label='cache')
+    cache_misses = metrics.REGISTRY.gauge('boogle_cache_misses', 'Misses per query cache', label='cache')
+    for name, stats in query_engine.cache_stats().items():
+        cache_entries.set(stats['size'], name)
+        cache_hits.set(stats['hits'], name)
+        cache_misses.set(stats['misses'], name)
+    # Memory of the worker answering this scrape
+    memory = metrics.REGISTRY.gauge('boogle_process_memory_bytes', 'Serving process memory (rss, pss, uss)', label='kind')
+    for kind, value in metrics.process_memory().items():
+        memory.set(value, kind)
+    text = metrics.REGISTRY.render()
+    # The crawler's own metrics, as of its last snapshot
+    try:
+        with open(os.path.join(Config.STORAGE_PATH, 'crawl_metrics.prom')) as f:
+            text += f.read()
+    except OSError:
+        pass
+    return Response(text, mimetype='text/plain; version=0.0.4')
+
 @app.route('/status')
 def status():
     state_path = os.path.join(Config.STORAGE_PATH, 'crawl_state.json')
@@ -64,17 +252,13 @@ def status():
         except:
             state = {"error": "Could not load state"}
 
-    queue_path = os.path.join(Config.STORAGE_PATH, 'scheduler_queue.json')
-    queue_len = 0
-
-    if os.path.exists(queue_path):
-        try:
-            with open(queue_path) as f:
-                queue_len = len(json.load(f))
-        except:
-            pass
+    # Fixed-size snapshot the crawler writes every CRAWL_METRICS_INTERVAL seconds,
+    # rather than the whole frontier file
+    crawl = load_snapshot()
 
-    return render_template('dashboard.html', state=state, queue_len=queue_len)
+    return render_template('dashboard.html', state=state, crawl=crawl,
+                           crawl_age=time.time() - crawl['updated'] if crawl else None,
+                           cache_stats=query_engine.cache_stats())
 
 if __name__ == '__main__':
     app.run(
@@ -0,0 +1,162 @@
+"""
+ASGI entry point for SERVE_MODE=async:
+
+    uvicorn boogle.frontend.asgi:app
+
+The event loop only accepts connections and moves bytes. Every request
+runs the Flask app on a bounded pool of SERVE_THREADS threads, so slow
+searches never block accepting new connections, and with QUERY_COALESCE
+concurrent identical search requests (same query string, cookies and
+Accept header) share one in-flight response (a burst of the same popular
+query is rendered once).
+"""
+import asyncio
+import io
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from boogle.config import Config
+from boogle.frontend.app import app as flask_app
+
+# Only searches are coalesced: their responses depend on the query string and
+# these request headers alone
+COALESCE_PATHS = ('/search', '/api/search')
+COALESCE_HEADERS = (b'cookie', b'accept')
+
+
+class AsyncSingleFlight:
+    """
+    Event-loop counterpart of query_engine.coalesce.SingleFlight: callers
+    with the same key await one task. The task is shielded, so a client
+    that disconnects does not cancel it for the others.
+    """
+    def __init__(self):
+        self.calls = {} # key -> Task
+        self.shared = 0
+
+    async def do(self, key, factory):
+        task = self.calls.get(key)
+        shared = task is not None
+        if shared:
+            self.shared += 1
+        else:
+            task = self.calls[key] = asyncio.ensure_future(factory())
+            task.add_done_callback(lambda _: self.calls.pop(key, None))
+        return await asyncio.shield(task), shared
+
+
+def wsgi_environ(scope, body):
+    server_name, server_port = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    query_string = scope.get('query_string', b'').decode('latin-1')
+    # PEP 3333: PATH_INFO is the decoded path as latin-1 "bytes in a str"; the
+    # still-escaped form is only kept for RAW_URI / REQUEST_URI (as gunicorn does)
+    raw_path = scope.get('raw_path')
+    raw_uri = raw_path.decode('latin-1') if raw_path else scope['path']
+    if query_string:
+        raw_uri += '?' + query_string
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': query_string,
+        'RAW_URI': raw_uri,
+        'REQUEST_URI': raw_uri,
+        'SERVER_NAME': str(server_name),
+        'SERVER_PORT': str(server_port),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = 'HTTP_' + name
+        environ[name] = f"{environ[name]},{value}" if name in environ else value
+    return environ
+
+
+def call_wsgi(wsgi_app, environ):
+    """
+    Run a WSGI app to completion. Returns (status code, headers, body).
+    """
+    response = {}
+    chunks = []
+
+    def start_response(status, headers, exc_info=None):
+        response['status'] = int(status.split(' ', 1)[0])
+        response['headers'] = headers
+        return chunks.append
+
+    iterable = wsgi_app(environ, start_response)
+    try:
+        chunks.extend(iterable)
+    finally:
+        if hasattr(iterable, 'close'):
+            iterable.close()
+    return response['status'], response['headers'], b''.join(chunks)
+
+
+class AsyncServer:
+    def __init__(self, wsgi_app, threads=None, coalesce=None):
+        self.wsgi_app = wsgi_app
+        self.executor = ThreadPoolExecutor(max_workers=threads or Config.SERVE_THREADS, thread_name_prefix='serve')
+        coalesce = Config.QUERY_COALESCE if coalesce is None else coalesce
+        self.in_flight = AsyncSingleFlight() if coalesce else None
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+
+        body = b''
+        more = True
+        while more:
+            message = await receive()
+            body += message.get('body', b'')
+            more = message.get('more_body', False)
+
+        environ = wsgi_environ(scope, body)
+        # Queue time on the executor counts towards admission control (see app.admit)
+        environ['boogle.arrived'] = time.time()
+        loop = asyncio.get_running_loop()
+
+        def compute():
+            return loop.run_in_executor(self.executor, call_wsgi, self.wsgi_app, environ)
+
+        if (self.in_flight is not None and scope['method'] in ('GET', 'HEAD') and not body
+                and scope['path'] in COALESCE_PATHS):
+            headers = tuple(header for header in scope['headers'] if header[0] in COALESCE_HEADERS)
+            key = (scope['method'], scope['path'], scope.get('query_string', b''), headers)
+            (status, headers, content), _ = await self.in_flight.do(key, compute)
+        else:
+            status, headers, content = await compute()
+
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers],
+        })
+        await send({'type': 'http.response.body', 'body': content})
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+app = AsyncServer(flask_app)
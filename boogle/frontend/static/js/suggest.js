@@ -0,0 +1,40 @@
+// Typeahead for every search box: fetches /suggest as the user types and
+// fills a shared <datalist>.
+(function () {
+    const list = document.createElement('datalist');
+    list.id = 'suggestions';
+    document.body.appendChild(list);
+
+    let timer = null;
+    let latest = 0;
+
+    function update(input) {
+        const text = input.value;
+        if (!text.trim()) {
+            list.innerHTML = '';
+            return;
+        }
+        const request = ++latest;
+        fetch('/suggest?q=' + encodeURIComponent(text))
+            .then(response => response.json())
+            .then(data => {
+                // Ignore responses that arrive after a newer keystroke
+                if (request !== latest) return;
+                list.innerHTML = '';
+                for (const suggestion of data.suggestions) {
+                    const option = document.createElement('option');
+                    option.value = suggestion;
+                    list.appendChild(option);
+                }
+            })
+            .catch(() => {});
+    }
+
+    document.querySelectorAll('.search-input').forEach(input => {
+        input.setAttribute('list', list.id);
+        input.addEventListener('input', () => {
+            clearTimeout(timer);
+            timer = setTimeout(() => update(input), 80);
+        });
+    });
+})();
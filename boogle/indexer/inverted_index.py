@@ -1,23 +1,55 @@
 import os
 import json
 import math
+import time
+import threading
+from bisect import bisect_left
 from collections import defaultdict, Counter
+from boogle import startup
 from boogle.config import Config
+from boogle.indexer import postings_file
+from boogle.indexer.simhash import SimHashIndex, fingerprint
 from boogle.processor.text_processor import TextProcessor
+from boogle.query_engine.cache import LRUCache
+from boogle.query_engine.symspell import SymSpell
 from boogle.vectors.store import VectorStore
 
 class InvertedIndex:
     def __init__(self):
-        self.index = defaultdict(list)  # term -> [(doc_id, tf), ...]
+        self.index = defaultdict(list)  # term -> [(doc_id, tf), ...] sorted by doc_id (MappedPostings once loaded)
+        self._posting_ids = LRUCache(Config.TERM_CACHE_SIZE) # term -> [doc_id, ...], see `posting_ids`
         self.doc_metadata = {}  # doc_id -> {url, title, length}
+        self.duplicates = {} # near-duplicate doc_id -> {canonical, canonical_url, url, distance}, see build_index
         self.processor = TextProcessor()
-        self.vector_store = VectorStore()
+        self._vector_store = None # created on first use, see `vector_store`
+        self._vector_store_loaded = False
+        self._vector_store_lock = threading.Lock()
         self.raw_vocabulary = Counter() # raw_word -> frequency
+        self.version = '0' # snapshot id of the loaded index, changes on every build
         self.storage_path = Config.STORAGE_PATH
         self.index_path = os.path.join(self.storage_path, 'index')
+        self.postings_path = os.path.join(self.index_path, 'postings')
+        self.text_path = os.path.join(self.storage_path, 'text')
         
         if not os.path.exists(self.index_path):
             os.makedirs(self.index_path)
+        if not os.path.exists(self.text_path):
+            os.makedirs(self.text_path)
+
+    @property
+    def vector_store(self):
+        """
+        The VectorStore is only created (and its FAISS index loaded) when first
+        needed, so lexical-only users never import faiss or torch.
+        """
+        if self._vector_store is None:
+            with self._vector_store_lock:
+                if self._vector_store is None:
+                    store = VectorStore()
+                    if self._vector_store_loaded:
+                        store.load()
+                    self._vector_store = store
+        return self._vector_store
         
     def build_index(self):
         """
@@ -34,12 +66,27 @@ class InvertedIndex:
             url_map = json.load(f)
             
         print("Building index (Lexical + Vector)...")
+        start_time = time.time()
+
+        # Near-duplicates (redirects, mirrors, pages differing in chrome) collapse
+        # into the first copy indexed. Shortest URLs go first, so that copy is
+        # usually the canonical address
+        fingerprints = SimHashIndex(Config.DEDUP_MAX_DISTANCE) if Config.INDEX_DEDUP else None
+        # Start from scratch: a loaded or earlier build must not leak documents
+        # (e.g. pages that are now duplicates) into this one
+        self.index = defaultdict(list)
+        self.doc_metadata = {}
+        self.raw_vocabulary = Counter()
+        self._posting_ids.clear()
+        self._vector_store = None
+        self._vector_store_loaded = False
+        self.duplicates = {}
+        duplicate_postings = 0
+        filenames = [filename for filename in os.listdir(raw_path) if filename.endswith('.html')]
+        filenames.sort(key=lambda filename: (len(url_map.get(filename[:-5], '')), url_map.get(filename[:-5], ''), filename))
         
         # In this simple implementation, doc_id is the hash filename (without .html)
-        for filename in os.listdir(raw_path):
-            if not filename.endswith('.html'):
-                continue
-                
+        for filename in filenames:
             doc_id = filename.replace('.html', '')
             file_path = os.path.join(raw_path, filename)
             
@@ -50,6 +97,26 @@ class InvertedIndex:
                 # New signature: return title, first_para, text, title_stemmed, first_para_stemmed, body_stemmed, raw_words
                 title, first_para, text, title_tokens, first_para_tokens, body_tokens, raw_words = self.processor.process_document(content)
                 url = url_map.get(doc_id, "Unknown URL")
+
+                # Skip near-duplicates before they reach postings and embeddings
+                if fingerprints is not None:
+                    fp = fingerprint(title_tokens + body_tokens)
+                    match = fingerprints.find(fp)
+                    if match is not None:
+                        canonical, distance = match
+                        self.duplicates[doc_id] = {
+                            'canonical': canonical,
+                            'canonical_url': self.doc_metadata[canonical]['url'],
+                            'url': url,
+                            'distance': distance,
+                        }
+                        duplicate_postings += len(set(title_tokens + first_para_tokens + body_tokens))
+                        # Clean text from a build where this page was still indexed
+                        stale_text = os.path.join(self.text_path, f"{doc_id}.txt")
+                        if os.path.exists(stale_text):
+                            os.remove(stale_text)
+                        continue
+                    fingerprints.add(fp, doc_id)
                 
                 # Update metadata
                 self.doc_metadata[doc_id] = {
@@ -60,10 +127,19 @@ class InvertedIndex:
                 
                 # Update Raw Vocabulary
                 self.raw_vocabulary.update(raw_words)
+
+                # Keep the clean text so snippets and phrase checks need no HTML parsing
+                with open(os.path.join(self.text_path, f"{doc_id}.txt"), 'w', encoding='utf-8') as f:
+                    f.write(text)
                 
-                # Add to Vector Store (Use Title + First Paragraph for embedding)
-                vector_text = f"{title}. {first_para}"
-                self.vector_store.add_document(doc_id, vector_text)
+                # Queue for the Vector Store (Title + First Paragraph, or every
+                # passage in passage mode). Embeddings are encoded in batches,
+                # overlapping with HTML parsing
+                if Config.VECTOR_PASSAGE_MODE:
+                    self.vector_store.add_passages(doc_id, title, text)
+                else:
+                    vector_text = f"{title}. {first_para}"
+                    self.vector_store.add_document(doc_id, vector_text)
                 
                 # Calculate Weighted Term Frequencies
                 # TF = BodyTF + (TitleTF * TitleWeight) + (FirstParaTF * FirstParaWeight)
@@ -85,10 +161,53 @@ class InvertedIndex:
             except Exception as e:
                 print(f"Error indexing {filename}: {e}")
 
+        self.sort_postings()
         self.save_index()
         self.save_vocabulary()
+        self.save_duplicates()
         self.vector_store.save()
+        self.save_version()
+        elapsed = time.time() - start_time
         print(f"Index built with {len(self.index)} terms and {len(self.doc_metadata)} documents.")
+        if fingerprints is not None:
+            postings = sum(len(postings) for postings in self.index.values())
+            pages = len(self.doc_metadata) + len(self.duplicates)
+            print(f"Collapsed {len(self.duplicates)} near-duplicate pages ({len(self.duplicates) / max(pages, 1):.1%}): "
+                  f"{duplicate_postings} postings ({duplicate_postings / max(postings + duplicate_postings, 1):.1%}) "
+                  f"and {len(self.duplicates)} documents' embeddings not written.")
+        print(f"Build took {elapsed:.1f}s ({len(self.doc_metadata) / max(elapsed, 1e-9):.1f} docs/s).")
+
+    def sort_postings(self):
+        """
+        Keep every posting list sorted by doc_id, so query-time conjunctions
+        can intersect them by galloping and tf lookups can bisect.
+        """
+        for postings in self.index.values():
+            postings.sort(key=lambda posting: posting[0])
+        self._posting_ids.clear()
+
+    def posting_ids(self, term, postings=None):
+        """
+        Sorted doc ids of a term's postings (empty if the term is unknown).
+        Only the TERM_CACHE_SIZE most recently used known terms are kept.
+        Pass the term's postings if already looked up.
+        """
+        ids = self._posting_ids.get(term)
+        if ids is None:
+            if postings is None:
+                postings = self.index.get(term)
+            if postings is None:
+                return []
+            ids = [doc_id for doc_id, _ in postings]
+            self._posting_ids.put(term, ids)
+        return ids
+
+    def term_frequency(self, term, doc_id):
+        ids = self.posting_ids(term)
+        i = bisect_left(ids, doc_id)
+        if i < len(ids) and ids[i] == doc_id:
+            return self.index[term][i][1]
+        return 0
 
     def save_vocabulary(self):
         """Save raw vocabulary for spelling correction"""
@@ -100,18 +219,37 @@ class InvertedIndex:
         with open(vocab_path, 'w') as f:
             json.dump(dict(self.raw_vocabulary), f)
 
+        # Symmetric-delete index so query-time correction is a lookup, not an edit enumeration
+        SymSpell().build(self.raw_vocabulary).save(os.path.join(self.index_path, 'symspell.npz'))
+
+    def save_duplicates(self):
+        """Near-duplicate pages left out of the index, with their canonical doc."""
+        with open(os.path.join(self.index_path, 'duplicates.json'), 'w') as f:
+            json.dump(self.duplicates, f)
+
     def save_index(self):
         """
         Persist index and metadata to disk.
         """
-        # Save inverted index
-        with open(os.path.join(self.index_path, 'inverted_index.json'), 'w') as f:
-            json.dump(self.index, f)
-            
+        # Save inverted index as flat arrays that load_index memory-maps
+        postings_file.save_postings(self.postings_path, self.index, sorted(self.doc_metadata))
+        legacy_path = os.path.join(self.index_path, 'inverted_index.json')
+        if os.path.exists(legacy_path):
+            os.remove(legacy_path)
+
         # Save metadata
         with open(os.path.join(self.index_path, 'doc_metadata.json'), 'w') as f:
             json.dump(self.doc_metadata, f, indent=2)
 
+    def save_version(self):
+        """
+        New snapshot id, used to invalidate query caches. Written after every
+        other index file, since running engines reload when it changes.
+        """
+        self.version = str(time.time())
+        with open(os.path.join(self.index_path, 'index_version'), 'w') as f:
+            f.write(self.version)
+
     def load_index(self):
         """
         Load index from disk.
@@ -119,16 +257,34 @@ class InvertedIndex:
         idx_file = os.path.join(self.index_path, 'inverted_index.json')
         meta_file = os.path.join(self.index_path, 'doc_metadata.json')
         
-        if os.path.exists(idx_file):
-            with open(idx_file, 'r') as f:
-                self.index = json.load(f)
-        
-        if os.path.exists(meta_file):
-            with open(meta_file, 'r') as f:
-                self.doc_metadata = json.load(f)
-        
-        # Load vector store
-        self.vector_store.load()
+        with startup.timed('inverted_index'):
+            if postings_file.exists(self.postings_path):
+                # Read-only and shared between processes; pages load on demand
+                self.index = postings_file.MappedPostings(self.postings_path)
+            elif os.path.exists(idx_file):
+                # Index built before the binary postings format
+                with open(idx_file, 'r') as f:
+                    self.index = json.load(f)
+                # Indexes built before postings were sorted (a no-op pass otherwise)
+                self.sort_postings()
+            self._posting_ids.clear()
+
+            if os.path.exists(meta_file):
+                with open(meta_file, 'r') as f:
+                    self.doc_metadata = json.load(f)
+
+        version_file = os.path.join(self.index_path, 'index_version')
+        if os.path.exists(version_file):
+            with open(version_file, 'r') as f:
+                self.version = f.read().strip()
+        elif os.path.exists(idx_file):
+            # Index built before versions were written
+            self.version = str(os.path.getmtime(idx_file))
+
+        # Vector store is loaded lazily on first access
+        self._vector_store_loaded = True
+        if self._vector_store is not None:
+            self._vector_store.load()
 
 if __name__ == "__main__":
     indexer = InvertedIndex()
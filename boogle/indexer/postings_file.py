@@ -0,0 +1,127 @@
+import os
+import json
+import numpy as np
+
+# Arrays written by save_postings, one .npy file each
+ARRAYS = ('terms', 'term_offsets', 'offsets', 'docs', 'tfs')
+
+
+def _replace(path, write):
+    # Write next to the target and rename over it: a worker that still has the
+    # old file memory-mapped keeps reading the old inode instead of crashing
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        write(f)
+    os.replace(tmp_path, path)
+
+
+def save_postings(directory, index, doc_ids):
+    """
+    Write an in-memory index (term -> [(doc_id, tf), ...] sorted by doc_id)
+    as flat arrays: all terms in one sorted UTF-8 blob with term_offsets,
+    offsets[i]:offsets[i + 1] delimiting term i's postings in docs (doc
+    ordinals, i.e. positions in the sorted doc_ids) and tfs.
+    """
+    os.makedirs(directory, exist_ok=True)
+    ordinals = {doc_id: i for i, doc_id in enumerate(doc_ids)}
+    encoded = sorted((term.encode('utf-8'), term) for term in index)
+    lengths = [len(index[term]) for _, term in encoded]
+    total = sum(lengths)
+
+    arrays = {
+        'terms': np.frombuffer(b''.join(key for key, _ in encoded), dtype=np.uint8),
+        'term_offsets': np.zeros(len(encoded) + 1, dtype=np.int64),
+        'offsets': np.zeros(len(encoded) + 1, dtype=np.int64),
+        'docs': np.fromiter((ordinals[doc_id] for _, term in encoded for doc_id, _ in index[term]),
+                            dtype=np.int32, count=total),
+        'tfs': np.fromiter((tf for _, term in encoded for _, tf in index[term]), dtype=np.float64, count=total),
+    }
+    np.cumsum([len(key) for key, _ in encoded], out=arrays['term_offsets'][1:])
+    np.cumsum(lengths, out=arrays['offsets'][1:])
+
+    for name in ARRAYS:
+        _replace(os.path.join(directory, f"{name}.npy"), lambda f: np.save(f, arrays[name]))
+    _replace(os.path.join(directory, 'doc_ids.json'), lambda f: f.write(json.dumps(doc_ids).encode('utf-8')))
+
+
+def exists(directory):
+    return os.path.exists(os.path.join(directory, 'offsets.npy'))
+
+
+class PostingList:
+    """
+    One term's postings as a read-only sequence of (doc_id, tf).
+    """
+    def __init__(self, docs, tfs, doc_ids):
+        self.docs = docs
+        self.tfs = tfs
+        self.doc_ids = doc_ids
+
+    def __len__(self):
+        return len(self.docs)
+
+    def __getitem__(self, i):
+        return self.doc_ids[self.docs[i]], float(self.tfs[i])
+
+    def __iter__(self):
+        doc_ids = self.doc_ids
+        return zip((doc_ids[d] for d in self.docs.tolist()), self.tfs.tolist())
+
+
+class MappedPostings:
+    """
+    Read-only term -> PostingList mapping over the arrays of save_postings,
+    memory-mapped: forked workers share one copy of the pages, and only the
+    postings queries touch are read from disk. Terms are found by binary
+    search over the sorted blob on every lookup; nothing is remembered per
+    process, so the pages stay shared.
+    """
+    def __init__(self, directory):
+        for name in ARRAYS:
+            setattr(self, name, np.load(os.path.join(directory, f"{name}.npy"), mmap_mode='r'))
+        with open(os.path.join(directory, 'doc_ids.json'), 'r') as f:
+            self.doc_ids = json.load(f)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def _term(self, i):
+        return self.terms[self.term_offsets[i]:self.term_offsets[i + 1]].tobytes()
+
+    def find(self, term):
+        """Index of `term` in the sorted terms, or -1."""
+        key = term.encode('utf-8')
+        lo, hi = 0, len(self)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._term(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo if lo < len(self) and self._term(lo) == key else -1
+
+    def _postings(self, i):
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return PostingList(self.docs[start:end], self.tfs[start:end], self.doc_ids)
+
+    def __contains__(self, term):
+        return self.find(term) >= 0
+
+    def __getitem__(self, term):
+        i = self.find(term)
+        if i < 0:
+            raise KeyError(term)
+        return self._postings(i)
+
+    def get(self, term, default=None):
+        i = self.find(term)
+        return self._postings(i) if i >= 0 else default
+
+    def __iter__(self):
+        return (self._term(i).decode('utf-8') for i in range(len(self)))
+
+    def items(self):
+        return ((self._term(i).decode('utf-8'), self._postings(i)) for i in range(len(self)))
+
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in ARRAYS)
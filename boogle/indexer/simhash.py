@@ -0,0 +1,82 @@
+import hashlib
+from collections import Counter, defaultdict
+import numpy as np
+
+BITS = 64
+
+
+def bands(max_distance):
+    """
+    (shift, mask) of max_distance + 1 bit ranges that split a fingerprint as
+    evenly as possible. Two fingerprints within max_distance bits differ in
+    at most max_distance ranges, so they agree exactly on at least one
+    (pigeonhole): looking up every range finds all near-duplicates.
+    """
+    count = max(1, min(max_distance + 1, BITS))
+    widths = [BITS // count + (i < BITS % count) for i in range(count)]
+    shifts = [sum(widths[:i]) for i in range(count)]
+    return [(shift, (1 << width) - 1) for shift, width in zip(shifts, widths)]
+
+
+def _hash(feature):
+    """Stable 64-bit hash (Python's hash() is salted per process)."""
+    return int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def fingerprint(tokens, shingle=2):
+    """
+    64-bit SimHash of a token sequence. Every shingle (`shingle` consecutive
+    tokens) votes on each bit with its hash, weighted by how often it
+    occurs, so small edits flip few bits while different texts land about
+    32 bits apart.
+    """
+    if len(tokens) >= shingle:
+        features = Counter(' '.join(tokens[i:i + shingle]) for i in range(len(tokens) - shingle + 1))
+    else:
+        features = Counter(tokens)
+    if not features:
+        return 0
+    hashes = np.fromiter((_hash(feature) for feature in features), dtype='<u8', count=len(features))
+    weights = np.fromiter(features.values(), dtype=np.float64, count=len(features))
+    bits = np.unpackbits(hashes.view(np.uint8).reshape(-1, 8), axis=1, bitorder='little')
+    votes = weights @ (bits.astype(np.float64) * 2 - 1)
+    return int(np.packbits(votes > 0, bitorder='little').view('<u8')[0])
+
+
+def distance(a, b):
+    """Hamming distance between two fingerprints."""
+    return bin(a ^ b).count('1')
+
+
+class SimHashIndex:
+    """
+    Near-duplicate lookup over fingerprints, by each of max_distance + 1
+    bands: a query only compares against fingerprints sharing a band with
+    it, not against the whole collection.
+    """
+    def __init__(self, max_distance=6):
+        self.max_distance = max_distance
+        self.bands = bands(max_distance)
+        self.tables = [defaultdict(list) for _ in self.bands] # band value -> [(fingerprint, key)]
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def find(self, fp):
+        """
+        Returns (key, distance) of the closest fingerprint within
+        max_distance bits, or None.
+        """
+        best = None
+        for (shift, mask), table in zip(self.bands, self.tables):
+            for other, key in table.get((fp >> shift) & mask, ()):
+                d = distance(fp, other)
+                if d <= self.max_distance and (best is None or d < best[1]):
+                    best = (key, d)
+        return best
+
+    def add(self, fp, key):
+        for (shift, mask), table in zip(self.bands, self.tables):
+            table[(fp >> shift) & mask].append((fp, key))
+        self.size += 1
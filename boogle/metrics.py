@@ -0,0 +1,274 @@
+import time
+import random
+import threading
+from contextlib import contextmanager, nullcontext
+from boogle.config import Config
+
+# Latency buckets in seconds (upper bounds)
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+# Candidate-count buckets
+COUNT_BUCKETS = (0, 1, 10, 50, 100, 500, 1000, 5000, 10000, 50000, 100000)
+
+
+def _labels(label, value):
+    return f'{{{label}="{value}"}}' if label else ''
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram, optionally split by one label
+    (e.g. stage="faiss"), rendered in the Prometheus text format.
+    """
+    kind = 'histogram'
+
+    def __init__(self, name, help, label=None, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.label = label
+        self.buckets = buckets
+        self.series = {} # label value -> [bucket counts..., count, sum]
+        self.lock = threading.Lock()
+
+    def observe(self, value, label_value=None):
+        with self.lock:
+            series = self.series.get(label_value)
+            if series is None:
+                series = self.series[label_value] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += 1
+            series[-1] += value
+
+    def summary(self, label_value=None):
+        """
+        {count, mean, p50, p95, p99} of one series. Quantiles are the upper
+        bound of the bucket they fall in (the last bound past the buckets).
+        """
+        with self.lock:
+            series = list(self.series.get(label_value) or [0] * (len(self.buckets) + 1) + [0.0])
+        count = series[-2]
+        summary = {'count': count, 'mean': series[-1] / count if count else 0.0}
+        for name, q in (('p50', 0.5), ('p95', 0.95), ('p99', 0.99)):
+            value = self.buckets[-1] if count else 0.0
+            cumulative = 0
+            for bound, bucket in zip(self.buckets, series):
+                cumulative += bucket
+                if count and cumulative >= q * count:
+                    value = bound
+                    break
+            summary[name] = value
+        return summary
+
+    def render(self):
+        lines = []
+        with self.lock:
+            for label_value, series in sorted(self.series.items(), key=lambda item: str(item[0])):
+                prefix = f'{self.label}="{label_value}",' if self.label else ''
+                cumulative = 0
+                for bound, count in zip(self.buckets, series):
+                    cumulative += count
+                    lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+                lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {series[-2]}')
+                lines.append(f'{self.name}_count{_labels(self.label, label_value)} {series[-2]}')
+                lines.append(f'{self.name}_sum{_labels(self.label, label_value)} {series[-1]:.6f}')
+        return lines
+
+
+class Counter:
+    """
+    Monotonic counter, optionally split by one label.
+    """
+    kind = 'counter'
+
+    def __init__(self, name, help, label=None):
+        self.name = name
+        self.help = help
+        self.label = label
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1, label_value=None):
+        with self.lock:
+            self.values[label_value] = self.values.get(label_value, 0) + amount
+
+    def render(self):
+        with self.lock:
+            if not self.values and not self.label:
+                return [f'{self.name} 0']
+            return [f'{self.name}{_labels(self.label, label_value)} {value}'
+                    for label_value, value in sorted(self.values.items(), key=lambda item: str(item[0]))]
+
+
+class Gauge(Counter):
+    """
+    Value that is set rather than accumulated (e.g. cache sizes at scrape time).
+    """
+    kind = 'gauge'
+
+    def set(self, value, label_value=None):
+        with self.lock:
+            self.values[label_value] = value
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def _get(self, cls, name, *args, **kwargs):
+        with self.lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = cls(name, *args, **kwargs)
+            return metric
+
+    def histogram(self, name, help, label=None, buckets=LATENCY_BUCKETS):
+        return self._get(Histogram, name, help, label=label, buckets=buckets)
+
+    def counter(self, name, help, label=None):
+        return self._get(Counter, name, help, label=label)
+
+    def gauge(self, name, help, label=None):
+        return self._get(Gauge, name, help, label=label)
+
+    def render(self):
+        """
+        All metrics in the Prometheus text exposition format.
+        """
+        lines = []
+        with self.lock:
+            metrics = list(self.metrics.values())
+        for metric in metrics:
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+QUERY_SECONDS = REGISTRY.histogram('boogle_query_seconds', 'End-to-end latency of traced queries')
+STAGE_SECONDS = REGISTRY.histogram('boogle_query_stage_seconds', 'Time spent per query stage', label='stage')
+CANDIDATES = REGISTRY.histogram('boogle_query_candidates', 'Candidate documents per query', label='kind',
+                                buckets=COUNT_BUCKETS)
+QUERIES = REGISTRY.counter('boogle_queries_total', 'Searches served, by result cache outcome (hit, miss, coalesced)', label='cache')
+SEMANTIC_TIMEOUTS = REGISTRY.counter('boogle_semantic_timeouts_total', 'Queries answered lexical-only after the deadline')
+SEARCH_TIERS = REGISTRY.counter('boogle_search_tier_total',
+                                'Searches by degradation tier (full, no_phrase, lexical, cached) and requests shed with 503',
+                                label='tier')
+CHAMPION_FALLBACKS = REGISTRY.counter('boogle_champion_fallbacks_total',
+                                      'Queries whose champion-tier candidates were too few, so full postings were scored')
+QUEUE_WAIT_SECONDS = REGISTRY.histogram('boogle_queue_wait_seconds', 'Time requests queued before a search slot')
+
+
+def process_memory(pid='self'):
+    """
+    RSS, PSS (shared pages split between the processes mapping them) and
+    USS (private pages: what the process alone costs) in bytes, from
+    /proc/<pid>/smaps_rollup. Empty where that is not available.
+    """
+    fields = {}
+    try:
+        with open(f'/proc/{pid}/smaps_rollup', 'r') as f:
+            for line in f:
+                name, _, value = line.partition(':')
+                value = value.split()
+                if len(value) == 2 and value[1] == 'kB':
+                    fields[name] = int(value[0]) * 1024
+    except OSError:
+        return {}
+    return {
+        'rss': fields.get('Rss', 0),
+        'pss': fields.get('Pss', 0),
+        'uss': fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0),
+    }
+
+
+class Trace:
+    """
+    Stage timings and candidate counts of one request. Stages may be timed
+    from several threads (the semantic branch runs on the query pool);
+    repeated stages accumulate.
+    """
+    enabled = True
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.stages = {}  # stage -> seconds
+        self.counts = {}  # kind -> count
+        self.total = None
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name, seconds):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def count(self, name, value):
+        self.counts[name] = self.counts.get(name, 0) + value
+
+    def finish(self):
+        """
+        Record the trace in the histograms (once).
+        """
+        if self.total is not None:
+            return
+        self.total = time.perf_counter() - self.start
+        QUERY_SECONDS.observe(self.total)
+        for name, seconds in self.stages.items():
+            STAGE_SECONDS.observe(seconds, name)
+        for name, value in self.counts.items():
+            CANDIDATES.observe(value, name)
+
+    def as_dict(self):
+        total = self.total if self.total is not None else time.perf_counter() - self.start
+        return {
+            'total_ms': round(total * 1000, 3),
+            'stages_ms': {name: round(seconds * 1000, 3) for name, seconds in self.stages.items()},
+            'counts': dict(self.counts),
+        }
+
+
+class NullTrace:
+    """
+    Stand-in when a request is not sampled: every call is a no-op.
+    """
+    enabled = False
+    total = None
+
+    def stage(self, name):
+        return _NULL_STAGE
+
+    def add(self, name, seconds):
+        pass
+
+    def count(self, name, value):
+        pass
+
+    def finish(self):
+        pass
+
+    def as_dict(self):
+        return {}
+
+
+NULL_TRACE = NullTrace()
+_NULL_STAGE = nullcontext()
+
+
+def start_trace(force=False):
+    """
+    A Trace for TRACE_SAMPLE_RATE of requests (or always if force, e.g. debug=1),
+    otherwise the shared NullTrace.
+    """
+    rate = Config.TRACE_SAMPLE_RATE
+    if force or rate >= 1.0 or (rate > 0.0 and random.random() < rate):
+        return Trace()
+    return NULL_TRACE
@@ -1,26 +1,53 @@
 import re
 import string
-from bs4 import BeautifulSoup
-import nltk
-from nltk.corpus import stopwords
-from nltk.stem import PorterStemmer
+import threading
+from boogle import startup
+
+# nltk (over a second to import) and bs4 are imported on first use
+_nltk_lock = threading.Lock()
 
 class TextProcessor:
     def __init__(self):
-        # Ensure NLTK data is downloaded
-        try:
-            nltk.data.find('corpora/stopwords')
-        except LookupError:
-            nltk.download('stopwords')
-            
-        self.stop_words = set(stopwords.words('english'))
-        self.stemmer = PorterStemmer()
-        
+        self._stop_words = None
+        self._stemmer = None
+
+    def _load_nltk(self):
+        with _nltk_lock:
+            if self._stemmer is not None:
+                return
+            with startup.timed('nltk'):
+                import nltk
+                from nltk.corpus import stopwords
+                from nltk.stem import PorterStemmer
+
+                # Ensure NLTK data is downloaded
+                try:
+                    nltk.data.find('corpora/stopwords')
+                except LookupError:
+                    nltk.download('stopwords')
+
+                self._stop_words = set(stopwords.words('english'))
+                self._stemmer = PorterStemmer()
+
+    @property
+    def stop_words(self):
+        if self._stop_words is None:
+            self._load_nltk()
+        return self._stop_words
+
+    @property
+    def stemmer(self):
+        if self._stemmer is None:
+            self._load_nltk()
+        return self._stemmer
+
     def clean_html(self, html_content):
         """
         Remove boilerplate, scripts, styles, and extract main text.
         Returns tuple: (title, first_paragraph, body_text)
         """
+        from bs4 import BeautifulSoup
+
         soup = BeautifulSoup(html_content, 'html.parser')
         
         # Remove script and style elements
@@ -68,10 +95,12 @@ class TextProcessor:
         
         stemmed_tokens = []
         raw_words = []
+        stop_words = self.stop_words
+        stemmer = self.stemmer
         
         for word in tokens:
-            if word not in self.stop_words and len(word) > 1 and word.isalnum():
-                stemmed_tokens.append(self.stemmer.stem(word))
+            if word not in stop_words and len(word) > 1 and word.isalnum():
+                stemmed_tokens.append(stemmer.stem(word))
                 raw_words.append(word)
         
         if return_raw:
@@ -0,0 +1,115 @@
+import threading
+import time
+from boogle import metrics
+from boogle.config import Config
+
+# Degradation tiers, most expensive first, with the share of the latency
+# budget a request may have spent queueing before it drops to that tier:
+#   full       spelling within edit distance 2, semantic + lexical, phrase bonus
+#   no_phrase  skip the per-candidate phrase checks (a text file read each)
+#   lexical    also skip query encoding and FAISS; spelling within distance 1
+TIERS = (('full', 0.0), ('no_phrase', 0.1), ('lexical', 0.25))
+
+
+class Overloaded(Exception):
+    """Raised by AdmissionController.admit for a request that should get a 503."""
+
+
+def arrival_time(header=None):
+    """
+    Wall-clock time a request reached the front of the stack, from an
+    X-Request-Start header ("t=<seconds|ms|us since epoch>", as set by
+    nginx, Heroku and most load balancers). None if absent or unparsable.
+    """
+    if not header:
+        return None
+    try:
+        value = float(header.strip().removeprefix('t='))
+    except ValueError:
+        return None
+    if value > 1e14:
+        value /= 1e6
+    elif value > 1e11:
+        value /= 1e3
+    return value
+
+
+class Admission:
+    """
+    An admitted request: its degradation tier and latency budget. Use as a
+    context manager around the request's work; leaving it frees the slot.
+    """
+    def __init__(self, controller, tier, deadline):
+        self.controller = controller
+        self.tier = tier
+        self.deadline = deadline # time.monotonic() the budget runs out, None = no budget
+
+    def deadline_ms(self, default=None):
+        """
+        Semantic-branch deadline for QueryEngine.search: what is left of the
+        budget, capped by `default` (QUERY_DEADLINE_MS); None = no deadline.
+        """
+        remaining = None
+        if self.deadline is not None:
+            remaining = max(1.0, (self.deadline - time.monotonic()) * 1000)
+        if default:
+            remaining = default if remaining is None else min(remaining, default)
+        return remaining
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.controller.release()
+
+
+class AdmissionController:
+    """
+    Sheds load before it turns into unbounded latency. A request that has
+    already queued (in the server, then for one of `slots` search slots)
+    for max_wait_ms gets a fast Overloaded; the rest are admitted at a tier
+    chosen by how much of the per-request budget_ms the queueing used.
+    Without slots or a known arrival time there is no queue to measure:
+    requests run at the full tier with only the QUERY_DEADLINE_MS deadline.
+    """
+    def __init__(self, slots=None, max_wait_ms=None, budget_ms=None):
+        slots = Config.ADMISSION_SLOTS if slots is None else slots
+        self.slots = threading.BoundedSemaphore(slots) if slots > 0 else None
+        self.max_wait = (Config.ADMISSION_MAX_WAIT_MS if max_wait_ms is None else max_wait_ms) / 1000
+        self.budget = (Config.QUERY_BUDGET_MS if budget_ms is None else budget_ms) / 1000
+        self.shed = 0
+
+    def admit(self, arrived=None):
+        """
+        Admit a request that reached the server at `arrived` (time.time(),
+        default now). Returns an Admission; raises Overloaded.
+        """
+        now = time.time()
+        waited = max(0.0, now - arrived) if arrived else 0.0
+        if self.slots is not None:
+            timeout = self.max_wait - waited if self.max_wait else None
+            if (timeout is not None and timeout <= 0) or not self.slots.acquire(timeout=timeout):
+                return self._shed(waited + max(0.0, time.time() - now))
+            waited += time.time() - now
+        elif self.max_wait and waited >= self.max_wait:
+            return self._shed(waited)
+        metrics.QUEUE_WAIT_SECONDS.observe(waited)
+
+        tier = TIERS[0][0]
+        deadline = None
+        if self.budget and (self.slots is not None or arrived):
+            for name, share in TIERS:
+                if waited >= share * self.budget:
+                    tier = name
+            deadline = time.monotonic() + max(0.0, self.budget - waited)
+        return Admission(self, tier, deadline)
+
+    def _shed(self, waited):
+        self.shed += 1
+        metrics.QUEUE_WAIT_SECONDS.observe(waited)
+        metrics.SEARCH_TIERS.inc(label_value='shed')
+        raise Overloaded(f"queued {waited * 1000:.0f}ms")
+
+    def release(self):
+        if self.slots is not None:
+            self.slots.release()
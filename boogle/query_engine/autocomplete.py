@@ -0,0 +1,185 @@
+import os
+import json
+import threading
+from bisect import bisect_left
+from collections import Counter
+import numpy as np
+from boogle.config import Config
+
+# Prefixes up to this many bytes have their top completions precomputed, since
+# their ranges cover a large share of the vocabulary
+PRECOMPUTE_DEPTH = 3
+# ...but only when the range is larger than this (smaller ranges are cheap to rank)
+PRECOMPUTE_MIN_RANGE = 256
+# Completions stored per precomputed prefix
+PRECOMPUTE_K = 10
+
+
+class SortedTerms:
+    """
+    Sorted UTF-8 encoded terms packed into one bytes blob with an offsets array, so a
+    million terms cost ~9 bytes each plus their text instead of a Python str
+    object apiece. Indexing returns bytes, which bisect can search directly
+    (UTF-8 byte order is code point order).
+    """
+    def __init__(self, encoded):
+        self.blob = b''.join(encoded)
+        self.offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(t) for t in encoded], out=self.offsets[1:])
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return self.blob[self.offsets[i]:self.offsets[i + 1]]
+
+    def nbytes(self):
+        return len(self.blob) + self.offsets.nbytes
+
+
+class PrefixIndex:
+    """
+    Frequency-ranked prefix completion over a fixed set of terms.
+    A prefix maps to the contiguous range of sorted terms that start with it
+    (two binary searches); the top-k of that range come from a precomputed
+    table for short prefixes and from a partial sort of the counts otherwise.
+    """
+    def __init__(self, counts):
+        items = sorted((term.encode('utf-8'), count) for term, count in counts.items() if term)
+        self.terms = SortedTerms([t for t, _ in items])
+        self.counts = np.array([c for _, c in items], dtype=np.float64)
+        self.top = {}
+        self.precompute()
+
+    def __len__(self):
+        return len(self.terms)
+
+    def span(self, prefix):
+        lo = bisect_left(self.terms, prefix)
+        # 0xff never occurs in UTF-8, so it sorts after every continuation of prefix
+        hi = bisect_left(self.terms, prefix + b'\xff', lo)
+        return lo, hi
+
+    def rank(self, lo, hi, k):
+        """Ids of the k most frequent terms in [lo, hi), most frequent first."""
+        counts = self.counts[lo:hi]
+        if len(counts) > k:
+            ids = np.argpartition(-counts, k - 1)[:k]
+        else:
+            ids = np.arange(len(counts))
+        # Ties broken alphabetically
+        ids = ids[np.lexsort((ids, -counts[ids]))]
+        return ids + lo
+
+    def precompute(self):
+        n = len(self.terms)
+        for depth in range(1, PRECOMPUTE_DEPTH + 1):
+            start = 0
+            while start < n:
+                prefix = self.terms[start][:depth]
+                if len(prefix) < depth:
+                    start += 1
+                    continue
+                _, end = self.span(prefix)
+                if end - start > PRECOMPUTE_MIN_RANGE:
+                    self.top[prefix] = self.rank(start, end, PRECOMPUTE_K).astype(np.int32)
+                start = end
+
+    def complete(self, prefix, k):
+        """
+        Returns [(term, count)] for the k most frequent terms starting with prefix.
+        """
+        prefix = prefix.encode('utf-8')
+        ids = self.top.get(prefix) if k <= PRECOMPUTE_K else None
+        if ids is None:
+            lo, hi = self.span(prefix)
+            if lo == hi:
+                return []
+            ids = self.rank(lo, hi, k)
+        return [(self.terms[i].decode('utf-8'), float(self.counts[i])) for i in ids[:k]]
+
+    def memory_usage(self):
+        precomputed = sum(len(p) + ids.nbytes for p, ids in self.top.items())
+        return {
+            'terms': len(self),
+            'terms_bytes': self.terms.nbytes(),
+            'counts_bytes': self.counts.nbytes,
+            'precomputed_bytes': precomputed,
+            'total_bytes': self.terms.nbytes() + self.counts.nbytes + precomputed,
+        }
+
+
+class Autocomplete:
+    """
+    Typeahead over the raw (unstemmed) vocabulary and popular past queries.
+    Whole-query completions from the query log come first; the rest complete
+    the last word being typed from the vocabulary.
+    """
+    def __init__(self, vocabulary=None):
+        self.log_path = os.path.join(Config.STORAGE_PATH, 'index', 'query_log.json')
+        self.log_size = Config.QUERY_LOG_SIZE
+        self.query_log = Counter()
+        self.pending = 0
+        self.lock = threading.Lock()
+        self.words = PrefixIndex(vocabulary or {})
+        self.load_query_log()
+
+    def load_vocabulary(self, vocabulary):
+        self.words = PrefixIndex(vocabulary)
+
+    def load_query_log(self):
+        if os.path.exists(self.log_path):
+            with open(self.log_path, 'r') as f:
+                self.query_log = Counter(json.load(f))
+        self.queries = PrefixIndex(self.query_log)
+
+    def record(self, query):
+        """
+        Count a query that returned results. The log keeps the QUERY_LOG_SIZE
+        most frequent queries and is saved (and the query index rebuilt) every
+        100 new queries.
+        """
+        if not self.log_size:
+            return
+        query = ' '.join(query.lower().split())
+        if not query:
+            return
+        with self.lock:
+            self.query_log[query] += 1
+            self.pending += 1
+            if self.pending < 100:
+                return
+            self.pending = 0
+            if len(self.query_log) > self.log_size:
+                self.query_log = Counter(dict(self.query_log.most_common(self.log_size)))
+            snapshot = dict(self.query_log)
+
+            # Readers keep using the old index until the new one is swapped in
+            self.queries = PrefixIndex(snapshot)
+            tmp_path = self.log_path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(snapshot, f)
+            os.replace(tmp_path, self.log_path)
+
+    def suggest(self, text, k=None):
+        """
+        Returns up to k completions of the typed text.
+        """
+        k = k or Config.AUTOCOMPLETE_K
+        text = ' '.join(text.lower().split()) + (' ' if text[-1:].isspace() else '')
+        if not text.strip():
+            return []
+
+        suggestions = [query for query, _ in self.queries.complete(text, k)]
+
+        head, _, last = text.rpartition(' ')
+        if last:
+            head = head + ' ' if head else ''
+            for word, _ in self.words.complete(last, k):
+                suggestion = head + word
+                if suggestion not in suggestions:
+                    suggestions.append(suggestion)
+        return suggestions[:k]
+
+    def memory_usage(self):
+        return {'words': self.words.memory_usage(), 'queries': self.queries.memory_usage()}
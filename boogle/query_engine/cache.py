@@ -0,0 +1,61 @@
+import time
+import threading
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    Thread-safe LRU cache with an optional time-to-live per entry.
+    A maxsize of 0 disables caching.
+    """
+    def __init__(self, maxsize, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.data = OrderedDict() # key -> (expires_at, value)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self.lock:
+            item = self.data.get(key)
+            if item is None:
+                self.misses += 1
+                return default
+
+            expires_at, value = item
+            if expires_at is not None and expires_at < time.monotonic():
+                del self.data[key]
+                self.misses += 1
+                return default
+
+            self.data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        if self.maxsize <= 0:
+            return
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self.lock:
+            self.data[key] = (expires_at, value)
+            self.data.move_to_end(key)
+            while len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+
+    def __len__(self):
+        return len(self.data)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'size': len(self.data),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 3) if total else 0.0,
+        }
@@ -0,0 +1,44 @@
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls with the same key into one: the first caller
+    runs the function, and callers arriving before it returns wait for its
+    result (or exception) instead of repeating the work.
+    """
+    def __init__(self):
+        self.calls = {} # key -> Future of the in-flight call
+        self.lock = threading.Lock()
+        self.shared = 0
+
+    def do(self, key, fn, *args):
+        """
+        Returns (result, shared); shared is True if another caller computed it.
+        """
+        with self.lock:
+            future = self.calls.get(key)
+            leader = future is None
+            if leader:
+                future = self.calls[key] = Future()
+            else:
+                self.shared += 1
+        if not leader:
+            return future.result(), True
+
+        try:
+            result = fn(*args)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            with self.lock:
+                del self.calls[key]
+
+    def in_flight(self):
+        with self.lock:
+            return len(self.calls)
@@ -1,24 +1,82 @@
 import math
 import os
-import json
+import threading
+import time
+from bisect import bisect_left
+from urllib.parse import urlparse
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+import numpy as np
+from boogle import metrics, startup
 from boogle.config import Config
 from boogle.processor.text_processor import TextProcessor
 from boogle.indexer.inverted_index import InvertedIndex
+from boogle.ranker.pagerank import load_scores
 
 from boogle.query_engine.spelling import SpellingCorrector
+from boogle.query_engine.cache import LRUCache
+from boogle.query_engine.coalesce import SingleFlight
+from boogle.query_engine.snippets import SnippetGenerator
+from boogle.query_engine.autocomplete import Autocomplete
+from boogle.query_engine.query_parser import parse_query
+from boogle.query_engine.postings import intersect, union
+from boogle.query_engine.result_sets import ResultSetStore, decode_cursor, encode_cursor
+
+
+# BM25 parameters
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+def normalize_query(query):
+    """Cache key form of a query: lowercase, single-spaced."""
+    return ' '.join(query.lower().split())
+
+def site_matches(host, site):
+    """True if host is `site` or one of its subdomains."""
+    site = site.lower()
+    return host == site or host.endswith('.' + site)
 
 class QueryEngine:
     def __init__(self):
         self.processor = TextProcessor()
+        self.snippets = SnippetGenerator(self.processor)
         self.indexer = InvertedIndex()
         self.indexer.load_index()
-        self.spelling_corrector = SpellingCorrector()
+        with startup.timed('spelling_vocabulary'):
+            self.spelling_corrector = SpellingCorrector()
+        with startup.timed('autocomplete'):
+            self.autocomplete = Autocomplete(self.spelling_corrector.vocabulary)
         
         self.alpha = Config.RANKING_ALPHA
         self.beta = Config.RANKING_BETA
         
         self.pagerank_scores = self.load_pagerank()
+        self.max_pagerank = max(self.pagerank_scores.values(), default=0.0)
+
+        # Caches: normalized query -> ranked results, query -> embedding, (doc, query) -> snippet
+        ttl = Config.QUERY_CACHE_TTL or None
+        self.result_cache = LRUCache(Config.QUERY_CACHE_SIZE, ttl)
+        self.embedding_cache = LRUCache(Config.EMBEDDING_CACHE_SIZE, ttl)
+        self.snippet_cache = LRUCache(Config.SNIPPET_CACHE_SIZE, ttl)
+        self.index_version = self.compute_index_version()
+        # Index files are checked for a rebuild at most every INDEX_CHECK_INTERVAL seconds (see `check_index`)
+        self.index_check_interval = Config.INDEX_CHECK_INTERVAL
+        self.index_checked = time.monotonic()
+        self.index_stamp = self.index_files_stamp()
+        self.reload_lock = threading.Lock()
+        # Ranked results of recent queries by result set id, for cursor pagination
+        self.result_sets = ResultSetStore()
+        # Concurrent misses for the same query share one computation
+        self.in_flight = SingleFlight() if Config.QUERY_COALESCE else None
+
+        # Tiered postings: term -> champion doc ids of the most recently used long terms (see `champion_ids`)
+        self.champion_size = Config.CHAMPION_LIST_SIZE
+        self.champions = LRUCache(Config.TERM_CACHE_SIZE)
+
+        # Shared pool for the semantic branch of concurrent queries
+        self.executor = ThreadPoolExecutor(max_workers=Config.QUERY_THREADS, thread_name_prefix='query')
+        self.deadline_ms = Config.QUERY_DEADLINE_MS
+        self.semantic_timeouts = 0
         
         # Precompute avg_dl for BM25
         self.avg_dl = 0
@@ -27,90 +85,404 @@ class QueryEngine:
             total_len = sum(meta['length'] for meta in self.indexer.doc_metadata.values())
             self.avg_dl = total_len / self.doc_count
 
+    def warm_up(self):
+        """
+        Load the lazily initialised components (NLTK, FAISS index, embedding
+        model) so the first search does not pay for them.
+        """
+        self.processor.tokenize("warm up")
+        self.indexer.vector_store.warm_up()
+
+    def preload(self):
+        """
+        Load the same components as warm_up, without running the model or
+        starting threads, so a server master can load them once before
+        forking workers that share the pages copy-on-write.
+        """
+        self.processor.tokenize("warm up")
+        self.indexer.vector_store.model
+
+    def pagerank_path(self):
+        path = os.path.join(Config.STORAGE_PATH, 'pagerank_scores.npy')
+        if not os.path.exists(path):
+            path = os.path.join(Config.STORAGE_PATH, 'pagerank.json')
+        return path
+
+    def compute_index_version(self):
+        """
+        Snapshot id of everything results depend on. Cache keys include it,
+        so entries from an older index are never served after a reload.
+        """
+        pagerank_path = self.pagerank_path()
+        pagerank_version = os.path.getmtime(pagerank_path) if os.path.exists(pagerank_path) else 0
+        return f"{self.indexer.version}:{pagerank_version}"
+
+    def index_files_stamp(self):
+        """
+        Modification times of index/index_version (written last by a build)
+        and the PageRank scores; a change means there is a new index to load.
+        """
+        stamp = []
+        for path in (os.path.join(self.indexer.index_path, 'index_version'), self.pagerank_path()):
+            try:
+                stamp.append(os.stat(path).st_mtime_ns)
+            except OSError:
+                stamp.append(None)
+        return tuple(stamp)
+
+    def check_index(self):
+        """
+        Reload if the index or PageRank was rebuilt on disk, checking at most
+        every INDEX_CHECK_INTERVAL seconds. Called before the cache lookups.
+        """
+        now = time.monotonic()
+        if now - self.index_checked < self.index_check_interval:
+            return
+        self.index_checked = now
+        if self.index_files_stamp() == self.index_stamp:
+            return
+        with self.reload_lock:
+            # Another thread may have reloaded while this one waited
+            stamp = self.index_files_stamp()
+            if stamp != self.index_stamp:
+                print("Index changed on disk, reloading.")
+                self.reload()
+
+    def reload(self):
+        """
+        Load the current index and PageRank from disk (e.g. after a rebuild).
+        """
+        self.index_stamp = self.index_files_stamp()
+        self.indexer.load_index()
+        self.spelling_corrector.load_vocabulary()
+        self.autocomplete.load_vocabulary(self.spelling_corrector.vocabulary)
+        self.pagerank_scores = self.load_pagerank()
+        self.max_pagerank = max(self.pagerank_scores.values(), default=0.0)
+        self.champions.clear()
+        self.doc_count = len(self.indexer.doc_metadata)
+        if self.doc_count > 0:
+            total_len = sum(meta['length'] for meta in self.indexer.doc_metadata.values())
+            self.avg_dl = total_len / self.doc_count
+        self.index_version = self.compute_index_version()
+
+    def cache_stats(self):
+        return {
+            'results': self.result_cache.stats(),
+            'embeddings': self.embedding_cache.stats(),
+            'snippets': self.snippet_cache.stats(),
+            'result_sets': self.result_sets.stats(),
+        }
+
     def load_pagerank(self):
-        path = os.path.join(Config.STORAGE_PATH, 'pagerank.json')
-        if os.path.exists(path):
-            with open(path, 'r') as f:
-                return json.load(f)
-        return {}
+        with startup.timed('pagerank'):
+            return load_scores(Config.STORAGE_PATH)
 
-    def search(self, query):
+    def search(self, query, deadline_ms=None, trace=None, tier='full', record=True):
         """
         Execute a hybrid search query and return ranked results.
+        Repeated (e.g. paginated) queries are served from the result cache.
+        If the semantic branch misses `deadline_ms` (default QUERY_DEADLINE_MS,
+        0 = wait), lexical-only results are returned and not cached.
+        Stage timings go to `trace` (see boogle.metrics); without one, a
+        sampled trace is started and finished here.
+        With QUERY_COALESCE, a query that is already being computed for
+        another request waits for that result instead of searching again.
+        `tier` is the degradation tier an overloaded server admitted the
+        request at (see boogle.query_engine.admission); results computed
+        below 'full' are not cached.
+        With `record`, a query that found something is logged for the
+        typeahead; callers pass False for later pages of the same search,
+        and requests that only waited on another's computation never are.
         Returns: (results_list, corrected_query, was_corrected)
         """
-        # 1. Spell Correction (Raw Vocab)
-        corrected_query, was_corrected = self.spelling_corrector.correct_query(query)
-        search_query = corrected_query if was_corrected else query
-        
-        # 2. Vector Search (Semantic Candidates)
-        # We assume VectorStore is loaded in Indexer
-        # If not, we might need to load it here or rely on Indexer
-        # Current design: QueryEngine -> InvertedIndex -> VectorStore
-        # Let's ensure VectorStore is ready
-        if not hasattr(self.indexer, 'vector_store'):
-            # Should be initialized in InvertedIndex __init__
-            pass
-
-        semantic_candidates = []
-        if self.indexer.vector_store:
-            # Returns [(doc_id, sim_score)]
-            semantic_candidates = self.indexer.vector_store.search(search_query, k=20)
-            
-        semantic_docs = {doc_id: score for doc_id, score in semantic_candidates}
+        owned = trace is None
+        if owned:
+            trace = metrics.start_trace()
+
+        self.check_index()
+        key = (self.index_version, normalize_query(query))
+        with trace.stage('result_cache'):
+            result = self.result_cache.get(key)
+        outcome = 'hit'
+        if result is None:
+            deadline_ms = self.deadline_ms if deadline_ms is None else deadline_ms
+            if self.in_flight is None:
+                result = self._search_and_cache(key, query, deadline_ms, trace, tier)
+                outcome = 'miss'
+            else:
+                start = time.perf_counter()
+                result, shared = self.in_flight.do(key, self._search_and_cache, key, query, deadline_ms, trace, tier)
+                outcome = 'coalesced' if shared else 'miss'
+                if shared:
+                    trace.add('coalesced_wait', time.perf_counter() - start)
+        metrics.QUERIES.inc(label_value=outcome)
+        metrics.SEARCH_TIERS.inc(label_value=tier if outcome == 'miss' else 'cached')
 
-        # 3. Lexical Search (Keyword Candidates)
-        query_tokens = self.processor.tokenize(search_query)
+        # Fresh queries that found something feed the typeahead's query log
+        results, corrected_query, was_corrected = result
+        if results and record and outcome != 'coalesced':
+            self.autocomplete.record(corrected_query if was_corrected else query)
+        if owned:
+            trace.finish()
+        return result
+
+    def search_page(self, query=None, cursor=None, limit=10, deadline_ms=None, trace=None, tier='full'):
+        """
+        One page of ranked results for the JSON API. Without a cursor the
+        query is searched and its ranking stored as a result set; a cursor
+        (see result_sets.encode_cursor) continues from the stored set, or
+        re-runs its query if the set has expired.
+        Returns (result_set, offset, [(doc_id, score, components)], next_cursor or None)
+        Raises ValueError for an invalid cursor.
+        """
+        offset = 0
+        result_set = None
+        if cursor:
+            set_id, offset, query = decode_cursor(cursor)
+            result_set = self.result_sets.get(set_id)
+        if result_set is None:
+            # A cursor whose set expired is a later page, not a new search
+            results, corrected_query, was_corrected = self.search(query, deadline_ms, trace, tier, record=not cursor)
+            result_set = self.result_sets.create(query, results, corrected_query, was_corrected)
+
+        page = result_set.page(offset, limit)
+        end = offset + len(page)
+        next_cursor = encode_cursor(result_set, end) if end < len(result_set) else None
+        return result_set, offset, page, next_cursor
+
+    def _search_and_cache(self, key, query, deadline_ms, trace, tier='full'):
+        results, corrected_query, was_corrected, degraded = self._search(query, deadline_ms, trace, tier)
+        result = (results, corrected_query, was_corrected)
+        if not degraded:
+            self.result_cache.put(key, result)
+        return result
+
+    def suggest(self, text, k=None):
+        """
+        Typeahead completions for partially typed text.
+        """
+        return self.autocomplete.suggest(text, k)
+
+    def semantic_search(self, query, k=20, trace=metrics.NULL_TRACE):
+        """
+        Vector search, reusing the cached embedding of a repeated query.
+        Returns [(doc_id, sim_score)]
+        """
+        vector_store = self.indexer.vector_store
+        key = (self.index_version, vector_store.query_backend, normalize_query(query))
+        embedding = self.embedding_cache.get(key)
+        if embedding is None:
+            with trace.stage('encode'):
+                embedding = vector_store.encode_queries([query])[0]
+            self.embedding_cache.put(key, embedding)
+        with trace.stage('faiss'):
+            hits = vector_store.search_vector(embedding, k=k)
+        trace.count('semantic_candidates', len(hits))
+        return hits
+
+    def search_batch(self, queries, k=None):
+        """
+        Run many queries at once (offline evaluation, bulk consumers).
+        Uncached queries are encoded as one batch and searched with a single
+        FAISS call over the query matrix, while their lexical branches run;
+        postings of terms shared between queries are fetched once. There is
+        no deadline, and queries are not added to the typeahead log.
+        Returns [(results_list, corrected_query, was_corrected)] in query
+        order, each results_list cut to the top k if k is given.
+        """
+        self.check_index()
+        outputs = [None] * len(queries)
+        pending = [] # (position, cache key, rewritten query)
+        for position, query in enumerate(queries):
+            key = (self.index_version, normalize_query(query))
+            outputs[position] = self.result_cache.get(key)
+            if outputs[position] is None:
+                pending.append((position, key, self.rewrite_query(query)))
+
+        if pending:
+            search_queries = [rewritten[3] for _, _, rewritten in pending]
+            semantic_future = self.executor.submit(self.semantic_search_batch, search_queries, 20)
+
+            # Tokenize every query, then load each distinct term's postings once
+            query_tokens = [self.processor.tokenize(q) for q in search_queries]
+            for term in {term for tokens in query_tokens for term in tokens}:
+                self.indexer.posting_ids(term)
+
+            lexical = [self.lexical_branch(rewritten[0], tokens, rewritten[4])
+                       for (_, _, rewritten), tokens in zip(pending, query_tokens)]
+            semantic = semantic_future.result()
+
+            for (position, key, rewritten), tokens, (candidates, lexical_scores), semantic_hits in zip(
+                    pending, query_tokens, lexical, semantic):
+                results = self.rank(tokens, candidates, lexical_scores, dict(semantic_hits))
+                outputs[position] = (results, rewritten[1], rewritten[2])
+                self.result_cache.put(key, outputs[position])
+
+        if k is not None:
+            outputs = [(results[:max(k, 0)], corrected, was_corrected) for results, corrected, was_corrected in outputs]
+        return outputs
+
+    def semantic_search_batch(self, queries, k=20):
+        """
+        Vector search for many queries: cached embeddings are reused, the rest
+        are encoded in one batch, then all rows are searched with one FAISS call.
+        Returns one [(doc_id, sim_score)] list per query ([] for empty queries)
+        """
+        vector_store = self.indexer.vector_store
+        keys = [(self.index_version, vector_store.query_backend, normalize_query(q)) for q in queries]
+        embeddings = [self.embedding_cache.get(key) if q else None for q, key in zip(queries, keys)]
+
+        missing = [i for i, (q, e) in enumerate(zip(queries, embeddings)) if q and e is None]
+        if missing:
+            encoded = vector_store.encode_queries([queries[i] for i in missing])
+            for i, embedding in zip(missing, encoded):
+                embeddings[i] = embedding
+                self.embedding_cache.put(keys[i], embedding)
+
+        rows = [i for i, e in enumerate(embeddings) if e is not None]
+        results = [[] for _ in queries]
+        if rows:
+            for i, hits in zip(rows, vector_store.search_vectors(np.vstack([embeddings[i] for i in rows]), k=k)):
+                results[i] = hits
+        return results
+
+    def _search(self, query, deadline_ms=None, trace=metrics.NULL_TRACE, tier='full'):
+        """
+        Below the 'full' tier phrase checks are skipped; at 'lexical' also
+        the semantic branch, and spelling looks only one edit away.
+        Returns: (results_list, corrected_query, was_corrected, degraded)
+        """
+        start_time = time.monotonic()
+
+        # 1. Operators and spelling correction
+        with trace.stage('spelling'):
+            parsed, corrected_query, was_corrected, search_query, query_phrase = self.rewrite_query(
+                query, max_distance=1 if tier == 'lexical' else None)
         
-        lexical_docs = set()
-        term_docs_map = {}
-        for term in query_tokens:
-            if term in self.indexer.index:
-                docs = {doc_id for doc_id, _ in self.indexer.index[term]}
-                term_docs_map[term] = docs
-                lexical_docs.update(docs)
+        # 2. Semantic branch (query encoding + FAISS) runs on the shared pool
+        # while the lexical branch runs on this thread; torch and FAISS release
+        # the GIL, so latency is max(branch) rather than the sum
+        semantic_future = None
+        if search_query and tier != 'lexical':
+            semantic_future = self.executor.submit(self.semantic_search, search_query, 20, trace)
+
+        # 3. Lexical branch (posting lookups, BM25, phrase checks)
+        with trace.stage('tokenize'):
+            query_tokens = self.processor.tokenize(search_query)
+        candidates, lexical_scores = self.lexical_branch(parsed, query_tokens, query_phrase, trace,
+                                                         phrase=tier == 'full')
+
+        # Join the branches; past the deadline, continue lexical-only
+        with trace.stage('semantic_wait'):
+            semantic_docs, degraded = self.collect_semantic(semantic_future, start_time, deadline_ms)
+
+        # 4.-6. Merge, score and rank
+        with trace.stage('rank'):
+            results = self.rank(query_tokens, candidates, lexical_scores, semantic_docs)
+        trace.count('candidates', len(results))
+        return results, corrected_query, was_corrected, degraded or tier != 'full'
+
+    def rewrite_query(self, query, max_distance=None):
+        """
+        Operators (+required, -excluded, "phrases", title:, site:, OR).
+        Queries that use them are taken literally; plain queries get
+        spelling correction (Raw Vocab) within `max_distance` edits.
+        Returns (parsed, corrected_query, was_corrected, search_query, query_phrase)
+        """
+        parsed = parse_query(query)
+        if parsed.has_operators:
+            search_query = parsed.positive_text()
+            return parsed, query, False, search_query, search_query
+
+        corrected_query, was_corrected = self.spelling_corrector.correct_query(query, max_distance)
+        search_query = corrected_query if was_corrected else query
+        return parsed, corrected_query, was_corrected, search_query, query.lower()
+
+    def lexical_branch(self, parsed, query_tokens, query_phrase, trace=metrics.NULL_TRACE, phrase=True):
+        """
+        Operator queries only score the docs that pass their filters.
+        `phrase` False skips the phrase bonus checks.
+        Returns (candidates or None, {doc_id: lexical scores})
+        """
+        tiered = self.champion_size > 0 and not parsed.has_operators
+        with trace.stage('postings'):
+            if parsed.has_operators:
+                candidates = self.filter_candidates(parsed, query_tokens)
+            elif tiered:
+                candidates = union([self.champion_ids(term) for term in query_tokens]) if query_tokens else []
             else:
-                term_docs_map[term] = set()
+                candidates = union([self.indexer.posting_ids(term) for term in query_tokens]) if query_tokens else []
+        lexical_scores = self.lexical_search(query_tokens, query_phrase, candidates, trace, phrase)
+
+        # Too few results from the champion tier: score the rest of the postings too
+        if (tiered and len(lexical_scores) < Config.CHAMPION_MIN_RESULTS
+                and any(len(self.champion_ids(term)) < len(self.indexer.posting_ids(term)) for term in query_tokens)):
+            metrics.CHAMPION_FALLBACKS.inc()
+            with trace.stage('postings'):
+                tail = [doc_id for doc_id in union([self.indexer.posting_ids(term) for term in query_tokens])
+                        if doc_id not in lexical_scores]
+            lexical_scores.update(self.lexical_search(query_tokens, query_phrase, tail, trace, phrase))
+        return (candidates if parsed.has_operators else None), lexical_scores
 
-        # 4. Merge Candidates (Union)
-        all_candidates = lexical_docs.union(semantic_docs.keys())
+    def champion_ids(self, term):
+        """
+        Tier 1 of a term's postings, sorted by doc id: the champion_size
+        docs where the term has the highest impact on the final score, i.e.
+        its BM25 weight plus the doc's static PageRank part. Terms in at
+        most champion_size docs are all tier 1 (and unknown terms have none),
+        so only longer lists are built and kept, on first use.
+        """
+        ids = self.indexer.posting_ids(term)
+        if len(ids) > self.champion_size:
+            champions = self.champions.get(term)
+            if champions is None:
+                metadata = self.indexer.doc_metadata
+                tfs = np.fromiter((tf for _, tf in self.indexer.index[term]), dtype=np.float64, count=len(ids))
+                lengths = np.fromiter((metadata[doc_id]['length'] if doc_id in metadata else 0 for doc_id in ids),
+                                      dtype=np.float64, count=len(ids))
+                pagerank = np.fromiter((self.pagerank_scores.get(metadata[doc_id]['url'], 0.0) if doc_id in metadata else 0.0
+                                        for doc_id in ids), dtype=np.float64, count=len(ids))
+                idf = math.log((self.doc_count - len(ids) + 0.5) / (len(ids) + 0.5) + 1)
+                bm25 = idf * tfs * (BM25_K1 + 1) / (tfs + BM25_K1 * (1 - BM25_B + BM25_B * lengths / max(self.avg_dl, 1e-9)))
+                # Same weights as `rank`: lexical * 0.7, normalized PageRank * 10 * 0.15
+                norm_pr = pagerank / self.max_pagerank if self.max_pagerank > 0 else pagerank
+                impact = bm25 * 0.7 + norm_pr * 1.5
+                top = np.argpartition(-impact, self.champion_size)[:self.champion_size]
+                champions = [ids[i] for i in np.sort(top)]
+                self.champions.put(term, champions)
+            return champions
+        return ids
+
+    def rank(self, query_tokens, candidates, lexical_scores, semantic_docs):
+        """
+        Combine lexical, semantic and PageRank scores of every candidate.
+        Returns results sorted by score.
+        """
+        # 4. Merge Candidates (Union). Semantic matches cannot bypass operator filters
+        if candidates is not None:
+            all_candidates = set(lexical_scores)
+        else:
+            all_candidates = set(lexical_scores).union(semantic_docs.keys())
         
         if not all_candidates:
-             return [], corrected_query, was_corrected
+             return []
+
+        max_pr = self.max_pagerank
 
-        # Precompute max PR
-        max_pr = 1.0
-        if self.pagerank_scores:
-            max_pr = max(self.pagerank_scores.values()) if self.pagerank_scores else 1.0
-            
         # 5. Score Candidates
         scores = []
-        original_query_str = query.lower()
+        no_match = (0.0, 0.0, len(query_tokens), 1.0)
         
         for doc_id in all_candidates:
             # Metadata
             if doc_id not in self.indexer.doc_metadata:
                 continue
                 
-            # -- Lexical Score (BM25) --
-            present_terms = [t for t in query_tokens if doc_id in term_docs_map.get(t, set())]
-            missing_terms = len(query_tokens) - len(present_terms)
-            text_score = self.calculate_bm25(doc_id, present_terms) if present_terms else 0.0
-            
-            # Penalties/Bonuses
-            completeness_penalty = 0.5 ** missing_terms if query_tokens else 1.0
-            full_match_bonus = 1.2 if missing_terms == 0 and query_tokens else 1.0
-            
-            phrase_bonus = 1.0
-            if len(present_terms) >= len(query_tokens) * 0.5 and len(query_tokens) > 1:
-                if self.check_phrase_match(doc_id, original_query_str):
-                    phrase_bonus = 1.5
-
-            adjusted_text_score = text_score * completeness_penalty * full_match_bonus * phrase_bonus
+            # -- Lexical Score (BM25 with penalties/bonuses) --
+            text_score, adjusted_text_score, missing_terms, phrase_bonus = lexical_scores.get(doc_id, no_match)
             
             # -- Semantic Score --
-            # Vector score is roughly cosine similarity [0, 1] (if using Cosine) or 1 - L2_dist/2. 
-            # From VectorStore implementation, we returned 1 - L2^2 / 2.
+            # Vector score is the cosine similarity from VectorStore.
             # Let's clip it to [0, 1] just in case
             vector_score = max(0.0, min(1.0, semantic_docs.get(doc_id, 0.0)))
             
@@ -145,54 +517,189 @@ class QueryEngine:
         # 6. Rank
         scores.sort(key=lambda x: x['score'], reverse=True)
         
-        return scores, corrected_query, was_corrected
+        return scores
+
+    def filter_candidates(self, parsed, query_tokens):
+        """
+        Docs that satisfy an operator query, found before any scoring:
+        required terms, title terms, phrase words and OR groups (each a union)
+        are intersected over sorted postings, then excluded terms, site:,
+        title:, -title: and phrases are checked on that (small) set.
+        Returns a sorted list of doc_ids.
+        """
+        index = self.indexer
+        tokenize = self.processor.tokenize
+
+        conjunction = []
+        for text in parsed.required + parsed.title_terms + parsed.phrases:
+            conjunction.extend(index.posting_ids(term) for term in tokenize(text))
+        for group in parsed.or_groups:
+            terms = [term for word in group for term in tokenize(word)]
+            if terms:
+                conjunction.append(union([index.posting_ids(term) for term in terms]))
+
+        if conjunction:
+            candidates = intersect(conjunction)
+        elif query_tokens:
+            candidates = union([index.posting_ids(term) for term in query_tokens])
+        else:
+            # Only filters (e.g. `site:` alone)
+            candidates = sorted(index.doc_metadata)
+
+        excluded = set()
+        for word in parsed.excluded:
+            for term in tokenize(word):
+                excluded.update(index.posting_ids(term))
+        title_terms = {term for word in parsed.title_terms for term in tokenize(word)}
+        excluded_titles = [terms for terms in (set(tokenize(words)) for words in parsed.excluded_titles) if terms]
+
+        results = []
+        for doc_id in candidates:
+            meta = index.doc_metadata.get(doc_id)
+            if meta is None or doc_id in excluded:
+                continue
+            if parsed.sites or parsed.excluded_sites:
+                host = urlparse(meta['url']).netloc.lower()
+                if parsed.sites and not any(site_matches(host, site) for site in parsed.sites):
+                    continue
+                if any(site_matches(host, site) for site in parsed.excluded_sites):
+                    continue
+            if title_terms or excluded_titles:
+                title = set(tokenize(meta['title']))
+                if not title_terms.issubset(title):
+                    continue
+                if any(terms.issubset(title) for terms in excluded_titles):
+                    continue
+            if parsed.phrases or parsed.excluded_phrases:
+                try:
+                    text = ' '.join(self.snippets.load_text(doc_id).lower().split())
+                except OSError:
+                    continue
+                if not all(phrase in text for phrase in parsed.phrases):
+                    continue
+                if any(phrase in text for phrase in parsed.excluded_phrases):
+                    continue
+            results.append(doc_id)
+        return results
+
+    def lexical_search(self, query_tokens, query_phrase, candidates=None, trace=metrics.NULL_TRACE, phrase=True):
+        """
+        Lexical branch: gather keyword candidates and score them.
+        `candidates` restricts scoring to those docs; by default every doc
+        containing any query term is scored.
+        Returns {doc_id: (bm25, adjusted_text_score, missing_terms, phrase_bonus)}
+        """
+        if candidates is None:
+            candidates = union([self.indexer.posting_ids(term) for term in query_tokens]) if query_tokens else []
+
+        # Per-doc stage times are summed by hand (and only when traced) to keep
+        # the loop cheap
+        timed = trace.enabled
+        bm25_seconds = phrase_seconds = 0.0
+        phrase_checks = 0
+
+        terms = self.term_postings(query_tokens)
+        results = {}
+        for doc_id in candidates:
+            if doc_id not in self.indexer.doc_metadata:
+                continue
+
+            if timed:
+                start = time.perf_counter()
+            # (tf, idf) of the query terms in this doc, by bisecting each term's sorted ids
+            matched = []
+            for ids, postings, idf in terms:
+                i = bisect_left(ids, doc_id)
+                if i < len(ids) and ids[i] == doc_id:
+                    matched.append((postings[i][1], idf))
+            missing_terms = len(query_tokens) - len(matched)
+            text_score = self.calculate_bm25(doc_id, matched) if matched else 0.0
+            if timed:
+                bm25_seconds += time.perf_counter() - start
+            
+            # Penalties/Bonuses
+            completeness_penalty = 0.5 ** missing_terms if query_tokens else 1.0
+            full_match_bonus = 1.2 if missing_terms == 0 and query_tokens else 1.0
+            
+            phrase_bonus = 1.0
+            if phrase and len(matched) >= len(query_tokens) * 0.5 and len(query_tokens) > 1:
+                phrase_checks += 1
+                if timed:
+                    start = time.perf_counter()
+                if self.check_phrase_match(doc_id, query_phrase):
+                    phrase_bonus = 1.5
+                if timed:
+                    phrase_seconds += time.perf_counter() - start
+
+            adjusted_text_score = text_score * completeness_penalty * full_match_bonus * phrase_bonus
+            results[doc_id] = (text_score, adjusted_text_score, missing_terms, phrase_bonus)
+
+        trace.add('bm25', bm25_seconds)
+        trace.add('phrase', phrase_seconds)
+        trace.count('lexical_candidates', len(results))
+        trace.count('phrase_checks', phrase_checks)
+        return results
+
+    def collect_semantic(self, future, start_time, deadline_ms):
+        """
+        Wait for the semantic branch until the query deadline.
+        Returns ({doc_id: sim_score}, degraded) where degraded means the
+        deadline passed and results are lexical-only.
+        """
+        if future is None:
+            return {}, False
+        timeout = None
+        if deadline_ms:
+            timeout = max(0.0, deadline_ms / 1000 - (time.monotonic() - start_time))
+        try:
+            return dict(future.result(timeout=timeout)), False
+        except FutureTimeout:
+            # Let it finish in the background; its embedding still lands in the cache
+            self.semantic_timeouts += 1
+            metrics.SEMANTIC_TIMEOUTS.inc()
+            return {}, True
 
     def check_phrase_match(self, doc_id, query_phrase):
         """
         Check if the exact query phrase appears in the document text.
         """
-        path = os.path.join(Config.STORAGE_PATH, 'raw', f"{doc_id}.html")
         try:
-            with open(path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            # Fast check on raw content or processed text?
-            # Raw content might have tags, processed text (from clean_html) is better.
-            _, _, text = self.processor.clean_html(content)
+            # Stored clean text (same as clean_html output), raw HTML for old indexes
+            text = self.snippets.load_text(doc_id)
             return query_phrase in text.lower()
         except:
             return False
 
-    def calculate_bm25(self, doc_id, query_tokens):
+    def term_postings(self, query_tokens):
+        """
+        (sorted doc ids, postings, idf) of each known query term, looked up
+        once per query: with memory-mapped postings every lookup is a binary
+        search over the term table, too slow to repeat per candidate doc.
+        """
+        terms = []
+        for term in query_tokens:
+            postings = self.indexer.index.get(term)
+            if not postings:
+                continue
+            # IDF; doc_freq = number of docs containing term
+            doc_freq = len(postings)
+            idf = math.log((self.doc_count - doc_freq + 0.5) / (doc_freq + 0.5) + 1)
+            terms.append((self.indexer.posting_ids(term, postings), postings, idf))
+        return terms
+
+    def calculate_bm25(self, doc_id, matched):
+        """
+        BM25 of a doc from the (tf, idf) of the query terms it contains
+        (see `term_postings`).
+        """
         score = 0
-        k1 = 1.5
-        b = 0.75
+        k1 = BM25_K1
+        b = BM25_B
         
         doc_meta = self.indexer.doc_metadata[doc_id]
         doc_len = doc_meta['length']
         
-        for term in query_tokens:
-            if term not in self.indexer.index:
-                continue
-                
-            # Get term frequency in this doc
-            # This is O(N) lookup in list, could be O(1) if index was dict.
-            # Optimization: Pre-convert postings to dict or iterate once?
-            # For 200 pages, list iteration is instantaneous.
-            tf = 0
-            doc_list = self.indexer.index[term]
-            for d_id, freq in doc_list:
-                if d_id == doc_id:
-                    tf = freq
-                    break
-            
-            if tf == 0:
-                continue
-                
-            # IDF
-            # doc_freq = number of docs containing term
-            doc_freq = len(doc_list)
-            idf = math.log((self.doc_count - doc_freq + 0.5) / (doc_freq + 0.5) + 1)
-            
+        for tf, idf in matched:
             # BM25 term weight
             numerator = tf * (k1 + 1)
             denominator = tf + k1 * (1 - b + b * (doc_len / self.avg_dl))
@@ -200,51 +707,39 @@ class QueryEngine:
             
         return score
 
-    def get_snippet(self, doc_id, query):
+    def get_snippet(self, doc_id, query, trace=None):
         """
-        Generate a snippet for the result.
+        Generate a snippet for the result (cached per doc and query).
         """
-        # Load raw content
-        path = os.path.join(Config.STORAGE_PATH, 'raw', f"{doc_id}.html")
-        try:
-            with open(path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            title, text = self.processor.clean_html(content)
-            
-            # Simple snippet: Find best window of occurrence
-            query_tokens = self.processor.tokenize(query)
-            text_lower = text.lower()
-            
-            # Find all query term positions
-            token_positions = []
-            for term in query_tokens:
-                start = 0
-                while True:
-                    pos = text_lower.find(term, start)
-                    if pos == -1: break
-                    token_positions.append(pos)
-                    start = pos + len(term)
-            
-            token_positions.sort()
-            
-            if not token_positions:
-                return text[:200] + "..."
-                
-            # Pick the window with most terms or just first occurence if sparse
-            # Simple approach: Start from first term found
-            best_pos = token_positions[0]
-            
-            # Try to start a bit before
-            start = max(0, best_pos - 60)
-            end = min(len(text), start + 240)
-            
-            snippet = text[start:end].replace('\n', ' ')
-            
-            # Bold terms (in HTML) - or leave to frontend?
-            # Let's just return text for now, maybe add ...
-            if start > 0: snippet = "..." + snippet
-            if end < len(text): snippet = snippet + "..."
-            
-            return snippet
-        except Exception:
-            return "Preview unavailable"
+        return self.get_snippets([doc_id], query, trace)[doc_id]
+
+    def get_snippets(self, doc_ids, query, trace=None):
+        """
+        Snippets for a page of results, built from stored clean text.
+        Returns {doc_id: snippet_html}
+        """
+        owned = trace is None
+        if owned:
+            trace = metrics.start_trace()
+        with trace.stage('snippets'):
+            snippets = self._get_snippets(doc_ids, query)
+        if owned:
+            trace.finish()
+        return snippets
+
+    def _get_snippets(self, doc_ids, query):
+        query_key = normalize_query(query)
+        snippets = {}
+        missing = []
+        for doc_id in doc_ids:
+            snippet = self.snippet_cache.get((self.index_version, doc_id, query_key))
+            if snippet is None:
+                missing.append(doc_id)
+            else:
+                snippets[doc_id] = snippet
+
+        if missing:
+            for doc_id, snippet in self.snippets.generate_batch(missing, query).items():
+                self.snippet_cache.put((self.index_version, doc_id, query_key), snippet)
+                snippets[doc_id] = snippet
+        return snippets
@@ -0,0 +1,49 @@
+from bisect import bisect_left
+
+
+def gallop(ids, target, lo=0):
+    """
+    Smallest i >= lo with ids[i] >= target in a sorted list. Probes lo+1,
+    lo+3, lo+7, ... before a binary search, so skipping ahead d entries costs
+    O(log d) instead of O(log n) or O(d).
+    """
+    n = len(ids)
+    step = 1
+    hi = lo
+    while hi < n and ids[hi] < target:
+        lo = hi + 1
+        hi += step
+        step *= 2
+    return bisect_left(ids, target, lo, min(hi, n))
+
+
+def intersect(lists):
+    """
+    Intersection of sorted doc-id lists, as a sorted list. Starts from the
+    shortest list and gallops through the longer ones, so the cost is driven
+    by the rarest term rather than the most common one.
+    """
+    if not lists:
+        return []
+    lists = sorted(lists, key=len)
+    result = lists[0]
+    for other in lists[1:]:
+        if not result:
+            break
+        matched = []
+        position = 0
+        for doc_id in result:
+            position = gallop(other, doc_id, position)
+            if position == len(other):
+                break
+            if other[position] == doc_id:
+                matched.append(doc_id)
+        result = matched
+    return list(result)
+
+
+def union(lists):
+    """Union of sorted doc-id lists, as a sorted list."""
+    if len(lists) == 1:
+        return list(lists[0])
+    return sorted(set().union(*lists))
@@ -0,0 +1,131 @@
+import re
+
+# One query item: optional +/- sign, optional field prefix, then a quoted
+# phrase or a bare word, e.g. +python, -snake, "exact words", title:turing,
+# site:wikipedia.org, -"monty python"
+TOKEN_RE = re.compile(r'([+-]?)(?:(title|site):)?(?:"([^"]*)"?|(\S+))')
+
+
+class ParsedQuery:
+    """
+    Structured form of a search query.
+
+        word            optional term (scored, may be missing)
+        +word           required term
+        -word           excluded term
+        "a phrase"      required phrase (all words, verified against the text)
+        -"a phrase"     excluded phrase
+        title:word      required term that must appear in the title
+        -title:word     no results with the word in the title
+        site:host       only results whose URL host is (a subdomain of) host
+        -site:host      no results from host or its subdomains
+        a OR b OR c     at least one of the terms is required
+
+    Words are split on whitespace and lowercased; runs of whitespace inside
+    a phrase count as one space, and an unclosed quote runs to the end of
+    the query. title:"a b" requires (-title:"a b" excludes) titles with
+    all of the words. OR (upper case) only joins plain words on both sides
+    of it; anywhere else (first, last, next to an operator) it is the
+    ordinary word "or". + on a phrase, title: or site: changes nothing.
+    """
+    def __init__(self):
+        self.terms = []            # optional words
+        self.required = []         # +word
+        self.excluded = []         # -word
+        self.phrases = []          # "a phrase"
+        self.excluded_phrases = [] # -"a phrase"
+        self.or_groups = []        # [[word, word], ...]
+        self.title_terms = []      # title:word
+        self.excluded_titles = []  # -title:word, -title:"a b" (all of the words)
+        self.sites = []            # site:host
+        self.excluded_sites = []   # -site:host
+
+    @property
+    def has_operators(self):
+        """True if anything beyond plain optional words was used."""
+        return any([self.required, self.excluded, self.phrases, self.excluded_phrases,
+                    self.or_groups, self.title_terms, self.excluded_titles, self.sites, self.excluded_sites])
+
+    @property
+    def has_constraints(self):
+        """True if some term must be present (so candidates come from an intersection)."""
+        return any([self.required, self.phrases, self.or_groups, self.title_terms])
+
+    def positive_text(self):
+        """
+        Every word the results should be about, without operators; used for
+        BM25, phrase bonus and the semantic branch.
+        """
+        words = list(self.terms) + list(self.required) + list(self.title_terms)
+        words += [word for group in self.or_groups for word in group]
+        words += list(self.phrases)
+        return ' '.join(words)
+
+    def __repr__(self):
+        fields = {k: v for k, v in vars(self).items() if v}
+        return f"ParsedQuery({fields})"
+
+
+def parse_query(query):
+    """
+    Parse the query syntax documented on ParsedQuery. Anything that is not an
+    operator is an optional term, so plain queries parse to `terms` only.
+    """
+    parsed = ParsedQuery()
+    tokens = []  # (sign, field, phrase, word) in query order, OR kept as None
+    for match in TOKEN_RE.finditer(query):
+        sign, field, phrase, word = match.groups()
+        if phrase is None and word == 'OR' and not sign and not field:
+            tokens.append(None)
+            continue
+        if phrase is not None:
+            phrase = ' '.join(phrase.lower().split())
+            if not phrase:
+                continue # "" or "   "
+        tokens.append((sign, field, phrase, word.lower() if word is not None else None))
+
+    items = []  # tokens with `a OR b` groups merged as ('or', [words])
+    for i, item in enumerate(tokens):
+        if item is None:
+            following = tokens[i + 1] if i + 1 < len(tokens) else None
+            if items and following is not None and _is_plain_word(following) and \
+                    (items[-1][0] == 'or' or _is_plain_word(items[-1])):
+                previous = items.pop()
+                items.append(('or', previous[1] if previous[0] == 'or' else [previous[3]]))
+            else:
+                items.append(('', None, None, 'or')) # nothing to join: the plain word
+            continue
+        if items and items[-1][0] == 'or' and i > 0 and tokens[i - 1] is None:
+            items[-1][1].append(item[3]) # right-hand side of an OR (checked plain above)
+            continue
+        items.append(item)
+
+    for item in items:
+        if item[0] == 'or':
+            parsed.or_groups.append(item[1])
+            continue
+        sign, field, phrase, word = item
+        if field == 'site':
+            host = re.sub(r'^\w+://', '', phrase or word or '').strip('/')
+            if host:
+                (parsed.excluded_sites if sign == '-' else parsed.sites).append(host)
+        elif field == 'title':
+            # title:"a b" requires each word in the title
+            words = (phrase or word).split()
+            if sign == '-':
+                parsed.excluded_titles.append(' '.join(words))
+            else:
+                parsed.title_terms.extend(words)
+        elif phrase is not None:
+            (parsed.excluded_phrases if sign == '-' else parsed.phrases).append(phrase)
+        elif sign == '+':
+            parsed.required.append(word)
+        elif sign == '-':
+            parsed.excluded.append(word)
+        else:
+            parsed.terms.append(word)
+    return parsed
+
+
+def _is_plain_word(item):
+    return len(item) == 4 and item[0] == '' and item[1] is None and item[2] is None
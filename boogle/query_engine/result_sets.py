@@ -0,0 +1,79 @@
+import base64
+import json
+import secrets
+import numpy as np
+from boogle.config import Config
+from boogle.query_engine.cache import LRUCache
+
+
+class ResultSet:
+    """
+    One query's ranked results, kept compact for paging: doc ids and scores
+    in rank order, plus the score components (shared with the result cache,
+    not copied).
+    """
+    __slots__ = ('id', 'query', 'corrected_query', 'was_corrected', 'doc_ids', 'scores', 'components')
+
+    def __init__(self, query, results, corrected_query, was_corrected):
+        self.id = secrets.token_urlsafe(9)
+        self.query = query
+        self.corrected_query = corrected_query
+        self.was_corrected = was_corrected
+        self.doc_ids = [res['doc_id'] for res in results]
+        self.scores = np.fromiter((res['score'] for res in results), dtype=np.float64, count=len(results))
+        self.components = [res['components'] for res in results]
+
+    def __len__(self):
+        return len(self.doc_ids)
+
+    def page(self, offset, limit):
+        """[(doc_id, score, components)] of results offset .. offset + limit."""
+        end = min(offset + limit, len(self.doc_ids))
+        return [(self.doc_ids[i], float(self.scores[i]), self.components[i]) for i in range(offset, end)]
+
+
+def encode_cursor(result_set, offset):
+    """
+    Opaque cursor for the page starting at `offset`. It carries the query,
+    so a page whose result set has expired is served from a fresh search.
+    """
+    payload = json.dumps({'s': result_set.id, 'o': offset, 'q': result_set.query}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Returns (result set id, offset, query); raises ValueError if the cursor
+    was not made by encode_cursor.
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        set_id, offset, query = payload['s'], payload['o'], payload['q']
+    except (ValueError, TypeError, KeyError):
+        raise ValueError('invalid cursor')
+    if not isinstance(set_id, str) or not isinstance(query, str) or not isinstance(offset, int) or offset < 0:
+        raise ValueError('invalid cursor')
+    return set_id, offset, query
+
+
+class ResultSetStore:
+    """
+    Bounded (LRU, RESULT_SET_SIZE sets) store of ranked result sets that
+    expire after RESULT_SET_TTL seconds, so later pages of a query only
+    cost metadata and snippet lookups.
+    """
+    def __init__(self, maxsize=None, ttl=None):
+        maxsize = Config.RESULT_SET_SIZE if maxsize is None else maxsize
+        ttl = Config.RESULT_SET_TTL if ttl is None else ttl
+        self.sets = LRUCache(maxsize, ttl or None)
+
+    def create(self, query, results, corrected_query, was_corrected):
+        result_set = ResultSet(query, results, corrected_query, was_corrected)
+        self.sets.put(result_set.id, result_set)
+        return result_set
+
+    def get(self, set_id):
+        return self.sets.get(set_id)
+
+    def stats(self):
+        return self.sets.stats()
@@ -0,0 +1,139 @@
+import os
+import re
+from html import escape
+from boogle.config import Config
+
+WORD_RE = re.compile(r'\w+')
+
+
+class SnippetGenerator:
+    """
+    Builds result snippets from the clean text the indexer stores per document
+    (text/<doc_id>.txt), so rendering a results page does no HTML parsing.
+    The snippet is the window of SNIPPET_WORDS words with the most distinct
+    query terms (then most hits), with matches in <b>.
+    """
+    def __init__(self, processor):
+        self.processor = processor
+        self.text_path = os.path.join(Config.STORAGE_PATH, 'text')
+        self.raw_path = os.path.join(Config.STORAGE_PATH, 'raw')
+        self.window = Config.SNIPPET_WORDS
+        self.stem_cache = {}
+
+    def load_text(self, doc_id):
+        """
+        Clean text of a document; falls back to parsing the raw HTML for
+        indexes built before clean text was stored.
+        """
+        path = os.path.join(self.text_path, f"{doc_id}.txt")
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                return f.read()
+
+        with open(os.path.join(self.raw_path, f"{doc_id}.html"), 'r', encoding='utf-8') as f:
+            _, _, text = self.processor.clean_html(f.read())
+        return text
+
+    def stem(self, word):
+        stem = self.stem_cache.get(word)
+        if stem is None:
+            stem = self.processor.stemmer.stem(word)
+            if len(self.stem_cache) < 100000:
+                self.stem_cache[word] = stem
+        return stem
+
+    def find_hits(self, text, query_stems):
+        """
+        Returns [(word_index, start, end, stem)] for words whose stem is a query term.
+        As a cheap prefilter, a word is only stemmed if it starts with a query
+        stem minus its last character. That covers the regular suffixes
+        Porter strips (happy, happiness -> happi) but not the few words
+        whose stem changes earlier letters: dying and lying stem to die and
+        lie yet are skipped, so they are not highlighted even though they
+        match in the index. Forms the stemmer never merges (ran/run,
+        mice/mouse) are not query hits at all.
+        """
+        prefixes = {stem[:max(2, len(stem) - 1)] for stem in query_stems}
+        lengths = sorted({len(p) for p in prefixes})
+        hits = []
+        for i, match in enumerate(WORD_RE.finditer(text)):
+            word = match.group().lower()
+            if not any(word[:n] in prefixes for n in lengths):
+                continue
+            stem = self.stem(word)
+            if stem in query_stems:
+                hits.append((i, match.start(), match.end(), stem))
+        return hits
+
+    def best_window(self, hits):
+        """
+        Two-pointer sweep over hits (in text order) for the window of
+        `self.window` words covering the most distinct terms, then most hits.
+        Linear in the number of hits. Returns (first_hit, last_hit) indices.
+        """
+        counts = {}
+        best = (0, 0)
+        best_span = (0, 0)
+        left = 0
+        for right, (position, _, _, stem) in enumerate(hits):
+            counts[stem] = counts.get(stem, 0) + 1
+            while position - hits[left][0] >= self.window:
+                left_stem = hits[left][3]
+                counts[left_stem] -= 1
+                if not counts[left_stem]:
+                    del counts[left_stem]
+                left += 1
+            score = (len(counts), right - left + 1)
+            if score > best:
+                best = score
+                best_span = (left, right)
+        return best_span
+
+    def render(self, text, hits, span):
+        """
+        Cut the text around the chosen hits and bold every hit inside it.
+        """
+        first, last = hits[span[0]], hits[span[1]]
+        words = [m.span() for m in WORD_RE.finditer(text)]
+
+        # Center the hits in the word window
+        slack = max(0, self.window - (last[0] - first[0] + 1))
+        start_word = max(0, first[0] - slack // 3)
+        end_word = min(len(words), start_word + self.window)
+        start_word = max(0, end_word - self.window)
+        start, end = words[start_word][0], words[end_word - 1][1]
+
+        pieces = []
+        cursor = start
+        for _, hit_start, hit_end, _ in hits:
+            if hit_start < start or hit_end > end:
+                continue
+            pieces.append(escape(text[cursor:hit_start]))
+            pieces.append(f"<b>{escape(text[hit_start:hit_end])}</b>")
+            cursor = hit_end
+        pieces.append(escape(text[cursor:end]))
+
+        snippet = ''.join(pieces).replace('\n', ' ')
+        if start > 0: snippet = "..." + snippet
+        if end < len(text): snippet = snippet + "..."
+        return snippet
+
+    def generate(self, doc_id, query_stems):
+        try:
+            text = self.load_text(doc_id)
+        except OSError:
+            return "Preview unavailable"
+
+        hits = self.find_hits(text, query_stems) if query_stems else []
+        if not hits:
+            snippet = escape(text[:200]).replace('\n', ' ')
+            return snippet + "..." if len(text) > 200 else snippet
+        return self.render(text, hits, self.best_window(hits))
+
+    def generate_batch(self, doc_ids, query):
+        """
+        Snippets for a whole results page; the query is tokenized once.
+        Returns {doc_id: snippet_html}
+        """
+        query_stems = set(self.processor.tokenize(query))
+        return {doc_id: self.generate(doc_id, query_stems) for doc_id in doc_ids}
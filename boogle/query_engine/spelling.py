@@ -1,12 +1,16 @@
 import os
 import json
-import collections
+import logging
 from boogle.config import Config
+from boogle.query_engine.symspell import SymSpell
+
+logger = logging.getLogger(__name__)
 
 class SpellingCorrector:
     def __init__(self):
         self.vocabulary = {} # word -> count
         self.total_words = 0
+        self.symspell = SymSpell()
         self.load_vocabulary()
 
     def load_vocabulary(self):
@@ -25,45 +29,35 @@ class SpellingCorrector:
                     self.total_words = len(vocab_list)
             else:
                 print("Warning: No vocabulary found. Spelling correction disabled.")
+                return
+
+        # Precomputed at index build; rebuilt here for indexes that predate it
+        symspell_path = os.path.join(Config.STORAGE_PATH, 'index', 'symspell.npz')
+        if os.path.exists(symspell_path):
+            self.symspell = SymSpell.load(symspell_path)
+        else:
+            self.symspell = SymSpell().build(self.vocabulary)
 
     def P(self, word): 
         "Probability of `word`."
         N = self.total_words if self.total_words > 0 else 1
         return self.vocabulary.get(word, 0) / N
 
-    def correction(self, word): 
-        "Most probable spelling correction for word."
+    def correction(self, word, max_distance=None): 
+        "Most probable spelling correction for word (within max_distance edits, default 2)."
         if not self.vocabulary:
             return word
         if word in self.vocabulary:
             return word
         
-        # Candidates: known edits distance 1, 2, or known word itself
-        candidates = (self.known([word]) or self.known(self.edits1(word)) or self.known(self.edits2(word)) or [word])
-        return max(candidates, key=self.P)
+        # Most frequent known word within edit distance 2, via the symmetric-delete index
+        return self.symspell.lookup(word, max_distance) or word
 
-    def known(self, words): 
-        "The subset of `words` that appear in the dictionary of WORDS."
-        return set(w for w in words if w in self.vocabulary)
-
-    def edits1(self, word):
-        "All edits that are one edit away from `word`."
-        letters    = 'abcdefghijklmnopqrstuvwxyz'
-        splits     = [(word[:i], word[i:])    for i in range(len(word) + 1)]
-        deletes    = [L + R[1:]               for L, R in splits if R]
-        transposes = [L + R[1] + R[0] + R[2:] for L, R in splits if len(R)>1]
-        replaces   = [L + c + R[1:]           for L, R in splits if R for c in letters]
-        inserts    = [L + c + R               for L, R in splits for c in letters]
-        return set(deletes + transposes + replaces + inserts)
-
-    def edits2(self, word): 
-        "All edits that are two edits away from `word`."
-        return (e2 for e1 in self.edits1(word) for e2 in self.edits1(e1))
-        
     SKIP_WORDS = {'hi', 'hello', 'hey', 'thanks', 'ok', 'okay', 'boogle', 'search'}
 
-    def correct_query(self, query):
+    def correct_query(self, query, max_distance=None):
         """
+        `max_distance` lowers the edit distance searched (cheaper under load).
         Returns (corrected_query, was_corrected)
         """
         if not self.vocabulary:
@@ -73,42 +67,42 @@ class SpellingCorrector:
         corrected_words = []
         was_corrected = False
         
-        print(f"[SPELL] Processing query: '{query}'")
+        logger.debug("Processing query: '%s'", query)
         
         for word in words:
             # Rule 1: Length check (Skip short words)
             if len(word) < 3:
-                print(f"[SPELL] SKIP '{word}': Length < 3")
+                logger.debug("SKIP '%s': Length < 3", word)
                 corrected_words.append(word)
                 continue
                 
             # Rule 2: Reserved/Skip words
             if word in self.SKIP_WORDS:
-                print(f"[SPELL] SKIP '{word}': Reserved word")
+                logger.debug("SKIP '%s': Reserved word", word)
                 corrected_words.append(word)
                 continue
                 
             # Rule 3: Valid Raw Word (Exact match in vocabulary)
             if word in self.vocabulary:
-                print(f"[SPELL] SKIP '{word}': Valid raw word in vocabulary")
+                logger.debug("SKIP '%s': Valid raw word in vocabulary", word)
                 corrected_words.append(word)
                 continue
             
             # Rule 4: Alpha check
             if not word.isalpha():
-                print(f"[SPELL] SKIP '{word}': Non-alphabetic")
+                logger.debug("SKIP '%s': Non-alphabetic", word)
                 corrected_words.append(word)
                 continue
                 
             # Attempt Correction
-            candidate = self.correction(word)
+            candidate = self.correction(word, max_distance)
             
             if candidate != word:
-                print(f"[SPELL] CORRECT '{word}' -> '{candidate}'")
+                logger.debug("CORRECT '%s' -> '%s'", word, candidate)
                 corrected_words.append(candidate)
                 was_corrected = True
             else:
-                print(f"[SPELL] SKIP '{word}': No correction found")
+                logger.debug("SKIP '%s': No correction found", word)
                 corrected_words.append(word)
             
         return ' '.join(corrected_words), was_corrected
@@ -0,0 +1,152 @@
+import hashlib
+import numpy as np
+
+
+def _hash(text):
+    """Stable 64-bit key for a delete string (Python's hash() is salted per process)."""
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def deletes(word, max_distance):
+    """
+    All strings reachable from `word` by deleting up to `max_distance` characters,
+    including the word itself.
+    """
+    results = {word}
+    frontier = {word}
+    for _ in range(max_distance):
+        frontier = {w[:i] + w[i + 1:] for w in frontier if len(w) > 1 for i in range(len(w))}
+        results |= frontier
+    return results
+
+
+def edit_distance(a, b, max_distance):
+    """
+    Optimal string alignment distance (Damerau-Levenshtein with adjacent
+    transpositions), or max_distance + 1 once it is certain to exceed it.
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+class SymSpell:
+    """
+    Symmetric-delete spelling index.
+
+    At build time every vocabulary word's prefix (prefix_length chars) is
+    expanded into its deletes up to max_distance. A lookup only generates the
+    deletes of the query word's prefix, so the work per lookup is bounded by the
+    prefix length, not the word length, and no insert/replace candidates are
+    ever enumerated.
+
+    The index is kept as sorted 64-bit delete hashes with CSR offsets into an
+    array of word ids, which persists compactly with np.savez.
+    """
+    def __init__(self, max_distance=2, prefix_length=7):
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self.words = [] # word id -> word
+        self.counts = np.empty(0, dtype=np.int64)
+        self.lengths = np.empty(0, dtype=np.int32)
+        self.word_ids = {} # word -> word id
+        self.keys = np.empty(0, dtype=np.uint64) # sorted delete hashes
+        self.offsets = np.zeros(1, dtype=np.int64) # keys[i] -> ids[offsets[i]:offsets[i + 1]]
+        self.ids = np.empty(0, dtype=np.int32)
+
+    def build(self, vocabulary):
+        """
+        Build from a {word: count} dict.
+        """
+        self.words = sorted(vocabulary)
+        self.counts = np.array([vocabulary[w] for w in self.words], dtype=np.int64)
+        self.lengths = np.array([len(w) for w in self.words], dtype=np.int32)
+        self.word_ids = {w: i for i, w in enumerate(self.words)}
+
+        pairs = {}
+        for word_id, word in enumerate(self.words):
+            for delete in deletes(word[:self.prefix_length], self.max_distance):
+                pairs.setdefault(_hash(delete), []).append(word_id)
+
+        self.keys = np.array(sorted(pairs), dtype=np.uint64)
+        lengths = [len(pairs[int(key)]) for key in self.keys]
+        self.offsets = np.zeros(len(self.keys) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=self.offsets[1:])
+        self.ids = np.array([i for key in self.keys for i in pairs[int(key)]], dtype=np.int32)
+        return self
+
+    def lookup(self, word, max_distance=None):
+        """
+        Most frequent vocabulary word at the smallest edit distance (<= max_distance),
+        or None if there is none.
+        """
+        max_distance = self.max_distance if max_distance is None else min(max_distance, self.max_distance)
+        if word in self.word_ids:
+            return word
+        if not len(self.keys):
+            return None
+
+        hashes = np.array([_hash(d) for d in deletes(word[:self.prefix_length], max_distance)], dtype=np.uint64)
+        positions = np.searchsorted(self.keys, hashes)
+        found = positions < len(self.keys)
+        positions, hashes = positions[found], hashes[found]
+        positions = positions[self.keys[positions] == hashes]
+        if not len(positions):
+            return None
+
+        candidates = np.unique(np.concatenate([self.ids[self.offsets[p]:self.offsets[p + 1]] for p in positions]))
+        # Words whose length differs by more than max_distance cannot match
+        candidates = candidates[np.abs(self.lengths[candidates] - len(word)) <= max_distance]
+
+        best = None
+        best_key = None
+        # Most frequent first, so ties on distance keep the first candidate seen
+        for word_id in candidates[np.argsort(-self.counts[candidates], kind='stable')]:
+            candidate = self.words[word_id]
+            distance = edit_distance(word, candidate, max_distance)
+            if distance > max_distance:
+                continue
+            if best_key is None or distance < best_key:
+                best, best_key = candidate, distance
+                if distance == 1:
+                    break
+        return best
+
+    def save(self, path):
+        np.savez(
+            path,
+            meta=np.array([self.max_distance, self.prefix_length], dtype=np.int64),
+            words=np.frombuffer('\n'.join(self.words).encode('utf-8'), dtype=np.uint8),
+            counts=self.counts,
+            keys=self.keys,
+            offsets=self.offsets,
+            ids=self.ids,
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            max_distance, prefix_length = (int(v) for v in data['meta'])
+            index = cls(max_distance, prefix_length)
+            words = bytes(data['words']).decode('utf-8')
+            index.words = words.split('\n') if words else []
+            index.counts = data['counts']
+            index.lengths = np.array([len(w) for w in index.words], dtype=np.int32)
+            index.keys = data['keys']
+            index.offsets = data['offsets']
+            index.ids = data['ids']
+        index.word_ids = {w: i for i, w in enumerate(index.words)}
+        return index
@@ -1,68 +1,313 @@
 import json
 import os
-import networkx as nx
+import time
+import numpy as np
+from scipy import sparse
 from boogle.config import Config
 
+
+def build_matrix(link_graph):
+    """
+    Give every crawled page (link graph key) an integer id and build the
+    adjacency matrix in CSR form: row i has a 1 in column j if page i links
+    to page j. Links to pages we never crawled are dropped (closed system)
+    and repeated links count once.
+    Returns (urls, adjacency) where urls[i] is the page with id i.
+    """
+    urls = list(link_graph)
+    ids = {url: i for i, url in enumerate(urls)}
+
+    sources = []
+    targets = []
+    for source, links in link_graph.items():
+        source_id = ids[source]
+        for link in links:
+            target_id = ids.get(link)
+            if target_id is not None:
+                sources.append(source_id)
+                targets.append(target_id)
+
+    n = len(urls)
+    adjacency = sparse.csr_matrix(
+        (np.ones(len(sources), dtype=np.float64), (np.array(sources, dtype=np.int64), np.array(targets, dtype=np.int64))),
+        shape=(n, n),
+    )
+    # Duplicate links were summed while building the CSR matrix
+    adjacency.data[:] = 1.0
+    return urls, adjacency
+
+
+def collapse_duplicates(link_graph, canonical):
+    """
+    Merge pages the indexer collapsed as near-duplicates ({url: canonical
+    url}) into their canonical page: links to a copy count for it, and the
+    copy's out-links become its own.
+    """
+    merged = {}
+    for source, links in link_graph.items():
+        node = canonical.get(source, source)
+        targets = merged.setdefault(node, [])
+        for link in links:
+            target = canonical.get(link, link)
+            # A page linking to its own copy is not a self-link
+            if target != node or link == source:
+                targets.append(target)
+    return merged
+
+
+def transition_matrix(adjacency):
+    """
+    Row-stochastic transition matrix (row i spreads page i's score over its
+    out-links) and the mask of dangling pages (no out-links).
+    """
+    out_degree = np.diff(adjacency.indptr)
+    dangling = out_degree == 0
+    transition = adjacency.copy()
+    # Every stored entry is a 1, so row i's entries all become 1 / out_degree[i]
+    transition.data = np.repeat(1.0 / np.maximum(out_degree, 1), out_degree)
+    return transition, dangling
+
+
+def power_iteration(adjacency, damping=0.85, tol=1e-6, max_iter=100, start=None):
+    """
+    PageRank by power iteration with a uniform teleport vector. Dangling
+    pages spread their score uniformly over all pages. Stops once the L1
+    change of an iteration drops below n * tol (the networkx criterion).
+    Returns (scores, iterations, converged); scores sum to 1.
+    """
+    n = adjacency.shape[0]
+    if n == 0:
+        return np.zeros(0), 0, True
+
+    transition, dangling = transition_matrix(adjacency)
+    transition_t = transition.T
+    if start is None:
+        x = np.full(n, 1.0 / n)
+    else:
+        x = np.asarray(start, dtype=np.float64)
+        x = x / x.sum()
+
+    teleport = (1.0 - damping) / n
+    for iteration in range(1, max_iter + 1):
+        previous = x
+        x = damping * (transition_t @ previous + previous[dangling].sum() / n) + teleport
+        if np.abs(x - previous).sum() < n * tol:
+            return x, iteration, True
+    return x, max_iter, False
+
+
+def warm_start(urls, previous_urls, previous_scores):
+    """
+    Start vector for the current graph from the scores of an earlier run:
+    known pages keep their score, rescaled by n_old / n so the teleport
+    term still balances, and new pages start at 1 / n.
+    """
+    n = len(urls)
+    x = np.full(n, 1.0 / n)
+    m = len(previous_urls)
+    if not m:
+        return x
+    scale = m / n
+    if urls[:m] == list(previous_urls):
+        # The crawler only appends to the link graph, so ids usually line up
+        x[:m] = np.asarray(previous_scores) * scale
+        return x
+    positions = {url: i for i, url in enumerate(previous_urls)}
+    old_ids = np.fromiter((positions.get(url, -1) for url in urls), dtype=np.int64, count=n)
+    known = old_ids >= 0
+    x[known] = np.asarray(previous_scores)[old_ids[known]] * scale
+    return x
+
+
+def push_refine(adjacency, x, damping=0.85, tol=1e-6, max_rounds=100):
+    """
+    Refine an approximate PageRank vector by residual push. The residual
+    r is what one exact PageRank step would still add to x; a page whose
+    |r_i| exceeds tol moves it into its score and passes damping * r_i on
+    to its out-links (uniformly to all pages if it is dangling). All such
+    pages push together each round and only pages that just received
+    residual are checked for the next one, so a warm start that is
+    already right everywhere but near new pages and links only touches
+    the edges around them. Once the pushing pages hold over 1/8 of all
+    links, full power iteration steps are cheaper and push stops.
+    On convergence the L1 error is at most n * tol / (1 - damping).
+    Returns (scores, rounds, edges_pushed, converged).
+    """
+    n = adjacency.shape[0]
+    if n == 0:
+        return np.zeros(0), 0, 0, True
+
+    transition, dangling = transition_matrix(adjacency)
+    out_degree = np.diff(transition.indptr)
+    x = np.array(x, dtype=np.float64)
+    # One full step to find where x no longer fits the graph
+    residual = damping * (transition.T @ x + x[dangling].sum() / n) + (1.0 - damping) / n - x
+    # Dangling mass owed to every page, added to residual lazily
+    uniform = 0.0
+
+    active = np.flatnonzero(np.abs(residual) > tol)
+    edges_pushed = 0
+    rounds = 0
+    while rounds < max_rounds:
+        if not len(active):
+            if uniform == 0.0:
+                return x, rounds, edges_pushed, True
+            residual += uniform
+            uniform = 0.0
+            active = np.flatnonzero(np.abs(residual) > tol)
+            continue
+        edges = int(out_degree[active].sum())
+        if edges * 8 > transition.nnz:
+            break
+
+        rounds += 1
+        pushed = residual[active] + uniform
+        x[active] += pushed
+        residual[active] = -uniform
+        uniform += damping * pushed[dangling[active]].sum() / n
+        edges_pushed += edges
+
+        rows = transition[active]
+        weights = damping * rows.data * np.repeat(pushed, np.diff(rows.indptr))
+        if edges * 16 < n:
+            # Few targets: sort them rather than scan all pages
+            targets, slots = np.unique(rows.indices, return_inverse=True)
+            residual[targets] += np.bincount(slots, weights=weights, minlength=len(targets))
+        else:
+            received = np.bincount(rows.indices, weights=weights, minlength=n)
+            residual += received
+            targets = np.flatnonzero(received)
+        active = targets[np.abs(residual[targets] + uniform) > tol]
+    return x, rounds, edges_pushed, False
+
+
+def incremental_pagerank(adjacency, start, damping=0.85, tol=1e-6, max_iter=100):
+    """
+    PageRank from a warm start: residual push while the changes stay
+    local, then power iteration from the refined vector if they spread.
+    Returns (scores, stats) with the push rounds, edges pushed, power
+    iterations, and the total work in full-iteration units.
+    """
+    scores, rounds, edges_pushed, converged = push_refine(adjacency, start, damping, tol, max_iter)
+    iterations = 0
+    if not converged:
+        scores, iterations, converged = power_iteration(adjacency, damping, tol, max_iter, start=scores)
+    return scores, {
+        'push_rounds': rounds,
+        'edges_pushed': edges_pushed,
+        'power_iterations': iterations,
+        # The residual step, the pushed edges and any full iterations
+        'work_iterations': 1 + edges_pushed / max(adjacency.nnz, 1) + iterations,
+        'converged': converged,
+    }
+
+
+def load_scores(storage_path=None):
+    """
+    URL -> PageRank score, from the binary output (pagerank_scores.npy +
+    pagerank_urls.json) or, for older runs, pagerank.json.
+    """
+    storage_path = storage_path or Config.STORAGE_PATH
+    scores_path = os.path.join(storage_path, 'pagerank_scores.npy')
+    urls_path = os.path.join(storage_path, 'pagerank_urls.json')
+    if os.path.exists(scores_path) and os.path.exists(urls_path):
+        with open(urls_path, 'r') as f:
+            urls = json.load(f)
+        return dict(zip(urls, np.load(scores_path).tolist()))
+
+    json_path = os.path.join(storage_path, 'pagerank.json')
+    if os.path.exists(json_path):
+        with open(json_path, 'r') as f:
+            return json.load(f)
+    return {}
+
+
 class PageRank:
     def __init__(self):
         self.storage_path = Config.STORAGE_PATH
         self.link_graph_path = os.path.join(self.storage_path, 'link_graph.json')
         self.pagerank_path = os.path.join(self.storage_path, 'pagerank.json')
+        self.scores_path = os.path.join(self.storage_path, 'pagerank_scores.npy')
+        self.urls_path = os.path.join(self.storage_path, 'pagerank_urls.json')
+        self.duplicates_path = os.path.join(self.storage_path, 'index', 'duplicates.json')
         self.damping_factor = 0.85
-        self.iterations = 20
-        
-    def compute_pagerank(self):
+        self.tolerance = Config.PAGERANK_TOLERANCE
+        self.max_iterations = Config.PAGERANK_MAX_ITER
+
+    def compute_pagerank(self, incremental=None):
         """
-        Compute PageRank scores for all pages in the link graph.
+        Compute PageRank scores for all pages in the link graph. In
+        incremental mode (default PAGERANK_INCREMENTAL) the previous scores
+        are the starting point and only the residual around new pages and
+        links is pushed; otherwise, or without previous scores, a cold
+        power iteration runs from the uniform vector.
+        Returns (urls, scores) with scores[i] the score of urls[i].
         """
         if not os.path.exists(self.link_graph_path):
             print("Link graph not found.")
-            return
+            return [], np.zeros(0)
 
         with open(self.link_graph_path, 'r') as f:
             link_graph = json.load(f)
-            
+        # Near-duplicates left out of the index rank as their canonical page
+        if os.path.exists(self.duplicates_path):
+            with open(self.duplicates_path, 'r') as f:
+                duplicates = json.load(f)
+            link_graph = collapse_duplicates(
+                link_graph, {entry['url']: entry['canonical_url'] for entry in duplicates.values()})
+
+        if incremental is None:
+            incremental = Config.PAGERANK_INCREMENTAL
+        previous = self.load_previous() if incremental else None
+
         print(f"Computing PageRank for {len(link_graph)} nodes...")
-        
-        # Build NetworkX graph
-        G = nx.DiGraph()
-        
-        # Add nodes and edges
-        for source, targets in link_graph.items():
-            G.add_node(source)
-            for target in targets:
-                # Only add edges if target is also in our crawled set (link graph keys)
-                # Or add them anyway? PageRank handles dangling nodes, but strictly 
-                # we only have scores for pages we know about. 
-                # Let's add edge only if target was visited (is a key in link_graph)
-                # effectively a subgraph of the web.
-                if target in link_graph:
-                    G.add_edge(source, target)
-                else:
-                    # If we don't include external links, it's a closed system. 
-                    # If we do, we might have millions of dangling nodes.
-                    # Implementation choice: Closed system for now.
-                    pass
-                    
-        # Compute PageRank
-        try:
-            scores = nx.pagerank(G, alpha=self.damping_factor, max_iter=self.iterations)
-        except Exception as e:
-            print(f"Error computing PageRank: {e}")
-            # Fallback to uniform distribution if empty or error
-            scores = {node: 1.0/len(link_graph) for node in link_graph}
-            
-        # Store scores
-        # We need to map actual URLs to scores. 
-        # But wait, our Doc IDs are hashes. We need to map URL -> Score -> Doc ID or 
-        # just store URL -> Score and look it up later.
-        # The Indexer stores Doc Metadata: Hash -> URL. 
-        # So Query Engine can go Doc Hash -> URL -> PageRank.
-        
+        start = time.perf_counter()
+        urls, adjacency = build_matrix(link_graph)
+
+        if previous is not None:
+            previous_urls, previous_scores = previous
+            scores, stats = incremental_pagerank(
+                adjacency, warm_start(urls, previous_urls, previous_scores),
+                self.damping_factor, self.tolerance, self.max_iterations)
+            converged = stats['converged']
+            print(f"Incremental update from {len(previous_urls)} scored pages: {stats['push_rounds']} push rounds "
+                  f"({stats['edges_pushed']} edge updates), {stats['power_iterations']} power iterations, "
+                  f"~{stats['work_iterations']:.1f} full iterations of work.")
+        else:
+            scores, iterations, converged = power_iteration(
+                adjacency, self.damping_factor, self.tolerance, self.max_iterations)
+            print(f"Power iteration: {iterations} iterations.")
+        if not converged:
+            print(f"Warning: PageRank did not converge within {self.max_iterations} iterations.")
+
+        self.save(urls, scores)
+        print(f"PageRank computation finished: {adjacency.nnz} links, "
+              f"{time.perf_counter() - start:.2f}s.")
+        return urls, scores
+
+    def load_previous(self):
+        """
+        (urls, scores) of the last run, or None if there is none.
+        """
+        if not (os.path.exists(self.scores_path) and os.path.exists(self.urls_path)):
+            return None
+        with open(self.urls_path, 'r') as f:
+            urls = json.load(f)
+        scores = np.load(self.scores_path)
+        if len(urls) != len(scores):
+            return None
+        return urls, scores
+
+    def save(self, urls, scores):
+        """
+        Binary scores aligned with a URL list; pagerank.json (URL -> score)
+        is still written for tools that read it.
+        """
+        np.save(self.scores_path, np.asarray(scores, dtype=np.float64))
+        with open(self.urls_path, 'w') as f:
+            json.dump(urls, f)
         with open(self.pagerank_path, 'w') as f:
-            json.dump(scores, f, indent=2)
-            
-        print("PageRank computation finished.")
+            json.dump(dict(zip(urls, np.asarray(scores).tolist())), f)
 
 if __name__ == "__main__":
     pr = PageRank()
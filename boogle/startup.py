@@ -0,0 +1,30 @@
+import time
+import threading
+from contextlib import contextmanager
+
+# component -> seconds spent loading it in this process
+TIMINGS = {}
+_lock = threading.Lock()
+
+
+@contextmanager
+def timed(component):
+    """
+    Record how long loading a (lazily initialised) component takes.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        with _lock:
+            TIMINGS[component] = TIMINGS.get(component, 0.0) + elapsed
+
+
+def report():
+    """
+    Human readable startup breakdown, slowest component first.
+    """
+    lines = [f"  {name:<28} {seconds * 1000:9.1f} ms"
+             for name, seconds in sorted(TIMINGS.items(), key=lambda item: -item[1])]
+    return "Startup timings:\n" + "\n".join(lines) if lines else "Startup timings: nothing loaded yet"
@@ -0,0 +1,98 @@
+import os
+import json
+import hashlib
+import numpy as np
+from boogle.config import Config
+
+
+class EmbeddingCache:
+    """
+    Persistent content-addressed cache of document embeddings.
+
+    Vectors live in an append-only float32 matrix file that is memory-mapped
+    for reads; keys.json maps sha1(model name + text) -> row in that matrix.
+    """
+    def __init__(self, model_name, dimension, path=None):
+        self.model_name = model_name
+        self.dimension = dimension
+        self.path = path or os.path.join(Config.STORAGE_PATH, 'vectors', 'cache')
+        self.matrix_path = os.path.join(self.path, 'embeddings.f32')
+        self.keys_path = os.path.join(self.path, 'keys.json')
+
+        self.rows = {} # key -> row in the matrix file
+        self.matrix = None # read-only memmap of stored rows
+        self.new = {} # key -> vector not yet written to the matrix file
+        self.hits = 0
+        self.misses = 0
+
+        if not os.path.exists(self.path):
+            os.makedirs(self.path)
+        self.load()
+
+    def key(self, text):
+        return hashlib.sha1(f"{self.model_name}\0{text}".encode('utf-8')).hexdigest()
+
+    def stored_rows(self):
+        if not os.path.exists(self.matrix_path):
+            return 0
+        return os.path.getsize(self.matrix_path) // (self.dimension * 4)
+
+    def load(self):
+        if os.path.exists(self.keys_path):
+            try:
+                with open(self.keys_path, 'r') as f:
+                    self.rows = json.load(f)
+            except Exception:
+                print("Warning: Embedding cache keys unreadable. Starting with an empty cache.")
+                self.rows = {}
+
+        num_rows = self.stored_rows()
+        # Drop keys pointing past the end of the matrix (e.g. interrupted write)
+        self.rows = {k: r for k, r in self.rows.items() if r < num_rows}
+        self.matrix = np.memmap(self.matrix_path, dtype=np.float32, mode='r',
+                                shape=(num_rows, self.dimension)) if num_rows else None
+
+    def lookup(self, texts):
+        """
+        Returns (keys, vectors) where vectors[i] is the cached embedding or None.
+        """
+        keys = [self.key(text) for text in texts]
+        vectors = []
+        for key in keys:
+            if key in self.rows:
+                vectors.append(np.array(self.matrix[self.rows[key]]))
+            elif key in self.new:
+                vectors.append(self.new[key])
+            else:
+                vectors.append(None)
+
+        found = sum(v is not None for v in vectors)
+        self.hits += found
+        self.misses += len(keys) - found
+        return keys, vectors
+
+    def put(self, keys, vectors):
+        for key, vector in zip(keys, vectors):
+            if key not in self.rows and key not in self.new:
+                self.new[key] = np.asarray(vector, dtype=np.float32)
+
+    def save(self):
+        """
+        Append new vectors to the matrix file, then publish their keys.
+        """
+        if not self.new:
+            return
+
+        start_row = self.stored_rows()
+        with open(self.matrix_path, 'ab') as f:
+            f.write(np.vstack(list(self.new.values())).astype(np.float32).tobytes())
+        for offset, key in enumerate(self.new):
+            self.rows[key] = start_row + offset
+
+        tmp_path = self.keys_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.rows, f)
+        os.replace(tmp_path, self.keys_path)
+
+        self.new = {}
+        self.load()
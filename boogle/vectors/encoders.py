@@ -0,0 +1,194 @@
+import os
+import numpy as np
+from boogle import startup
+from boogle.config import Config
+
+# Query encoder backends for the same sentence-transformer model:
+#   torch       eager fp32 PyTorch (the reference the index was built with)
+#   torch-int8  PyTorch with dynamic int8 quantization of the Linear layers
+#   onnx        graph exported once to ONNX and run by onnxruntime (no torch at query time)
+BACKENDS = ('torch', 'torch-int8', 'onnx')
+
+# Queries/passages used to check a backend against the reference
+PARITY_TEXTS = [
+    "computer science",
+    "history of the python programming language",
+    "how does a search engine rank pages",
+    "pagerank algorithm damping factor",
+    "Alan Turing. Alan Mathison Turing was an English mathematician, computer scientist and logician.",
+    "The Python Standard Library contains built-in modules that provide access to system functionality.",
+    "machine learning models for natural language processing",
+    "operating systems manage hardware resources and provide common services for programs",
+]
+
+
+def _normalize(embeddings):
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return embeddings / np.maximum(norms, 1e-12)
+
+
+def _set_torch_threads(threads):
+    if threads:
+        import torch
+
+        torch.set_num_threads(threads)
+
+
+class TorchEncoder:
+    """
+    Reference encoder: SentenceTransformer.encode in eager fp32.
+    Pass an already loaded model to share it with the document encoder.
+    """
+    name = 'torch'
+
+    def __init__(self, model_name, model=None, threads=None):
+        self.model_name = model_name
+        if model is None:
+            from sentence_transformers import SentenceTransformer
+            model = SentenceTransformer(model_name, device='cpu')
+        _set_torch_threads(threads)
+        self.model = model
+
+    def encode(self, texts, batch_size=32):
+        return _normalize(self.model.encode(texts, batch_size=batch_size, convert_to_numpy=True))
+
+
+class QuantizedTorchEncoder(TorchEncoder):
+    """
+    Dynamic int8 quantization of every nn.Linear: weights stored as int8,
+    activations quantized on the fly.
+    """
+    name = 'torch-int8'
+
+    def __init__(self, model_name, model=None, threads=None):
+        import torch
+
+        super().__init__(model_name, model=model, threads=threads)
+        # quantize_dynamic copies the model, so a shared fp32 model is left untouched
+        self.model = torch.quantization.quantize_dynamic(self.model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+class OnnxEncoder:
+    """
+    Runs the transformer as an exported ONNX graph with onnxruntime and does
+    the mean pooling in NumPy. The graph and tokenizer are exported on first
+    use to vectors/onnx/; after that neither torch nor sentence-transformers
+    is imported.
+    """
+    name = 'onnx'
+
+    def __init__(self, model_name, threads=None, path=None):
+        try:
+            import onnxruntime as ort
+            from tokenizers import Tokenizer
+        except ImportError as e:
+            raise ImportError("The onnx encoder backend needs `onnxruntime` and `tokenizers` installed") from e
+
+        self.model_name = model_name
+        self.path = path or os.path.join(Config.STORAGE_PATH, 'vectors', 'onnx', model_name)
+        self.graph_path = os.path.join(self.path, 'model.onnx')
+        if not os.path.exists(self.graph_path):
+            self.export()
+
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+            options.inter_op_num_threads = 1
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(self.graph_path, options, providers=['CPUExecutionProvider'])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(self.path, 'tokenizer.json'))
+        with open(os.path.join(self.path, 'max_seq_length'), 'r') as f:
+            self.tokenizer.enable_truncation(int(f.read()))
+        self.tokenizer.enable_padding()
+
+    def export(self):
+        """
+        Export the transformer of the sentence-transformer model to ONNX.
+        """
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        print(f"Exporting {self.model_name} to ONNX at {self.path}...")
+        os.makedirs(self.path, exist_ok=True)
+        st_model = SentenceTransformer(self.model_name, device='cpu')
+        transformer = st_model[0].auto_model.eval()
+        tokenizer = st_model[0].tokenizer
+
+        dummy = tokenizer(["export the encoder"], return_tensors='pt')
+        names = ['input_ids', 'attention_mask', 'token_type_ids']
+        dynamic = {name: {0: 'batch', 1: 'sequence'} for name in names}
+        dynamic['last_hidden_state'] = {0: 'batch', 1: 'sequence'}
+        with torch.no_grad():
+            torch.onnx.export(
+                transformer,
+                tuple(dummy[name] for name in names),
+                self.graph_path,
+                input_names=names,
+                output_names=['last_hidden_state'],
+                dynamic_axes=dynamic,
+                opset_version=14,
+            )
+
+        tokenizer.backend_tokenizer.save(os.path.join(self.path, 'tokenizer.json'))
+        with open(os.path.join(self.path, 'max_seq_length'), 'w') as f:
+            f.write(str(st_model.max_seq_length))
+
+    def encode(self, texts, batch_size=32):
+        outputs = []
+        for start in range(0, len(texts), batch_size):
+            encodings = self.tokenizer.encode_batch(list(texts[start:start + batch_size]))
+            feeds = {
+                'input_ids': np.array([e.ids for e in encodings], dtype=np.int64),
+                'attention_mask': np.array([e.attention_mask for e in encodings], dtype=np.int64),
+                'token_type_ids': np.array([e.type_ids for e in encodings], dtype=np.int64),
+            }
+            feeds = {name: value for name, value in feeds.items() if name in self.input_names}
+            hidden = self.session.run(None, feeds)[0]
+
+            # Mean pooling over real (unpadded) tokens, as sentence-transformers does
+            mask = feeds['attention_mask'][:, :, None].astype(np.float32)
+            outputs.append((hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9))
+        return _normalize(np.vstack(outputs))
+
+
+def create_encoder(backend, model_name, model=None, threads=None):
+    """
+    Build a query encoder for `backend`. `model` is an already loaded
+    reference SentenceTransformer to reuse (torch backends only).
+    """
+    threads = threads if threads is not None else Config.VECTOR_ENCODER_THREADS
+    with startup.timed(f'query_encoder[{backend}]'):
+        if backend == 'torch':
+            return TorchEncoder(model_name, model=model, threads=threads)
+        if backend == 'torch-int8':
+            return QuantizedTorchEncoder(model_name, model=model, threads=threads)
+        if backend == 'onnx':
+            return OnnxEncoder(model_name, threads=threads)
+    raise ValueError(f"Unknown encoder backend '{backend}'. Expected one of {BACKENDS}")
+
+
+def check_parity(reference, candidate, texts, tolerance=None):
+    """
+    Compare candidate embeddings against the reference encoder.
+    Returns (ok, report) where ok means every query/document cosine score
+    differs from the reference score by at most `tolerance`.
+    """
+    tolerance = tolerance if tolerance is not None else Config.VECTOR_PARITY_TOLERANCE
+    expected = reference.encode(texts)
+    actual = candidate.encode(texts)
+
+    # Self-agreement of each embedding, and the full score matrix ranking uses
+    self_cosine = np.sum(expected * actual, axis=1)
+    score_error = np.abs(actual @ expected.T - expected @ expected.T)
+
+    report = {
+        'backend': candidate.name,
+        'texts': len(texts),
+        'min_self_cosine': round(float(self_cosine.min()), 5),
+        'max_score_error': round(float(score_error.max()), 5),
+        'tolerance': tolerance,
+    }
+    return report['max_score_error'] <= tolerance, report
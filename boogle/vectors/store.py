@@ -1,80 +1,447 @@
 import os
 import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
-import faiss
-from sentence_transformers import SentenceTransformer
+from boogle import startup
 from boogle.config import Config
+from boogle.vectors.cache import EmbeddingCache
+from boogle.vectors.encoders import PARITY_TEXTS, TorchEncoder, check_parity, create_encoder
+
+# faiss and sentence-transformers (torch) are imported on first use so that
+# lexical-only callers do not pay for them at import time.
+
+# FAISS factory strings for the supported storage modes.
+# Bytes per 384-d vector: flat 1536, fp16 768, sq8 384, pq = VECTOR_PQ_M
+INDEX_FACTORIES = {
+    'flat': 'Flat',
+    'fp16': 'SQfp16',
+    'sq8': 'SQ8',
+    'pq': 'PQ{m}',
+}
+
+# PQ trains 256 centroids per sub-quantizer, so it needs at least that many vectors
+PQ_MIN_TRAIN = 256
+
+# Texts are length-sorted within a window of this many batches before encoding
+SORT_WINDOW_BATCHES = 8
+# Encoded windows allowed in flight on the background thread
+MAX_INFLIGHT_WINDOWS = 2
+
+
+def split_passages(text, window=None, stride=None, max_passages=None):
+    """
+    Split text into overlapping windows of `window` whitespace tokens, `stride` apart.
+    """
+    window = window or Config.VECTOR_PASSAGE_TOKENS
+    stride = stride or Config.VECTOR_PASSAGE_STRIDE
+    max_passages = max_passages or Config.VECTOR_MAX_PASSAGES
+
+    words = text.split()
+    if not words:
+        return []
+    passages = []
+    for start in range(0, max(len(words) - window, 0) + 1, stride):
+        passages.append(' '.join(words[start:start + window]))
+        if len(passages) >= max_passages:
+            break
+    # Make sure the tail of the text is covered
+    if len(passages) < max_passages and len(words) > window and (len(words) - window) % stride:
+        passages.append(' '.join(words[-window:]))
+    return passages
+
+
+def create_index(index_type, dimension, num_vectors, pq_m=None):
+    """
+    Create an (untrained) FAISS index for the given storage mode.
+    Falls back to a flat index when there is too little data to train PQ.
+    """
+    import faiss
+
+    if index_type not in INDEX_FACTORIES:
+        raise ValueError(f"Unknown vector index type '{index_type}'. Expected one of {sorted(INDEX_FACTORIES)}")
+
+    if index_type == 'pq' and num_vectors < PQ_MIN_TRAIN:
+        print(f"Warning: {num_vectors} vectors is too few to train PQ (need {PQ_MIN_TRAIN}). Using flat index.")
+        index_type = 'flat'
+
+    factory = INDEX_FACTORIES[index_type].format(m=pq_m or Config.VECTOR_PQ_M)
+    return faiss.index_factory(dimension, factory, faiss.METRIC_L2)
+
+
+def build_faiss_index(index_type, vectors, pq_m=None):
+    """
+    Train (if needed) and fill an index with normalized float32 vectors in one bulk add.
+    """
+    index = create_index(index_type, vectors.shape[1], len(vectors), pq_m=pq_m)
+    if not index.is_trained:
+        index.train(vectors)
+    index.add(vectors)
+    return index
+
+
+def search_index(index, queries, k, full_vectors=None, rerank_factor=1):
+    """
+    Search a batch of normalized queries.
+    If full_vectors is given, a shortlist of k * rerank_factor is fetched from the
+    (compressed) index and re-scored exactly against the full-precision vectors.
+    Returns (scores, indices) arrays of shape (num_queries, k), -1 marks empty slots.
+    Scores are cosine similarities (higher is better).
+    """
+    if index is None or index.ntotal == 0:
+        empty = np.full((len(queries), k), -1, dtype=np.int64)
+        return np.zeros((len(queries), k), dtype=np.float32), empty
+
+    fetch = k * rerank_factor if full_vectors is not None else k
+    distances, indices = index.search(queries, fetch)
+
+    if full_vectors is None:
+        # Vectors are normalized and FAISS returns squared L2: cos = 1 - L2^2 / 2
+        return 1 - distances / 2, indices
+
+    scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+    top = np.full((len(queries), k), -1, dtype=np.int64)
+    for q, row in enumerate(indices):
+        candidates = np.sort(row[row != -1])
+        if len(candidates) == 0:
+            continue
+        exact = np.asarray(full_vectors[candidates]) @ queries[q]
+        order = np.argsort(-exact)[:k]
+        scores[q, :len(order)] = exact[order]
+        top[q, :len(order)] = candidates[order]
+    return scores, top
+
 
 class VectorStore:
-    def __init__(self):
+    def __init__(self, index_type=None, rerank=None, batch_size=None, encode_thread=None, use_cache=None):
         self.model_name = 'all-MiniLM-L6-v2'
-        self.model = SentenceTransformer(self.model_name)
+        self._model = None # loaded on first use, see `model`
+        self._model_lock = threading.Lock()
+        self.query_backend = Config.VECTOR_QUERY_BACKEND
+        self._query_encoder = None # see `query_encoder`
+        self._query_encoder_lock = threading.Lock()
         self.dimension = 384  # Dimension for all-MiniLM-L6-v2
-        self.index = faiss.IndexFlatL2(self.dimension)
-        self.doc_ids = [] # map index id to doc_id
+        self.index_type = index_type or Config.VECTOR_INDEX_TYPE
+        self.rerank = Config.VECTOR_RERANK if rerank is None else rerank
+        self.rerank_factor = Config.VECTOR_RERANK_FACTOR
+        self.index = None # FAISS index, created by build() or load()
+        self.doc_ids = [] # doc ordinal -> doc_id
+        self.doc_ordinals = {} # doc_id -> doc ordinal
+        self.vector_docs = np.empty(0, dtype=np.int32) # vector row -> doc ordinal
+        self.pending_docs = [] # doc ordinals of the pending rows
+        self.full_vectors = None # full-precision vectors (memory-mapped after load)
+        self.pending = [] # normalized embedding matrices not yet added to the index
+        self.batch_size = batch_size or Config.VECTOR_BATCH_SIZE
+        self.encode_thread = Config.VECTOR_ENCODE_THREAD if encode_thread is None else encode_thread
+        self.passage_overfetch = Config.VECTOR_PASSAGE_OVERFETCH
+        self.queue = [] # (doc_id, text) waiting to be encoded
+        self.inflight = [] # futures of windows encoding on the background thread
+        self.executor = None
         self.storage_path = os.path.join(Config.STORAGE_PATH, 'vectors')
-        
+
         if not os.path.exists(self.storage_path):
             os.makedirs(self.storage_path)
-            
+
+        self.use_cache = Config.VECTOR_EMBEDDING_CACHE if use_cache is None else use_cache
+        self._cache = None
+
+    @property
+    def model(self):
+        """
+        The sentence-transformer, loaded (with torch) on first access.
+        """
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    with startup.timed('sentence_transformer'):
+                        from sentence_transformers import SentenceTransformer
+                        self._model = SentenceTransformer(self.model_name)
+        return self._model
+
+    @property
+    def query_encoder(self):
+        """
+        Encoder used for queries, per VECTOR_QUERY_BACKEND. Documents are
+        always embedded with the reference model.
+        """
+        if self._query_encoder is None:
+            with self._query_encoder_lock:
+                if self._query_encoder is None:
+                    self._query_encoder = self._create_query_encoder()
+        return self._query_encoder
+
+    def _create_query_encoder(self):
+        if self.query_backend == 'torch':
+            return create_encoder('torch', self.model_name, model=self.model)
+
+        encoder = create_encoder(self.query_backend, self.model_name)
+        if Config.VECTOR_PARITY_CHECK:
+            reference = TorchEncoder(self.model_name, model=self.model)
+            ok, report = check_parity(reference, encoder, PARITY_TEXTS)
+            print(f"Query encoder parity: {report}")
+            if not ok:
+                print(f"Warning: '{self.query_backend}' encoder exceeds parity tolerance. Using torch.")
+                return reference
+        return encoder
+
+    @property
+    def cache(self):
+        if self._cache is None and self.use_cache:
+            self._cache = EmbeddingCache(self.model_name, self.dimension)
+        return self._cache
+
+    def warm_up(self):
+        """
+        Load the query encoder and run one encode so the first query does not pay for it.
+        """
+        self.encode_queries(["warm up"])
+
     def add_document(self, doc_id, text):
         """
-        Generate embedding for text and add to index.
+        Queue text for embedding. Texts are encoded in batches once enough are
+        queued; call flush() (done by search and save) to encode the remainder.
         """
         if not text.strip():
             return
-            
-        embedding = self.model.encode([text])[0]
-        # Normalize for cosine similarity (if using IP index, but L2 is fine for relative ranking too if normalized? 
-        # Actually L2 distance is related to Cosine Sim for normalized vectors. 
-        # For simplicity, let's keep it simple. L2 is fine.)
-        # But usually for semantic search cosine similarity is preferred.
-        # Faiss IP (Inner Product) == Cosine Similarity if vectors are normalized.
-        
-        # Normalize
-        faiss.normalize_L2(embedding.reshape(1, -1))
-        
-        self.index.add(np.array([embedding], dtype=np.float32))
-        self.doc_ids.append(doc_id)
-        
+
+        self.queue.append((doc_id, text))
+        if len(self.queue) >= self.batch_size * SORT_WINDOW_BATCHES:
+            self._submit_window()
+
+    def add_passages(self, doc_id, title, text):
+        """
+        Passage mode: queue one vector per fixed token window of the document's
+        clean text. Search max-pools passage scores per document.
+        """
+        for passage in split_passages(text):
+            self.add_document(doc_id, f"{title}. {passage}")
+
+    def add_documents(self, docs):
+        """
+        Queue an iterable of (doc_id, text) pairs.
+        """
+        for doc_id, text in docs:
+            self.add_document(doc_id, text)
+
+    def encode(self, texts):
+        """
+        Encode texts into normalized float32 embeddings.
+        """
+        import faiss
+
+        embeddings = np.asarray(self.model.encode(texts, batch_size=self.batch_size), dtype=np.float32)
+        # Normalize so L2 distance maps to cosine similarity
+        faiss.normalize_L2(embeddings)
+        return embeddings
+
+    def encode_queries(self, queries):
+        """
+        Encode queries with the configured backend into normalized float32 embeddings.
+        """
+        return np.ascontiguousarray(self.query_encoder.encode(queries, batch_size=self.batch_size), dtype=np.float32)
+
+    def _encode_window(self, window):
+        """
+        Encode a window of (doc_id, text) in length-sorted batches to minimise padding.
+        Texts already in the embedding cache are not re-encoded.
+        Returns (doc_ids, embeddings) in the sorted order.
+        """
+        window = sorted(window, key=lambda item: len(item[1]))
+        texts = [text for _, text in window]
+
+        if self.cache is None:
+            keys, vectors = None, [None] * len(texts)
+        else:
+            keys, vectors = self.cache.lookup(texts)
+
+        misses = [i for i, vector in enumerate(vectors) if vector is None]
+        for start in range(0, len(misses), self.batch_size):
+            batch = misses[start:start + self.batch_size]
+            embeddings = self.encode([texts[i] for i in batch])
+            for i, embedding in zip(batch, embeddings):
+                vectors[i] = embedding
+            if self.cache is not None:
+                self.cache.put([keys[i] for i in batch], embeddings)
+
+        embeddings = np.vstack(vectors) if vectors else np.empty((0, self.dimension), dtype=np.float32)
+        return [doc_id for doc_id, _ in window], embeddings
+
+    def _collect(self, result):
+        doc_ids, embeddings = result
+        ordinals = []
+        for doc_id in doc_ids:
+            if doc_id not in self.doc_ordinals:
+                self.doc_ordinals[doc_id] = len(self.doc_ids)
+                self.doc_ids.append(doc_id)
+            ordinals.append(self.doc_ordinals[doc_id])
+        self.pending_docs.append(np.array(ordinals, dtype=np.int32))
+        self.pending.append(embeddings)
+
+    def _submit_window(self):
+        window, self.queue = self.queue, []
+        if not self.encode_thread:
+            self._collect(self._encode_window(window))
+            return
+
+        # Model inference releases the GIL, so it overlaps with HTML parsing
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='vector-encode')
+        self.inflight.append(self.executor.submit(self._encode_window, window))
+
+        # Bound memory held by encoded-but-uncollected windows
+        while len(self.inflight) > MAX_INFLIGHT_WINDOWS:
+            self._collect(self.inflight.pop(0).result())
+
+    def flush(self):
+        """
+        Encode everything still queued and wait for background batches.
+        """
+        if self.queue:
+            self._submit_window()
+        while self.inflight:
+            self._collect(self.inflight.pop(0).result())
+
+    def build(self):
+        """
+        Build the FAISS index from all known vectors in the configured storage mode.
+        """
+        self.flush()
+        vectors = []
+        if self.full_vectors is not None:
+            vectors.append(np.asarray(self.full_vectors))
+        elif self.index is not None and self.index.ntotal > 0:
+            # Index saved before the side file existed: recover what it stores
+            vectors.append(self.index.reconstruct_n(0, self.index.ntotal))
+        if self.pending:
+            vectors.append(np.vstack(self.pending))
+            self.vector_docs = np.concatenate([self.vector_docs] + self.pending_docs).astype(np.int32)
+        self.pending = []
+        self.pending_docs = []
+        if not vectors:
+            return
+
+        self.full_vectors = np.ascontiguousarray(np.vstack(vectors), dtype=np.float32)
+        self.index = build_faiss_index(self.index_type, self.full_vectors)
+
     def search(self, query, k=10):
         """
         Return list of (doc_id, score)
         """
-        embedding = self.model.encode([query])[0]
-        faiss.normalize_L2(embedding.reshape(1, -1))
-        
-        # FAISS search
-        distances, indices = self.index.search(np.array([embedding], dtype=np.float32), k)
-        
-        results = []
-        for i, idx in enumerate(indices[0]):
-            if idx != -1 and idx < len(self.doc_ids):
-                # Convert L2 distance to something like a similarity score?
-                # Since vectors are normalized, L2 = 2 - 2*IP. 
-                # IP (Cosine) is better for ranking score. 
-                # Let's just trust that smaller L2 is better. 
-                # But for our hybrid score we need a "similarity" score (higher is better).
-                # Sim = 1 / (1 + dist) or similar? 
-                # Or just use Inner Product index?
-                # Let's switch to IndexFlatIP for simplicity in next iteration or just convert here.
-                # Cosine Sim = 1 - (L2^2) / 2
-                score = 1 - (distances[0][i] ** 2) / 2
-                results.append((self.doc_ids[idx], float(score)))
-                
-        return results
+        return self.search_vector(self.encode_queries([query])[0], k)
+
+    def search_vector(self, embedding, k=10):
+        """
+        Search with an already encoded (normalized) query embedding.
+        Return list of (doc_id, score)
+        """
+        return self.search_vectors(np.asarray(embedding, dtype=np.float32).reshape(1, -1), k)[0]
+
+    def search_vectors(self, embeddings, k=10):
+        """
+        Search a matrix of encoded (normalized) queries with one FAISS call.
+        Return one list of (doc_id, score) per query row
+        """
+        if self.pending or self.queue or self.inflight:
+            self.build()
+
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+
+        # Several passages may belong to one doc, so fetch extra rows to fill k docs
+        passage_mode = len(self.vector_docs) > len(self.doc_ids)
+        fetch = k * self.passage_overfetch if passage_mode else k
+
+        full_vectors = self.full_vectors if self.rerank else None
+        scores, indices = search_index(self.index, embeddings, fetch, full_vectors, self.rerank_factor)
+
+        # Rows come best-first, so the first hit per doc is its max-pooled score
+        batch = []
+        for row_scores, row_indices in zip(scores, indices):
+            results = []
+            seen = set()
+            for score, idx in zip(row_scores, row_indices):
+                if idx == -1 or idx >= len(self.vector_docs):
+                    continue
+                ordinal = self.vector_docs[idx]
+                if ordinal in seen:
+                    continue
+                seen.add(ordinal)
+                results.append((self.doc_ids[ordinal], float(score)))
+                if len(results) == k:
+                    break
+            batch.append(results)
+
+        return batch
+
+    def memory_usage(self):
+        """
+        Bytes held by the index and by the full-precision side file.
+        """
+        import faiss
+
+        usage = {
+            'index_type': self.index_type,
+            'documents': len(self.doc_ids),
+            'vectors': 0,
+            'index_bytes': 0,
+            'mapping_bytes': int(self.vector_docs.nbytes),
+            'full_vectors_bytes': int(self.full_vectors.nbytes) if self.full_vectors is not None else 0,
+        }
+        if self.index is not None:
+            usage['vectors'] = self.index.ntotal
+            usage['index_bytes'] = int(faiss.serialize_index(self.index).size)
+        return usage
 
     def save(self):
-        faiss.write_index(self.index, os.path.join(self.storage_path, 'index.faiss'))
+        import faiss
+
+        if self.pending or self.queue or self.inflight:
+            self.build()
+        if self.index is None:
+            self.index = create_index('flat', self.dimension, 0)
+        # Written next to the target and renamed over it: a loaded index maps the
+        # old file, which must not be truncated under it
+        index_path = os.path.join(self.storage_path, 'index.faiss')
+        faiss.write_index(self.index, index_path + '.tmp')
+        os.replace(index_path + '.tmp', index_path)
         with open(os.path.join(self.storage_path, 'doc_ids.json'), 'w') as f:
             json.dump(self.doc_ids, f)
-            
+        np.save(os.path.join(self.storage_path, 'vector_docs.npy'), self.vector_docs)
+        # A memory-mapped side file is already on disk (and np.save would truncate it)
+        if self.full_vectors is not None and not isinstance(self.full_vectors, np.memmap):
+            # ...and renamed into place, since running engines may have the old one mapped
+            vectors_path = os.path.join(self.storage_path, 'embeddings.npy')
+            with open(vectors_path + '.tmp', 'wb') as f:
+                np.save(f, np.asarray(self.full_vectors))
+            os.replace(vectors_path + '.tmp', vectors_path)
+        if self._cache is not None:
+            self._cache.save()
+            if self._cache.hits or self._cache.misses:
+                print(f"Embedding cache: {self._cache.hits} reused, {self._cache.misses} encoded.")
+
     def load(self):
         index_path = os.path.join(self.storage_path, 'index.faiss')
         if os.path.exists(index_path):
-            self.index = faiss.read_index(index_path)
-        
+            with startup.timed('faiss_index'):
+                import faiss
+                # Memory-mapped read-only (Flat, SQ and PQ codes all support it), so
+                # workers share the codes through the page cache instead of each
+                # holding a copy; builds never modify a loaded index in place
+                self.index = faiss.read_index(index_path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+
         ids_path = os.path.join(self.storage_path, 'doc_ids.json')
         if os.path.exists(ids_path):
             with open(ids_path, 'r') as f:
                 self.doc_ids = json.load(f)
+            self.doc_ordinals = {doc_id: i for i, doc_id in enumerate(self.doc_ids)}
+
+        # Row -> doc mapping; indexes built before passage mode have one row per doc
+        mapping_path = os.path.join(self.storage_path, 'vector_docs.npy')
+        if os.path.exists(mapping_path):
+            self.vector_docs = np.load(mapping_path)
+        else:
+            self.vector_docs = np.arange(len(self.doc_ids), dtype=np.int32)
+
+        # Full-precision vectors stay on disk; only re-ranked rows are paged in
+        vectors_path = os.path.join(self.storage_path, 'embeddings.npy')
+        if os.path.exists(vectors_path):
+            self.full_vectors = np.load(vectors_path, mmap_mode='r')
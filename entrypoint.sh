@@ -4,12 +4,21 @@ set -e
 # Default to port 5000 if PORT is not set
 PORT=${PORT:-5000}
 
-# Start Gunicorn
-# -w 1: One worker (save ram)
-# --threads 4: Concurrency
-# --timeout 120: Allow slow searches
-exec gunicorn boogle.frontend.app:app \
-    --bind 0.0.0.0:$PORT \
-    --workers 1 \
-    --threads 4 \
-    --timeout 120
+# SERVE_MODE=async: uvicorn event loop, handlers on SERVE_THREADS threads,
+# identical concurrent GETs coalesced (boogle/frontend/asgi.py)
+if [ "${SERVE_MODE:-threaded}" = "async" ]; then
+    if ! python -c "import uvicorn" 2>/dev/null; then
+        echo "SERVE_MODE=async needs uvicorn: pip install 'uvicorn>=0.23'" >&2
+        exit 1
+    fi
+    exec uvicorn boogle.frontend.asgi:app \
+        --host 0.0.0.0 \
+        --port $PORT \
+        --workers 1
+fi
+
+# Start Gunicorn (gunicorn.conf.py)
+# SERVE_WORKERS=1: One worker (save ram); with SERVE_PRELOAD=true more workers share the index and model
+# SERVE_THREADS=16: Concurrency; searches run on ADMISSION_SLOTS of them, the rest queue (boogle/config.py)
+# timeout 120: Allow slow searches
+exec gunicorn -c gunicorn.conf.py boogle.frontend.app:app
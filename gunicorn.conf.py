@@ -0,0 +1,46 @@
+"""
+gunicorn settings for the threaded serving mode (entrypoint.sh):
+
+    gunicorn -c gunicorn.conf.py boogle.frontend.app:app
+
+SERVE_WORKERS processes with SERVE_THREADS threads each. With SERVE_PRELOAD
+the master imports the app, loading the index, PageRank and the model once,
+and forked workers share those pages copy-on-write instead of each loading
+its own copy (memory-mapped postings are shared through the page cache).
+"""
+import gc
+import os
+
+from boogle.config import Config
+
+bind = f"0.0.0.0:{os.getenv('PORT', 5000)}"
+workers = Config.SERVE_WORKERS
+threads = Config.SERVE_THREADS
+timeout = 120 # allow slow searches
+preload_app = Config.SERVE_PRELOAD
+
+if preload_app:
+    # Collections during the load would only churn; the objects it creates
+    # are frozen once loading is done (when_ready)
+    gc.disable()
+
+
+def when_ready(server):
+    if preload_app:
+        # Move everything loaded so far out of the collector's reach: a
+        # collection in a worker would otherwise write to (and so copy)
+        # every page holding a loaded object
+        gc.freeze()
+        gc.enable()
+
+
+def post_fork(server, worker):
+    if Config.VECTOR_ENCODER_THREADS == 0 and workers > 1:
+        # Split the cores between workers rather than have each torch pool
+        # spin up one thread per core
+        Config.VECTOR_ENCODER_THREADS = max(1, (os.cpu_count() or 1) // workers)
+    if preload_app:
+        # Threads do not survive fork: warm up (first encode, background
+        # work) in each worker
+        from boogle.frontend.app import start_warm_up
+        start_warm_up()
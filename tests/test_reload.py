@@ -0,0 +1,58 @@
+"""
+A running QueryEngine picks up an index rebuilt under it.
+
+    python -m unittest discover tests
+"""
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from benchmarks import corpus
+from boogle.config import Config
+
+
+class ReloadTest(unittest.TestCase):
+    def setUp(self):
+        self.storage_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.storage_path)
+        patch = mock.patch.object(Config, 'STORAGE_PATH', self.storage_path)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def build(self, pages):
+        from boogle.indexer.inverted_index import InvertedIndex
+
+        generated = corpus.generate(corpus.CorpusSpec(pages=pages, vocabulary=500, words_per_page=(50, 100)))
+        corpus.write(generated, self.storage_path)
+        # A separate indexer, as `python -m boogle.indexer.inverted_index` would be
+        InvertedIndex().build_index()
+        return generated
+
+    def test_rebuild_misses_cache(self):
+        from boogle.query_engine.engine import QueryEngine
+
+        pages = self.build(20)
+        query = next(iter(pages.values()))['title']
+        engine = QueryEngine()
+        engine.index_check_interval = 0
+
+        engine.search(query)
+        engine.search(query)
+        self.assertEqual(engine.result_cache.stats()['hits'], 1)
+        self.assertEqual(engine.doc_count, 20)
+        old_version = engine.index_version
+
+        self.build(30)
+        misses = engine.result_cache.stats()['misses']
+        results, _, _ = engine.search(query)
+
+        self.assertNotEqual(engine.index_version, old_version)
+        self.assertEqual(engine.doc_count, 30)
+        self.assertEqual(engine.result_cache.stats()['misses'], misses + 1)
+        self.assertTrue(results)
+        self.assertTrue(all(doc['doc_id'] in engine.indexer.doc_metadata for doc in results))
+
+
+if __name__ == '__main__':
+    unittest.main()